@@ -22,5 +22,12 @@
 __author__ = 'Niklas Rosenstein <rosensteinniklas@gmail.com>'
 __version__ = '1.0.0'
 
+from .cachedict import LFUDict, LRUDict, TTLDict
 from .chaindict import ChainDict
+from .intervaltree import Interval, IntervalTree
 from .orderedset import OrderedSet
+from .persistentmap import PersistentMap, TransientMap
+from .persistentvector import PersistentVector, TransientVector
+from .recordlist import RecordList, make_record
+from .sorteddict import SortedDict
+from .sortedlist import SortedList
@@ -0,0 +1,475 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+Thread-safe, bounded mappings for use as in-memory caches. All operations are O(1) (amortized
+for #TTLDict).
+
+Every cache accepts a *maxsize* budget. Without a *weight* function, every item weighs `1` and
+*maxsize* is the maximum number of items. With a *weight* function, *maxsize* is the maximum
+total weight of all items, which allows to bound caches by e.g. the size of the cached values
+in bytes. Storing an item that weighs more than *maxsize* raises a #ValueError and leaves the
+cache unchanged. Items that are removed to stay within the budget (or that expired in a #TTLDict) are
+passed to the *on_evict* callback, which is invoked after the cache's lock is released. Items
+removed explicitly (e.g. with `del` or #pop()) are not reported.
+"""
+
+import abc
+import collections
+import threading
+import time
+import typing as t
+
+__all__ = ['LRUDict', 'LFUDict', 'TTLDict']
+
+K = t.TypeVar('K')
+V = t.TypeVar('V')
+
+_MISSING = object()
+_WeightFunc = t.Callable[[K, V], int]
+_EvictCallback = t.Callable[[K, V], None]
+
+
+class _CacheDict(t.MutableMapping[K, V]):
+  """
+  Base class for the cache mappings. Subclasses implement the storage and eviction strategy
+  through the underscore methods, all of which are called with the lock held.
+  """
+
+  def __init__(
+    self,
+    maxsize: t.Optional[int] = None,
+    weight: t.Optional[_WeightFunc] = None,
+    on_evict: t.Optional[_EvictCallback] = None,
+  ) -> None:
+    if maxsize is not None and maxsize < 0:
+      raise ValueError('maxsize must be >= 0, got {!r}'.format(maxsize))
+    self._maxsize = maxsize
+    self._weight = weight
+    self._on_evict = on_evict
+    self._total_weight = 0
+    self._lock = threading.RLock()
+
+  def __repr__(self) -> str:
+    with self._lock:
+      items = {k: self._peek(k) for k in self._keys()}
+    return '{}({!r}, maxsize={!r})'.format(type(self).__name__, items, self._maxsize)
+
+  @property
+  def maxsize(self) -> t.Optional[int]:
+    return self._maxsize
+
+  @property
+  def total_weight(self) -> int:
+    """
+    The sum of the weights of all items in the cache. Equal to the number of items if no
+    *weight* function was specified.
+    """
+
+    return self._total_weight
+
+  @abc.abstractmethod
+  def _get(self, key: K) -> t.Any:
+    """ Returns the value for *key* and records the access, or #_MISSING. """
+
+  @abc.abstractmethod
+  def _peek(self, key: K) -> t.Any:
+    """ Returns the value for *key* without recording an access, or #_MISSING. """
+
+  @abc.abstractmethod
+  def _store(self, key: K, value: V, weight: int) -> None:
+    """ Inserts or replaces the item and adds its *weight* to the total weight. """
+
+  @abc.abstractmethod
+  def _remove(self, key: K) -> t.Any:
+    """ Removes the item and returns its value, or #_MISSING. """
+
+  @abc.abstractmethod
+  def _pop_victim(self) -> t.Tuple[K, V]:
+    """ Removes and returns the next item to evict according to the strategy. """
+
+  @abc.abstractmethod
+  def _keys(self) -> t.List[K]:
+    """ Returns the keys of all items. """
+
+  @abc.abstractmethod
+  def _len(self) -> int:
+    """ Returns the number of items. """
+
+  def _expire(self) -> t.List[t.Tuple[K, V]]:
+    return []
+
+  def _notify(self, evicted: t.List[t.Tuple[K, V]]) -> None:
+    if self._on_evict is not None:
+      for key, value in evicted:
+        self._on_evict(key, value)
+
+  def __getitem__(self, key: K) -> V:
+    with self._lock:
+      evicted = self._expire()
+      value = self._get(key)
+    self._notify(evicted)
+    if value is _MISSING:
+      raise KeyError(key)
+    return value
+
+  def __contains__(self, key: t.Any) -> bool:
+    with self._lock:
+      evicted = self._expire()
+      result = self._peek(key) is not _MISSING
+    self._notify(evicted)
+    return result
+
+  def _put(self, key: K, value: V) -> t.List[t.Tuple[K, V]]:
+    weight = 1 if self._weight is None else self._weight(key, value)
+    if weight < 0:
+      raise ValueError('weight must be >= 0, got {!r}'.format(weight))
+    if self._maxsize is not None and weight > self._maxsize:
+      # Checked before anything is evicted, the item would not fit even into an empty cache.
+      raise ValueError('weight {!r} of the item exceeds maxsize {!r}'.format(weight, self._maxsize))
+    evicted = []
+    if self._maxsize is not None and self._peek(key) is _MISSING:
+      # Make room before inserting so that a new item is not its own eviction victim.
+      while self._total_weight + weight > self._maxsize and self._len():
+        evicted.append(self._pop_victim())
+    self._store(key, value, weight)
+    if self._maxsize is not None:
+      while self._total_weight > self._maxsize:
+        evicted.append(self._pop_victim())
+    return evicted
+
+  def __setitem__(self, key: K, value: V) -> None:
+    with self._lock:
+      evicted = self._expire()
+      evicted += self._put(key, value)
+    self._notify(evicted)
+
+  def __delitem__(self, key: K) -> None:
+    with self._lock:
+      evicted = self._expire()
+      value = self._remove(key)
+    self._notify(evicted)
+    if value is _MISSING:
+      raise KeyError(key)
+
+  def __iter__(self) -> t.Iterator[K]:
+    with self._lock:
+      evicted = self._expire()
+      keys = self._keys()
+    self._notify(evicted)
+    return iter(keys)
+
+  def __len__(self) -> int:
+    with self._lock:
+      evicted = self._expire()
+      result = self._len()
+    self._notify(evicted)
+    return result
+
+  def peek(self, key: K, default: t.Any = None) -> t.Any:
+    """
+    Returns the value for *key* without counting it as an access for the eviction strategy.
+    """
+
+    with self._lock:
+      evicted = self._expire()
+      value = self._peek(key)
+    self._notify(evicted)
+    return default if value is _MISSING else value
+
+  def pop(self, key: K, default: t.Any = _MISSING) -> t.Any:
+    with self._lock:
+      evicted = self._expire()
+      value = self._remove(key)
+    self._notify(evicted)
+    if value is _MISSING:
+      if default is _MISSING:
+        raise KeyError(key)
+      return default
+    return value
+
+  def clear(self) -> None:
+    with self._lock:
+      for key in self._keys():
+        self._remove(key)
+
+  def get_or_set(self, key: K, factory: t.Callable[[], V]) -> V:
+    """
+    Returns the value for *key*, or computes it with *factory* and stores it in the cache. The
+    lock is held while *factory* runs, so concurrent callers for the same cache compute at most
+    one value at a time.
+    """
+
+    with self._lock:
+      evicted = self._expire()
+      value = self._get(key)
+      if value is _MISSING:
+        value = factory()
+        evicted += self._put(key, value)
+    self._notify(evicted)
+    return value
+
+
+class LRUDict(_CacheDict[K, V]):
+  """
+  A cache that evicts the least recently used items first. Reading and writing an item counts
+  as a use.
+  """
+
+  def __init__(
+    self,
+    maxsize: t.Optional[int] = None,
+    weight: t.Optional[_WeightFunc] = None,
+    on_evict: t.Optional[_EvictCallback] = None,
+  ) -> None:
+    super().__init__(maxsize, weight, on_evict)
+    self._data: 'collections.OrderedDict[K, t.Tuple[V, int]]' = collections.OrderedDict()
+
+  def _get(self, key: K) -> t.Any:
+    entry = self._data.get(key)
+    if entry is None:
+      return _MISSING
+    self._data.move_to_end(key)
+    return entry[0]
+
+  def _peek(self, key: K) -> t.Any:
+    entry = self._data.get(key)
+    return _MISSING if entry is None else entry[0]
+
+  def _store(self, key: K, value: V, weight: int) -> None:
+    old = self._data.pop(key, None)
+    if old is not None:
+      self._total_weight -= old[1]
+    self._data[key] = (value, weight)
+    self._total_weight += weight
+
+  def _remove(self, key: K) -> t.Any:
+    entry = self._data.pop(key, None)
+    if entry is None:
+      return _MISSING
+    self._total_weight -= entry[1]
+    return entry[0]
+
+  def _pop_victim(self) -> t.Tuple[K, V]:
+    key, (value, weight) = self._data.popitem(last=False)
+    self._total_weight -= weight
+    return key, value
+
+  def _keys(self) -> t.List[K]:
+    return list(self._data)
+
+  def _len(self) -> int:
+    return len(self._data)
+
+
+class _FrequencyNode:
+  """
+  A node in the doubly linked list of access frequencies used by #LFUDict. The *keys* are kept
+  in insertion order so that ties are broken by evicting the least recently used key.
+  """
+
+  __slots__ = ('frequency', 'keys', 'prev', 'next')
+
+  def __init__(self, frequency: int) -> None:
+    self.frequency = frequency
+    self.keys: 'collections.OrderedDict[t.Any, None]' = collections.OrderedDict()
+    self.prev: '_FrequencyNode' = self
+    self.next: '_FrequencyNode' = self
+
+  def insert_after(self, frequency: int) -> '_FrequencyNode':
+    node = _FrequencyNode(frequency)
+    node.prev, node.next = self, self.next
+    self.next.prev = node
+    self.next = node
+    return node
+
+  def unlink(self) -> None:
+    self.prev.next = self.next
+    self.next.prev = self.prev
+
+
+class LFUDict(_CacheDict[K, V]):
+  """
+  A cache that evicts the least frequently used items first, and among those the least recently
+  used one. Reading and writing an item increments its use count.
+  """
+
+  def __init__(
+    self,
+    maxsize: t.Optional[int] = None,
+    weight: t.Optional[_WeightFunc] = None,
+    on_evict: t.Optional[_EvictCallback] = None,
+  ) -> None:
+    super().__init__(maxsize, weight, on_evict)
+    self._data: t.Dict[K, t.List[t.Any]] = {}  #: Maps to [value, weight, frequency node].
+    self._head = _FrequencyNode(0)
+
+  def _touch(self, key: K, entry: t.List[t.Any]) -> None:
+    node: _FrequencyNode = entry[2]
+    target = node.next
+    if target is self._head or target.frequency != node.frequency + 1:
+      target = node.insert_after(node.frequency + 1)
+    del node.keys[key]
+    target.keys[key] = None
+    entry[2] = target
+    if not node.keys:
+      node.unlink()
+
+  def _get(self, key: K) -> t.Any:
+    entry = self._data.get(key)
+    if entry is None:
+      return _MISSING
+    self._touch(key, entry)
+    return entry[0]
+
+  def _peek(self, key: K) -> t.Any:
+    entry = self._data.get(key)
+    return _MISSING if entry is None else entry[0]
+
+  def _store(self, key: K, value: V, weight: int) -> None:
+    entry = self._data.get(key)
+    if entry is not None:
+      self._total_weight += weight - entry[1]
+      entry[0], entry[1] = value, weight
+      self._touch(key, entry)
+      return
+    node = self._head.next
+    if node is self._head or node.frequency != 1:
+      node = self._head.insert_after(1)
+    node.keys[key] = None
+    self._data[key] = [value, weight, node]
+    self._total_weight += weight
+
+  def _remove(self, key: K) -> t.Any:
+    entry = self._data.pop(key, None)
+    if entry is None:
+      return _MISSING
+    node: _FrequencyNode = entry[2]
+    del node.keys[key]
+    if not node.keys:
+      node.unlink()
+    self._total_weight -= entry[1]
+    return entry[0]
+
+  def _pop_victim(self) -> t.Tuple[K, V]:
+    node = self._head.next
+    key = next(iter(node.keys))
+    return key, self._remove(key)
+
+  def _keys(self) -> t.List[K]:
+    return list(self._data)
+
+  def _len(self) -> int:
+    return len(self._data)
+
+  def frequency(self, key: K) -> int:
+    """
+    Returns the use count of *key*, or `0` if it is not in the cache.
+    """
+
+    with self._lock:
+      entry = self._data.get(key)
+      return 0 if entry is None else entry[2].frequency
+
+
+class TTLDict(_CacheDict[K, V]):
+  """
+  A cache in which items expire *ttl* seconds after they were last written. If the *maxsize*
+  budget is exceeded, the items closest to expiring are evicted first. Reading an item does not
+  extend its lifetime.
+
+  The *timer* defaults to #time.monotonic() and can be replaced for testing.
+  """
+
+  def __init__(
+    self,
+    ttl: float,
+    maxsize: t.Optional[int] = None,
+    weight: t.Optional[_WeightFunc] = None,
+    on_evict: t.Optional[_EvictCallback] = None,
+    timer: t.Callable[[], float] = time.monotonic,
+  ) -> None:
+    if ttl <= 0:
+      raise ValueError('ttl must be > 0, got {!r}'.format(ttl))
+    super().__init__(maxsize, weight, on_evict)
+    self._ttl = ttl
+    self._timer = timer
+    #: Ordered by expiration time, as every write moves the item to the end.
+    self._data: 'collections.OrderedDict[K, t.Tuple[V, int, float]]' = collections.OrderedDict()
+
+  @property
+  def ttl(self) -> float:
+    return self._ttl
+
+  def _expire(self) -> t.List[t.Tuple[K, V]]:
+    evicted = []
+    data = self._data
+    if data:
+      now = self._timer()
+      while data:
+        key, (value, weight, expires_at) = next(iter(data.items()))
+        if expires_at > now:
+          break
+        del data[key]
+        self._total_weight -= weight
+        evicted.append((key, value))
+    return evicted
+
+  def _get(self, key: K) -> t.Any:
+    return self._peek(key)
+
+  def _peek(self, key: K) -> t.Any:
+    entry = self._data.get(key)
+    return _MISSING if entry is None else entry[0]
+
+  def _store(self, key: K, value: V, weight: int) -> None:
+    old = self._data.pop(key, None)
+    if old is not None:
+      self._total_weight -= old[1]
+    self._data[key] = (value, weight, self._timer() + self._ttl)
+    self._total_weight += weight
+
+  def _remove(self, key: K) -> t.Any:
+    entry = self._data.pop(key, None)
+    if entry is None:
+      return _MISSING
+    self._total_weight -= entry[1]
+    return entry[0]
+
+  def _pop_victim(self) -> t.Tuple[K, V]:
+    key, (value, weight, _) = self._data.popitem(last=False)
+    self._total_weight -= weight
+    return key, value
+
+  def _keys(self) -> t.List[K]:
+    return list(self._data)
+
+  def _len(self) -> int:
+    return len(self._data)
+
+  def expire(self) -> None:
+    """
+    Removes all expired items. This happens implicitly on every access to the cache.
+    """
+
+    with self._lock:
+      evicted = self._expire()
+    self._notify(evicted)
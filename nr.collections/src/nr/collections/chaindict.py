@@ -36,15 +36,75 @@ class ChainDict(t.MutableMapping[K, V]):
   A dictionary that wraps a list of dictionaries. The dictionaries passed
   into the #ChainDict will not be mutated. Setting and deleting values will
   happen on the first dictionary passed.
+
+  By default, every lookup, iteration and #len() call walks the wrapped
+  dictionaries, so the #ChainDict always reflects their current state. If
+  *cached* is enabled, a merged key index is built on first access that
+  maps every visible key to the dictionary that provides its value, making
+  #len(), `in`, lookups and iteration O(1) amortized. Mutations through the
+  #ChainDict update the index in place. Wrapped dictionaries that have a
+  `version` attribute (e.g. another #ChainDict) are checked for changes on
+  every access and the index is rebuilt when their version changed. Other
+  wrapped dictionaries are not watched, so mutating them directly must be
+  followed by a call to #invalidate(), otherwise the #ChainDict keeps
+  returning the keys and layers it has seen before.
   """
 
-  def __init__(self, main: t.MutableMapping[K, V], *others: t.Mapping[K, V]) -> None:
+  def __init__(self, main: t.MutableMapping[K, V], *others: t.Mapping[K, V], cached: bool = False) -> None:
     self._major = main
     self._dicts: t.List[t.Mapping[K, V]] = [t.cast(t.Mapping[K, V], main)] + list(others)
     self._deleted: t.Set[K] = set()
     self._in_repr = False
+    self._cached = cached
+    self._index: t.Optional[t.Dict[K, int]] = None
+    self._versioned = [d for d in self._dicts if hasattr(d, 'version')]
+    self._stamp: t.List[int] = []
+    self._version = 0
+
+  @property
+  def cached(self) -> bool:
+    return self._cached
+
+  @property
+  def version(self) -> int:
+    """
+    A counter that is incremented on every mutation through the #ChainDict and every time the
+    cached key index is invalidated.
+    """
+
+    return self._version
+
+  def invalidate(self) -> None:
+    """
+    Drop the cached key index. It will be rebuilt on the next access. This needs to be called
+    after a wrapped dictionary without a `version` attribute was mutated directly when the
+    #ChainDict is *cached*.
+    """
+
+    self._index = None
+    self._version += 1
+
+  def _get_index(self) -> t.Dict[K, int]:
+    index = self._index
+    if index is not None and self._versioned:
+      stamp = [d.version for d in self._versioned]  # type: ignore
+      if stamp != self._stamp:
+        index = None
+    if index is None:
+      index = {}
+      for i, d in enumerate(self._dicts):
+        for key in d.keys():
+          if key not in index and key not in self._deleted:
+            index[key] = i
+      if self._index is not None:
+        self._version += 1
+      self._index = index
+      self._stamp = [d.version for d in self._versioned]  # type: ignore
+    return index
 
   def __contains__(self, key: t.Any) -> bool:
+    if self._cached:
+      return key in self._get_index()
     if key not in self._deleted:
       for d in self._dicts:
         if key in d:
@@ -52,6 +112,11 @@ class ChainDict(t.MutableMapping[K, V]):
     return False
 
   def __getitem__(self, key: K) -> V:
+    if self._cached:
+      index = self._get_index()
+      if key in index:
+        return self._dicts[index[key]][key]
+      raise KeyError(key)
     if key not in self._deleted:
       for d in self._dicts:
         try: return d[key]
@@ -61,6 +126,9 @@ class ChainDict(t.MutableMapping[K, V]):
   def __setitem__(self, key: K, value: V) -> None:
     self._major[key] = value
     self._deleted.discard(key)
+    if self._index is not None:
+      self._index[key] = 0
+    self._version += 1
 
   def __delitem__(self, key: K) -> None:
     if key not in self:
@@ -68,11 +136,16 @@ class ChainDict(t.MutableMapping[K, V]):
     try: self._major.pop(key)
     except KeyError: pass
     self._deleted.add(key)
+    if self._index is not None:
+      self._index.pop(key, None)
+    self._version += 1
 
   def __iter__(self) -> t.Iterator[K]:
     return self.keys()
 
   def __len__(self) -> int:
+    if self._cached:
+      return len(self._get_index())
     return sum(1 for x in self.keys())
 
   def __repr__(self) -> str:
@@ -124,20 +197,29 @@ class ChainDict(t.MutableMapping[K, V]):
     if self._major:
       key, value = self._major.popitem()
       self._deleted.add(key)
+      if self._index is not None:
+        self._index.pop(key, None)
+      self._version += 1
       return key, value
     for d in self._dicts:
       for key in d.keys():
         if key not in self._deleted:
           self._deleted.add(key)
+          if self._index is not None:
+            self._index.pop(key, None)
+          self._version += 1
           return key, d[key]
     raise KeyError('popitem(): dictionary is empty')
 
   def clear(self) -> None:
     self._major.clear()
     self._deleted.update(self.keys())
+    if self._index is not None:
+      self._index.clear()
+    self._version += 1
 
   def copy(self: T_ChainDict) -> T_ChainDict:
-    return type(self)(self._major, *self._dicts[1:])
+    return type(self)(self._major, *self._dicts[1:], cached=self._cached)
 
   def setdefault(self, key: K, value: V) -> V:  # type: ignore  # TODO (NiklasRosenstein)
     try:
@@ -158,6 +240,9 @@ class ChainDict(t.MutableMapping[K, V]):
         self[k] = v
 
   def keys(self):
+    if self._cached:
+      yield from self._get_index()
+      return
     seen = set()
     for d in self._dicts:
       for key in d.keys():
@@ -166,6 +251,11 @@ class ChainDict(t.MutableMapping[K, V]):
           seen.add(key)
 
   def values(self):
+    if self._cached:
+      dicts = self._dicts
+      for key, i in self._get_index().items():
+        yield dicts[i][key]
+      return
     seen = set()
     for d in self._dicts:
       for key, value in d.items():
@@ -174,6 +264,11 @@ class ChainDict(t.MutableMapping[K, V]):
           seen.add(key)
 
   def items(self):
+    if self._cached:
+      dicts = self._dicts
+      for key, i in self._get_index().items():
+        yield key, dicts[i][key]
+      return
     seen = set()
     for d in self._dicts:
       for key, value in d.items():
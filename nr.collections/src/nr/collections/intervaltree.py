@@ -0,0 +1,321 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+An interval tree for finding all intervals that contain a point or overlap with a range in
+O(log n + k). It is implemented as a treap ordered by the interval bounds, in which every node
+additionally tracks the greatest end of all intervals in its subtree.
+"""
+
+import random
+import typing as t
+
+__all__ = ['Interval', 'IntervalTree']
+
+
+class Interval(t.NamedTuple):
+  """
+  A half-open interval `[begin, end)` with an optional *data* payload.
+  """
+
+  begin: t.Any
+  end: t.Any
+  data: t.Any = None
+
+  def contains_point(self, point: t.Any) -> bool:
+    return self.begin <= point < self.end
+
+  def overlaps(self, begin: t.Any, end: t.Any) -> bool:
+    return self.begin < end and begin < self.end
+
+
+class _Node:
+
+  __slots__ = ('interval', 'key', 'priority', 'max_end', 'left', 'right')
+
+  def __init__(self, interval: Interval, priority: float) -> None:
+    self.interval = interval
+    self.key = (interval.begin, interval.end)
+    self.priority = priority
+    self.max_end = interval.end
+    self.left: t.Optional[_Node] = None
+    self.right: t.Optional[_Node] = None
+
+  def update(self) -> None:
+    max_end = self.interval.end
+    if self.left is not None and self.left.max_end > max_end:
+      max_end = self.left.max_end
+    if self.right is not None and self.right.max_end > max_end:
+      max_end = self.right.max_end
+    self.max_end = max_end
+
+
+def _split(node: t.Optional[_Node], key: t.Tuple[t.Any, t.Any], inclusive: bool) -> t.Tuple[t.Optional[_Node], t.Optional[_Node]]:
+  """
+  Splits the tree into nodes with keys less than *key* (or equal to, if *inclusive*) and the
+  rest.
+  """
+
+  if node is None:
+    return None, None
+  if node.key < key or (inclusive and node.key == key):
+    left, right = _split(node.right, key, inclusive)
+    node.right = left
+    node.update()
+    return node, right
+  left, right = _split(node.left, key, inclusive)
+  node.left = right
+  node.update()
+  return left, node
+
+
+def _merge(left: t.Optional[_Node], right: t.Optional[_Node]) -> t.Optional[_Node]:
+  """
+  Merges two trees where all keys in *left* are less than or equal to the keys in *right*.
+  """
+
+  if left is None:
+    return right
+  if right is None:
+    return left
+  if left.priority > right.priority:
+    left.right = _merge(left.right, right)
+    left.update()
+    return left
+  right.left = _merge(left, right.left)
+  right.update()
+  return right
+
+
+def _iter_nodes(node: t.Optional[_Node]) -> t.Iterator[_Node]:
+  stack: t.List[_Node] = []
+  while stack or node is not None:
+    if node is not None:
+      stack.append(node)
+      node = node.left
+    else:
+      node = stack.pop()
+      yield node
+      node = node.right
+
+
+def _iter_post_order(node: t.Optional[_Node]) -> t.Iterator[_Node]:
+  stack: t.List[t.Tuple[_Node, bool]] = []
+  if node is not None:
+    stack.append((node, False))
+  while stack:
+    node, visited = stack.pop()
+    if visited:
+      yield node
+      continue
+    stack.append((node, True))
+    if node.right is not None:
+      stack.append((node.right, False))
+    if node.left is not None:
+      stack.append((node.left, False))
+
+
+class IntervalTree(t.Collection[Interval]):
+  """
+  A collection of #Interval objects. The same interval may be added more than once.
+
+  Constructing the tree from an iterable builds it in one pass over the sorted intervals, which
+  is O(n) for input that is already sorted by `(begin, end)`.
+
+  ```py
+  tree = IntervalTree([Interval(0, 10, 'a'), Interval(5, 15, 'b')])
+  assert sorted(iv.data for iv in tree.at(7)) == ['a', 'b']
+  assert [iv.data for iv in tree.overlap(10, 20)] == ['b']
+  ```
+  """
+
+  def __init__(self, intervals: t.Optional[t.Iterable[t.Union[Interval, t.Tuple[t.Any, ...]]]] = None) -> None:
+    self._root: t.Optional[_Node] = None
+    self._len = 0
+    self._random = random.Random()
+    if intervals is not None:
+      self.update(intervals)
+
+  def __repr__(self) -> str:
+    return '{}({!r})'.format(type(self).__name__, list(self))
+
+  def __len__(self) -> int:
+    return self._len
+
+  def __iter__(self) -> t.Iterator[Interval]:
+    for node in _iter_nodes(self._root):
+      yield node.interval
+
+  def __contains__(self, interval: t.Any) -> bool:
+    if not isinstance(interval, tuple):
+      return False
+    interval = Interval(*interval)
+    return any(iv == interval for iv in self._equal_range(interval))
+
+  def _equal_range(self, interval: Interval) -> t.Iterator[Interval]:
+    key = (interval.begin, interval.end)
+    node = self._root
+    while node is not None and node.key != key:
+      node = node.left if key < node.key else node.right
+    if node is None:
+      return
+    # Nodes with an equal key may be in either subtree of the first match.
+    stack = [node]
+    while stack:
+      node = stack.pop()
+      if node is None:
+        continue
+      if node.key == key:
+        yield node.interval
+        stack.append(node.left)
+        stack.append(node.right)
+      elif node.key < key:
+        stack.append(node.right)
+      else:
+        stack.append(node.left)
+
+  @staticmethod
+  def _coerce(interval: t.Union[Interval, t.Tuple[t.Any, ...]]) -> Interval:
+    if not isinstance(interval, Interval):
+      interval = Interval(*interval)
+    if not interval.begin < interval.end:
+      raise ValueError('interval begin must be less than end, got {!r}'.format(interval))
+    return interval
+
+  def add(self, interval: t.Union[Interval, t.Tuple[t.Any, ...]]) -> None:
+    interval = self._coerce(interval)
+    node = _Node(interval, self._random.random())
+    left, right = _split(self._root, node.key, True)
+    self._root = _merge(_merge(left, node), right)
+    self._len += 1
+
+  def addi(self, begin: t.Any, end: t.Any, data: t.Any = None) -> None:
+    self.add(Interval(begin, end, data))
+
+  def update(self, intervals: t.Iterable[t.Union[Interval, t.Tuple[t.Any, ...]]]) -> None:
+    """
+    Adds all *intervals*. If the tree is empty, it is built in a single pass.
+    """
+
+    if self._root is not None:
+      for interval in intervals:
+        self.add(interval)
+      return
+
+    nodes = [_Node(self._coerce(x), self._random.random()) for x in intervals]
+    nodes.sort(key=lambda n: n.key)
+
+    # Build a treap (a cartesian tree over the priorities) from the sorted nodes.
+    stack: t.List[_Node] = []
+    for node in nodes:
+      last = None
+      while stack and stack[-1].priority < node.priority:
+        last = stack.pop()
+      node.left = last
+      if stack:
+        stack[-1].right = node
+      stack.append(node)
+
+    root = stack[0] if stack else None
+    for node in _iter_post_order(root):
+      node.update()
+    self._root = root
+    self._len = len(nodes)
+
+  def remove(self, interval: t.Union[Interval, t.Tuple[t.Any, ...]]) -> None:
+    """
+    Removes one occurrence of *interval*. Raises a #ValueError if it is not in the tree.
+    """
+
+    interval = Interval(*interval)
+    key = (interval.begin, interval.end)
+    left, rest = _split(self._root, key, False)
+    middle, right = _split(rest, key, True)
+    equal = [node.interval for node in _iter_nodes(middle)]
+    try:
+      equal.remove(interval)
+    except ValueError:
+      self._root = _merge(_merge(left, middle), right)
+      raise ValueError('{!r} not in {}'.format(interval, type(self).__name__))
+    middle = None
+    for iv in equal:
+      middle = _merge(middle, _Node(iv, self._random.random()))
+    self._root = _merge(_merge(left, middle), right)
+    self._len -= 1
+
+  def discard(self, interval: t.Union[Interval, t.Tuple[t.Any, ...]]) -> None:
+    try:
+      self.remove(interval)
+    except ValueError:
+      pass
+
+  def clear(self) -> None:
+    self._root = None
+    self._len = 0
+
+  def _search(self, begin: t.Any, end: t.Any, point: bool) -> t.Iterator[Interval]:
+    # Intervals are half-open, so an interval overlaps with a point if begin <= point < end,
+    # and with a range if interval.begin < end and begin < interval.end.
+    stack = [self._root]
+    while stack:
+      node = stack.pop()
+      if node is None or not node.max_end > begin:
+        continue
+      iv = node.interval
+      in_range = iv.begin <= end if point else iv.begin < end
+      if in_range:
+        stack.append(node.right)
+        if iv.end > begin:
+          yield iv
+      stack.append(node.left)
+
+  def at(self, point: t.Any) -> t.List[Interval]:
+    """
+    Returns all intervals that contain *point*, in no particular order.
+    """
+
+    return list(self._search(point, point, True))
+
+  def overlap(self, begin: t.Any, end: t.Any) -> t.List[Interval]:
+    """
+    Returns all intervals that overlap with the half-open range `[begin, end)`, in no particular
+    order.
+    """
+
+    return list(self._search(begin, end, False))
+
+  def envelop(self, begin: t.Any, end: t.Any) -> t.List[Interval]:
+    """
+    Returns all intervals that lie completely within `[begin, end)`.
+    """
+
+    return [iv for iv in self._search(begin, end, False) if begin <= iv.begin and iv.end <= end]
+
+  def remove_overlap(self, begin: t.Any, end: t.Any) -> t.List[Interval]:
+    """
+    Removes and returns all intervals that overlap with `[begin, end)`.
+    """
+
+    removed = self.overlap(begin, end)
+    for interval in removed:
+      self.remove(interval)
+    return removed
+
@@ -0,0 +1,438 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+An immutable mapping implemented as a hash array mapped trie (HAMT). Updates return a new
+#PersistentMap that shares all unchanged nodes with the original, so deriving a variant of a
+large mapping costs O(log32 n) time and memory per changed key.
+"""
+
+import typing as t
+
+__all__ = ['PersistentMap', 'TransientMap']
+
+K = t.TypeVar('K')
+V = t.TypeVar('V')
+T = t.TypeVar('T')
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_NODE = object()  #: Marks a slot in a node array that holds a sub node instead of a key.
+_MISSING = object()
+
+
+def _hash(key: t.Any) -> int:
+  return hash(key) & 0xFFFFFFFF
+
+
+def _popcount(value: int) -> int:
+  return bin(value).count('1')
+
+
+class _BitmapNode:
+  """
+  A trie node that stores up to 32 entries in a compact array of alternating keys and values.
+  The *bitmap* indicates which of the 32 possible slots on this level are occupied. A slot may
+  hold a sub node, in which case the key in the array is #_NODE.
+
+  Nodes are only ever mutated in place if their *owner* matches the owner of the edit, which
+  is only the case for nodes created by the same #TransientMap.
+  """
+
+  __slots__ = ('bitmap', 'array', 'owner')
+
+  def __init__(self, bitmap: int, array: t.List[t.Any], owner: t.Optional[object]) -> None:
+    self.bitmap = bitmap
+    self.array = array
+    self.owner = owner
+
+  def _editable(self, owner: t.Optional[object]) -> '_BitmapNode':
+    if owner is not None and self.owner is owner:
+      return self
+    return _BitmapNode(self.bitmap, list(self.array), owner)
+
+  def find(self, shift: int, hash_: int, key: t.Any, default: t.Any) -> t.Any:
+    bit = 1 << ((hash_ >> shift) & _MASK)
+    if not self.bitmap & bit:
+      return default
+    idx = 2 * _popcount(self.bitmap & (bit - 1))
+    k = self.array[idx]
+    if k is _NODE:
+      return self.array[idx + 1].find(shift + _BITS, hash_, key, default)
+    if k is key or k == key:
+      return self.array[idx + 1]
+    return default
+
+  def assoc(self, shift: int, hash_: int, key: t.Any, value: t.Any, owner: t.Optional[object], added: t.List[bool]) -> '_Node':
+    bit = 1 << ((hash_ >> shift) & _MASK)
+    idx = 2 * _popcount(self.bitmap & (bit - 1))
+
+    if not self.bitmap & bit:
+      added[0] = True
+      node = self._editable(owner)
+      node.array[idx:idx] = [key, value]
+      node.bitmap |= bit
+      return node
+
+    k, v = self.array[idx], self.array[idx + 1]
+    if k is _NODE:
+      sub = v.assoc(shift + _BITS, hash_, key, value, owner, added)
+      if sub is v:
+        return self
+      node = self._editable(owner)
+      node.array[idx + 1] = sub
+      return node
+
+    if k is key or k == key:
+      if v is value:
+        return self
+      node = self._editable(owner)
+      node.array[idx + 1] = value
+      return node
+
+    added[0] = True
+    node = self._editable(owner)
+    node.array[idx] = _NODE
+    node.array[idx + 1] = _create_node(shift + _BITS, k, v, hash_, key, value, owner)
+    return node
+
+  def without(self, shift: int, hash_: int, key: t.Any, owner: t.Optional[object], removed: t.List[bool]) -> t.Optional['_Node']:
+    bit = 1 << ((hash_ >> shift) & _MASK)
+    if not self.bitmap & bit:
+      return self
+    idx = 2 * _popcount(self.bitmap & (bit - 1))
+
+    k, v = self.array[idx], self.array[idx + 1]
+    if k is _NODE:
+      sub = v.without(shift + _BITS, hash_, key, owner, removed)
+      if sub is v:
+        return self
+      if sub is not None:
+        node = self._editable(owner)
+        node.array[idx + 1] = sub
+        return node
+    elif k is key or k == key:
+      removed[0] = True
+    else:
+      return self
+
+    if self.bitmap == bit:
+      return None
+    node = self._editable(owner)
+    del node.array[idx:idx + 2]
+    node.bitmap ^= bit
+    return node
+
+  def iter_items(self) -> t.Iterator[t.Tuple[t.Any, t.Any]]:
+    array = self.array
+    for idx in range(0, len(array), 2):
+      k = array[idx]
+      if k is _NODE:
+        yield from array[idx + 1].iter_items()
+      else:
+        yield k, array[idx + 1]
+
+
+class _CollisionNode:
+  """
+  Holds keys whose 32-bit hashes are identical. Lookups in this node are linear, but such
+  nodes are rare and small in practice.
+  """
+
+  __slots__ = ('hash', 'array', 'owner')
+
+  def __init__(self, hash_: int, array: t.List[t.Any], owner: t.Optional[object]) -> None:
+    self.hash = hash_
+    self.array = array
+    self.owner = owner
+
+  def _editable(self, owner: t.Optional[object]) -> '_CollisionNode':
+    if owner is not None and self.owner is owner:
+      return self
+    return _CollisionNode(self.hash, list(self.array), owner)
+
+  def _index_of(self, key: t.Any) -> int:
+    array = self.array
+    for idx in range(0, len(array), 2):
+      if array[idx] is key or array[idx] == key:
+        return idx
+    return -1
+
+  def find(self, shift: int, hash_: int, key: t.Any, default: t.Any) -> t.Any:
+    idx = self._index_of(key)
+    if idx < 0:
+      return default
+    return self.array[idx + 1]
+
+  def assoc(self, shift: int, hash_: int, key: t.Any, value: t.Any, owner: t.Optional[object], added: t.List[bool]) -> '_Node':
+    if hash_ != self.hash:
+      parent = _BitmapNode(1 << ((self.hash >> shift) & _MASK), [_NODE, self], owner)
+      return parent.assoc(shift, hash_, key, value, owner, added)
+    idx = self._index_of(key)
+    if idx >= 0:
+      if self.array[idx + 1] is value:
+        return self
+      node = self._editable(owner)
+      node.array[idx + 1] = value
+      return node
+    added[0] = True
+    node = self._editable(owner)
+    node.array += [key, value]
+    return node
+
+  def without(self, shift: int, hash_: int, key: t.Any, owner: t.Optional[object], removed: t.List[bool]) -> t.Optional['_Node']:
+    idx = self._index_of(key)
+    if idx < 0:
+      return self
+    removed[0] = True
+    if len(self.array) == 2:
+      return None
+    node = self._editable(owner)
+    del node.array[idx:idx + 2]
+    return node
+
+  def iter_items(self) -> t.Iterator[t.Tuple[t.Any, t.Any]]:
+    array = self.array
+    for idx in range(0, len(array), 2):
+      yield array[idx], array[idx + 1]
+
+
+_Node = t.Union[_BitmapNode, _CollisionNode]
+
+
+def _create_node(shift: int, key1: t.Any, value1: t.Any, hash2: int, key2: t.Any, value2: t.Any, owner: t.Optional[object]) -> _Node:
+  hash1 = _hash(key1)
+  if hash1 == hash2:
+    return _CollisionNode(hash1, [key1, value1, key2, value2], owner)
+  added = [False]
+  node: _Node = _BitmapNode(0, [], owner)
+  node = node.assoc(shift, hash1, key1, value1, owner, added)
+  return node.assoc(shift, hash2, key2, value2, owner, added)
+
+
+class PersistentMap(t.Mapping[K, V]):
+  """
+  An immutable mapping with structural sharing. Use #set(), #delete() and #update() to derive
+  new maps. Many changes at once are best applied through a #TransientMap, which mutates the
+  nodes it creates in place instead of copying them for every change.
+
+  ```py
+  base = PersistentMap({'debug': False, 'workers': 4})
+  variant = base.set('debug', True)
+  assert base['debug'] is False and variant['debug'] is True
+  ```
+  """
+
+  __slots__ = ('_root', '_count', '_hash')
+
+  def __init__(self, mapping: t.Union[t.Mapping[K, V], t.Iterable[t.Tuple[K, V]], None] = None, **kwargs: V) -> None:
+    self._root: t.Optional[_Node] = None
+    self._count = 0
+    self._hash: t.Optional[int] = None
+    if mapping is not None or kwargs:
+      transient: TransientMap[K, V] = TransientMap()
+      if mapping is not None:
+        transient.update(mapping)
+      transient.update(kwargs)  # type: ignore
+      self._root, self._count = transient._root, transient._count
+
+  @classmethod
+  def _make(cls, root: t.Optional[_Node], count: int) -> 'PersistentMap[K, V]':
+    self = object.__new__(cls)
+    self._root = root
+    self._count = count
+    self._hash = None
+    return self
+
+  def __repr__(self) -> str:
+    return '{}({!r})'.format(type(self).__name__, dict(self.items()))
+
+  def __getitem__(self, key: K) -> V:
+    if self._root is not None:
+      value = self._root.find(0, _hash(key), key, _MISSING)
+      if value is not _MISSING:
+        return value
+    raise KeyError(key)
+
+  def __contains__(self, key: t.Any) -> bool:
+    if self._root is None:
+      return False
+    return self._root.find(0, _hash(key), key, _MISSING) is not _MISSING
+
+  def __iter__(self) -> t.Iterator[K]:
+    for key, _ in self.items():
+      yield key
+
+  def __len__(self) -> int:
+    return self._count
+
+  def __eq__(self, other: t.Any) -> bool:
+    if self is other:
+      return True
+    if isinstance(other, PersistentMap) and self._root is other._root:
+      return True
+    return super().__eq__(other)
+
+  def __hash__(self) -> int:
+    if self._hash is None:
+      self._hash = hash(frozenset(self.items()))
+    return self._hash
+
+  def __reduce__(self) -> t.Tuple[t.Any, ...]:
+    return (type(self), (dict(self.items()),))
+
+  def get(self, key: K, default: t.Any = None) -> t.Any:
+    if self._root is None:
+      return default
+    return self._root.find(0, _hash(key), key, default)
+
+  def items(self):  # type: ignore
+    if self._root is not None:
+      yield from self._root.iter_items()
+
+  def values(self):  # type: ignore
+    for _, value in self.items():
+      yield value
+
+  def set(self, key: K, value: V) -> 'PersistentMap[K, V]':
+    """
+    Returns a new map in which *key* is associated with *value*.
+    """
+
+    added = [False]
+    root: _Node = self._root or _BitmapNode(0, [], None)
+    new_root = root.assoc(0, _hash(key), key, value, None, added)
+    if new_root is self._root:
+      return self
+    return self._make(new_root, self._count + added[0])
+
+  def delete(self, key: K) -> 'PersistentMap[K, V]':
+    """
+    Returns a new map without *key*. Raises a #KeyError if the key does not exist.
+    """
+
+    removed = [False]
+    if self._root is not None:
+      new_root = self._root.without(0, _hash(key), key, None, removed)
+    if not removed[0]:
+      raise KeyError(key)
+    return self._make(new_root, self._count - 1)
+
+  def discard(self, key: K) -> 'PersistentMap[K, V]':
+    """
+    Like #delete(), but returns the same map if *key* does not exist.
+    """
+
+    try:
+      return self.delete(key)
+    except KeyError:
+      return self
+
+  def update(self, *mappings: t.Union[t.Mapping[K, V], t.Iterable[t.Tuple[K, V]]], **kwargs: V) -> 'PersistentMap[K, V]':
+    """
+    Returns a new map with the items from *mappings* and *kwargs* added.
+    """
+
+    transient = self.transient()
+    for mapping in mappings:
+      transient.update(mapping)
+    transient.update(kwargs)  # type: ignore
+    return transient.persistent()
+
+  def transient(self) -> 'TransientMap[K, V]':
+    """
+    Returns a #TransientMap that starts with the contents of this map. This map is not affected
+    by changes to the transient.
+    """
+
+    return TransientMap._make(self._root, self._count)
+
+
+class TransientMap(t.MutableMapping[K, V]):
+  """
+  A mutable builder for a #PersistentMap. It shares the nodes of the map that it was created
+  from and copies a node only the first time it is changed; subsequent changes to the same node
+  happen in place. #persistent() returns a #PersistentMap snapshot in O(1), after which the
+  transient can continue to be used without affecting the snapshot.
+  """
+
+  def __init__(self, mapping: t.Union[t.Mapping[K, V], t.Iterable[t.Tuple[K, V]], None] = None) -> None:
+    self._root: t.Optional[_Node] = None
+    self._count = 0
+    self._owner = object()
+    if mapping is not None:
+      self.update(mapping)
+
+  @classmethod
+  def _make(cls, root: t.Optional[_Node], count: int) -> 'TransientMap[K, V]':
+    self = cls()
+    self._root = root
+    self._count = count
+    return self
+
+  def __repr__(self) -> str:
+    return '{}({!r})'.format(type(self).__name__, dict(self.items()))
+
+  def __getitem__(self, key: K) -> V:
+    if self._root is not None:
+      value = self._root.find(0, _hash(key), key, _MISSING)
+      if value is not _MISSING:
+        return value
+    raise KeyError(key)
+
+  def __contains__(self, key: t.Any) -> bool:
+    if self._root is None:
+      return False
+    return self._root.find(0, _hash(key), key, _MISSING) is not _MISSING
+
+  def __setitem__(self, key: K, value: V) -> None:
+    added = [False]
+    root: _Node = self._root or _BitmapNode(0, [], self._owner)
+    self._root = root.assoc(0, _hash(key), key, value, self._owner, added)
+    self._count += added[0]
+
+  def __delitem__(self, key: K) -> None:
+    removed = [False]
+    if self._root is not None:
+      self._root = self._root.without(0, _hash(key), key, self._owner, removed)
+    if not removed[0]:
+      raise KeyError(key)
+    self._count -= 1
+
+  def __iter__(self) -> t.Iterator[K]:
+    for key, _ in self.items():
+      yield key
+
+  def __len__(self) -> int:
+    return self._count
+
+  def items(self):  # type: ignore
+    if self._root is not None:
+      yield from self._root.iter_items()
+
+  def persistent(self) -> PersistentMap[K, V]:
+    """
+    Returns a #PersistentMap with the current contents of the transient.
+    """
+
+    # Nodes owned by the previous owner now belong to the snapshot; future edits must copy them.
+    self._owner = object()
+    return PersistentMap._make(self._root, self._count)
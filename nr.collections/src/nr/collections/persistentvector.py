@@ -0,0 +1,374 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+An immutable sequence implemented as a 32-way trie with a tail buffer. Appending, replacing and
+popping elements returns a new #PersistentVector in O(log32 n) that shares all unchanged nodes
+with the original.
+"""
+
+import typing as t
+
+__all__ = ['PersistentVector', 'TransientVector']
+
+T = t.TypeVar('T')
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+
+class _Node:
+  """
+  An inner or leaf node of the trie. Leaf nodes hold exactly 32 elements, inner nodes hold up to
+  32 child nodes. A node is only mutated in place if its *owner* matches the owner of the edit.
+  """
+
+  __slots__ = ('array', 'owner')
+
+  def __init__(self, array: t.List[t.Any], owner: t.Optional[object]) -> None:
+    self.array = array
+    self.owner = owner
+
+  def editable(self, owner: t.Optional[object]) -> '_Node':
+    if owner is not None and self.owner is owner:
+      return self
+    return _Node(list(self.array), owner)
+
+
+_EMPTY_NODE = _Node([], None)
+
+
+def _tailoff(count: int) -> int:
+  if count < _WIDTH:
+    return 0
+  return ((count - 1) >> _BITS) << _BITS
+
+
+def _new_path(level: int, node: _Node, owner: t.Optional[object]) -> _Node:
+  while level > 0:
+    node = _Node([node], owner)
+    level -= _BITS
+  return node
+
+
+def _push_tail(count: int, level: int, parent: _Node, tail_node: _Node, owner: t.Optional[object]) -> _Node:
+  subidx = ((count - 1) >> level) & _MASK
+  node = parent.editable(owner)
+  if level == _BITS:
+    insert = tail_node
+  elif subidx < len(parent.array):
+    insert = _push_tail(count, level - _BITS, parent.array[subidx], tail_node, owner)
+  else:
+    insert = _new_path(level - _BITS, tail_node, owner)
+  if subidx < len(node.array):
+    node.array[subidx] = insert
+  else:
+    node.array.append(insert)
+  return node
+
+
+def _pop_tail(count: int, level: int, node: _Node, owner: t.Optional[object]) -> t.Optional[_Node]:
+  subidx = ((count - 2) >> level) & _MASK
+  if level > _BITS:
+    child = _pop_tail(count, level - _BITS, node.array[subidx], owner)
+    if child is None and subidx == 0:
+      return None
+    result = node.editable(owner)
+    if child is None:
+      del result.array[subidx]
+    else:
+      result.array[subidx] = child
+    return result
+  if subidx == 0:
+    return None
+  result = node.editable(owner)
+  del result.array[subidx]
+  return result
+
+
+def _assoc(level: int, node: _Node, index: int, value: t.Any, owner: t.Optional[object]) -> _Node:
+  result = node.editable(owner)
+  if level == 0:
+    result.array[index & _MASK] = value
+  else:
+    subidx = (index >> level) & _MASK
+    result.array[subidx] = _assoc(level - _BITS, node.array[subidx], index, value, owner)
+  return result
+
+
+class _VectorBase(t.Sequence[T]):
+
+  __slots__ = ()
+
+  _count: int
+  _shift: int
+  _root: _Node
+  _tail: t.List[T]
+
+  def _array_for(self, index: int) -> t.List[T]:
+    if index >= _tailoff(self._count):
+      return self._tail
+    node = self._root
+    level = self._shift
+    while level > 0:
+      node = node.array[(index >> level) & _MASK]
+      level -= _BITS
+    return node.array
+
+  def _normalize_index(self, index: int) -> int:
+    if index < 0:
+      index += self._count
+    if index < 0 or index >= self._count:
+      raise IndexError('{} index out of range'.format(type(self).__name__))
+    return index
+
+  def __repr__(self) -> str:
+    return '{}({!r})'.format(type(self).__name__, list(self))
+
+  def __len__(self) -> int:
+    return self._count
+
+  @t.overload
+  def __getitem__(self, index: int) -> T: ...
+
+  @t.overload
+  def __getitem__(self, index: slice) -> t.List[T]: ...
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(self._count))]
+    index = self._normalize_index(index)
+    return self._array_for(index)[index & _MASK]
+
+  def __iter__(self) -> t.Iterator[T]:
+    for start in range(0, self._count, _WIDTH):
+      yield from self._array_for(start)
+
+
+class PersistentVector(_VectorBase[T]):
+  """
+  An immutable sequence with structural sharing. Use #append(), #set(), #pop() and #extend()
+  to derive new vectors. Many changes at once are best applied through a #TransientVector.
+
+  ```py
+  base = PersistentVector(range(1000))
+  variant = base.set(10, 'x')
+  assert base[10] == 10 and variant[10] == 'x'
+  ```
+  """
+
+  __slots__ = ('_count', '_shift', '_root', '_tail', '_hash')
+
+  def __init__(self, iterable: t.Optional[t.Iterable[T]] = None) -> None:
+    self._count = 0
+    self._shift = _BITS
+    self._root = _EMPTY_NODE
+    self._tail: t.List[T] = []
+    self._hash: t.Optional[int] = None
+    if iterable is not None:
+      transient = self.transient()
+      transient.extend(iterable)
+      self._count, self._shift, self._root, self._tail = transient._freeze()
+
+  @classmethod
+  def _make(cls, count: int, shift: int, root: _Node, tail: t.List[T]) -> 'PersistentVector[T]':
+    self = object.__new__(cls)
+    self._count = count
+    self._shift = shift
+    self._root = root
+    self._tail = tail
+    self._hash = None
+    return self
+
+  def __eq__(self, other: t.Any) -> bool:
+    if self is other:
+      return True
+    if isinstance(other, PersistentVector):
+      if self._count != other._count:
+        return False
+      if self._root is other._root and self._tail is other._tail:
+        return True
+      return all(a == b for a, b in zip(self, other))
+    return NotImplemented
+
+  def __hash__(self) -> int:
+    if self._hash is None:
+      self._hash = hash(tuple(self))
+    return self._hash
+
+  def __reduce__(self) -> t.Tuple[t.Any, ...]:
+    return (type(self), (list(self),))
+
+  def append(self, value: T) -> 'PersistentVector[T]':
+    """
+    Returns a new vector with *value* added to the end.
+    """
+
+    count, shift, root = self._count, self._shift, self._root
+    if count - _tailoff(count) < _WIDTH:
+      return self._make(count + 1, shift, root, self._tail + [value])
+    tail_node = _Node(self._tail, None)
+    if (count >> _BITS) > (1 << shift):
+      root = _Node([root, _new_path(shift, tail_node, None)], None)
+      shift += _BITS
+    else:
+      root = _push_tail(count, shift, root, tail_node, None)
+    return self._make(count + 1, shift, root, [value])
+
+  def set(self, index: int, value: T) -> 'PersistentVector[T]':
+    """
+    Returns a new vector with the element at *index* replaced by *value*. If *index* equals the
+    length of the vector, *value* is appended instead.
+    """
+
+    if index == self._count:
+      return self.append(value)
+    index = self._normalize_index(index)
+    if index >= _tailoff(self._count):
+      tail = list(self._tail)
+      tail[index & _MASK] = value
+      return self._make(self._count, self._shift, self._root, tail)
+    root = _assoc(self._shift, self._root, index, value, None)
+    return self._make(self._count, self._shift, root, self._tail)
+
+  def pop(self) -> 'PersistentVector[T]':
+    """
+    Returns a new vector without the last element. Raises an #IndexError if the vector is empty.
+    """
+
+    count, shift = self._count, self._shift
+    if count == 0:
+      raise IndexError('pop from empty {}'.format(type(self).__name__))
+    if count == 1:
+      return self._make(0, _BITS, _EMPTY_NODE, [])
+    if count - _tailoff(count) > 1:
+      return self._make(count - 1, shift, self._root, self._tail[:-1])
+    tail = self._array_for(count - 2)
+    root = _pop_tail(count, shift, self._root, None) or _EMPTY_NODE
+    if shift > _BITS and len(root.array) == 1:
+      root = root.array[0]
+      shift -= _BITS
+    return self._make(count - 1, shift, root, tail)
+
+  def extend(self, iterable: t.Iterable[T]) -> 'PersistentVector[T]':
+    """
+    Returns a new vector with all elements from *iterable* appended.
+    """
+
+    transient = self.transient()
+    transient.extend(iterable)
+    return transient.persistent()
+
+  def transient(self) -> 'TransientVector[T]':
+    """
+    Returns a #TransientVector that starts with the contents of this vector. This vector is not
+    affected by changes to the transient.
+    """
+
+    return TransientVector._make(self._count, self._shift, self._root, self._tail)
+
+
+class TransientVector(_VectorBase[T]):
+  """
+  A mutable builder for a #PersistentVector. Nodes shared with the vector it was created from
+  are copied the first time they are changed, subsequent changes happen in place. #persistent()
+  returns a #PersistentVector snapshot in O(1), after which the transient can continue to be
+  used without affecting the snapshot.
+  """
+
+  def __init__(self, iterable: t.Optional[t.Iterable[T]] = None) -> None:
+    self._count = 0
+    self._shift = _BITS
+    self._root = _EMPTY_NODE
+    self._tail: t.List[T] = []
+    self._owner = object()
+    if iterable is not None:
+      self.extend(iterable)
+
+  @classmethod
+  def _make(cls, count: int, shift: int, root: _Node, tail: t.List[T]) -> 'TransientVector[T]':
+    self = cls()
+    self._count = count
+    self._shift = shift
+    self._root = root
+    self._tail = list(tail)
+    return self
+
+  def __setitem__(self, index: int, value: T) -> None:
+    index = self._normalize_index(index)
+    if index >= _tailoff(self._count):
+      self._tail[index & _MASK] = value
+    else:
+      self._root = _assoc(self._shift, self._root, index, value, self._owner)
+
+  def append(self, value: T) -> None:
+    count = self._count
+    if count - _tailoff(count) < _WIDTH:
+      self._tail.append(value)
+      self._count += 1
+      return
+    tail_node = _Node(self._tail, self._owner)
+    if (count >> _BITS) > (1 << self._shift):
+      self._root = _Node([self._root, _new_path(self._shift, tail_node, self._owner)], self._owner)
+      self._shift += _BITS
+    else:
+      self._root = _push_tail(count, self._shift, self._root, tail_node, self._owner)
+    self._tail = [value]
+    self._count += 1
+
+  def extend(self, iterable: t.Iterable[T]) -> None:
+    for value in iterable:
+      self.append(value)
+
+  def pop(self) -> T:
+    count = self._count
+    if count == 0:
+      raise IndexError('pop from empty {}'.format(type(self).__name__))
+    if count - _tailoff(count) > 1 or count == 1:
+      self._count -= 1
+      value = self._tail.pop()
+      if self._count == 0:
+        self._shift, self._root = _BITS, _EMPTY_NODE
+      return value
+    value = self._tail[0]
+    self._tail = list(self._array_for(count - 2))
+    root = _pop_tail(count, self._shift, self._root, self._owner) or _EMPTY_NODE
+    if self._shift > _BITS and len(root.array) == 1:
+      root = root.array[0]
+      self._shift -= _BITS
+    self._root = root
+    self._count -= 1
+    return value
+
+  def _freeze(self) -> t.Tuple[int, int, _Node, t.List[T]]:
+    # Nodes owned by the previous owner now belong to the snapshot; future edits must copy them.
+    self._owner = object()
+    tail = self._tail
+    self._tail = list(tail)
+    return self._count, self._shift, self._root, tail
+
+  def persistent(self) -> PersistentVector[T]:
+    """
+    Returns a #PersistentVector with the current contents of the transient.
+    """
+
+    return PersistentVector._make(*self._freeze())
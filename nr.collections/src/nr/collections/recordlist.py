@@ -0,0 +1,351 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+Memory-compact containers for large numbers of homogeneous records.
+
+* #make_record() creates a class with `__slots__`, which avoids the per-instance `__dict__`.
+* #RecordList stores records column-wise ("struct of arrays"). Numeric columns can be backed
+  by an #array.array, which stores the raw machine values instead of one Python object per
+  value. Rows are exposed as lightweight views that read from and write to the columns.
+"""
+
+import array
+import keyword
+import typing as t
+
+__all__ = ['make_record', 'RecordList']
+
+_MISSING = object()
+_Fields = t.Union[t.Sequence[str], t.Mapping[str, t.Optional[str]]]
+
+
+def _check_field_names(fields: t.Iterable[str]) -> t.List[str]:
+  result = []
+  for name in fields:
+    if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name):
+      raise ValueError('invalid field name: {!r}'.format(name))
+    if name.startswith('_'):
+      raise ValueError('field names must not start with an underscore: {!r}'.format(name))
+    if name in result:
+      raise ValueError('duplicate field name: {!r}'.format(name))
+    result.append(name)
+  return result
+
+
+def make_record(
+  name: str,
+  fields: t.Sequence[str],
+  defaults: t.Optional[t.Mapping[str, t.Any]] = None,
+  module: t.Optional[str] = None,
+) -> type:
+  """
+  Creates a mutable record class with the given *fields* that uses `__slots__` for storage.
+  Instances can be constructed with positional or keyword arguments, compare equal if all their
+  fields are equal and can be converted to a tuple with `tuple(record)`.
+
+  ```py
+  Token = make_record('Token', ['type', 'value', 'offset'], defaults={'offset': 0})
+  token = Token('name', 'foo')
+  assert tuple(token) == ('name', 'foo', 0)
+  ```
+  """
+
+  fields = _check_field_names(fields)
+  defaults = dict(defaults or {})
+  unknown = set(defaults) - set(fields)
+  if unknown:
+    raise ValueError('defaults for unknown fields: {}'.format(', '.join(sorted(unknown))))
+
+  params = []
+  for field in fields:
+    if field in defaults:
+      params.append('{0}=_defaults[{0!r}]'.format(field))
+    elif params and '=' in params[-1]:
+      raise ValueError('non-default field {!r} follows default field'.format(field))
+    else:
+      params.append(field)
+  body = ''.join('\n  self.{0} = {0}'.format(field) for field in fields) or '\n  pass'
+  source = 'def __init__(self, {}):{}'.format(', '.join(params), body)
+  namespace: t.Dict[str, t.Any] = {'_defaults': defaults}
+  exec(source, namespace)
+
+  def __repr__(self: t.Any) -> str:
+    args = ', '.join('{}={!r}'.format(f, getattr(self, f)) for f in fields)
+    return '{}({})'.format(type(self).__name__, args)
+
+  def __iter__(self: t.Any) -> t.Iterator[t.Any]:
+    for field in fields:
+      yield getattr(self, field)
+
+  def __eq__(self: t.Any, other: t.Any) -> bool:
+    if type(other) is not type(self):
+      return NotImplemented
+    return tuple(self) == tuple(other)
+
+  cls = type(name, (), {
+    '__slots__': tuple(fields),
+    '__init__': namespace['__init__'],
+    '__repr__': __repr__,
+    '__iter__': __iter__,
+    '__eq__': __eq__,
+    '__hash__': None,
+    '_fields': tuple(fields),
+  })
+  cls.__module__ = module or 'nr.collections.recordlist'
+  cls.__init__.__qualname__ = name + '.__init__'
+  return cls
+
+
+class _RowView:
+  """
+  Base class for the row views of a #RecordList. Subclasses generated by #RecordList have a
+  property for every field.
+  """
+
+  __slots__ = ('_columns', '_index')
+  _fields: t.Tuple[str, ...] = ()
+
+  def __init__(self, columns: t.List[t.MutableSequence[t.Any]], index: int) -> None:
+    self._columns = columns
+    self._index = index
+
+  def __repr__(self) -> str:
+    args = ', '.join('{}={!r}'.format(f, c[self._index]) for f, c in zip(self._fields, self._columns))
+    return 'Row({})'.format(args)
+
+  def __len__(self) -> int:
+    return len(self._columns)
+
+  def __iter__(self) -> t.Iterator[t.Any]:
+    index = self._index
+    for column in self._columns:
+      yield column[index]
+
+  def __eq__(self, other: t.Any) -> bool:
+    if isinstance(other, _RowView):
+      return self._fields == other._fields and tuple(self) == tuple(other)
+    if isinstance(other, tuple):
+      return tuple(self) == other
+    return NotImplemented
+
+  __hash__ = None  # type: ignore
+
+  def _asdict(self) -> t.Dict[str, t.Any]:
+    return dict(zip(self._fields, self))
+
+
+def _make_property(column_index: int) -> property:
+  def getter(self: _RowView) -> t.Any:
+    return self._columns[column_index][self._index]
+  def setter(self: _RowView, value: t.Any) -> None:
+    self._columns[column_index][self._index] = value
+  return property(getter, setter)
+
+
+class RecordList(t.MutableSequence[t.Any]):
+  """
+  A list of records with a fixed set of *fields* that stores every field in a separate column.
+  If *fields* is a mapping, its values are #array.array typecodes (e.g. `'i'`, `'q'`, `'d'`)
+  for columns that should be stored as packed machine values, or #None for columns that should
+  be stored in a plain #list.
+
+  Indexing returns a row view whose attributes read from and write to the columns. Views refer
+  to a row by position, so they are invalidated by insertions and deletions before that row.
+  For that reason, #pop() returns the removed record as a tuple.
+  #column() gives direct access to a column for fast scans, e.g. `sum(records.column('size'))`.
+
+  ```py
+  records = RecordList({'type': None, 'offset': 'q', 'length': 'i'})
+  records.append('name', 0, 3)
+  records.append(type='number', offset=4, length=2)
+  assert records[1].type == 'number'
+  assert list(records.column('offset')) == [0, 4]
+  ```
+  """
+
+  def __init__(self, fields: _Fields, rows: t.Optional[t.Iterable[t.Sequence[t.Any]]] = None) -> None:
+    if isinstance(fields, t.Mapping):
+      typecodes = dict(fields)
+    else:
+      typecodes = dict.fromkeys(_check_field_names(fields))
+    self._fields = tuple(_check_field_names(typecodes))
+    self._typecodes = typecodes
+    self._columns: t.List[t.MutableSequence[t.Any]] = [
+      [] if typecodes[f] is None else array.array(typecodes[f])  # type: ignore
+      for f in self._fields]
+    self._index = {f: i for i, f in enumerate(self._fields)}
+    namespace: t.Dict[str, t.Any] = {f: _make_property(i) for i, f in enumerate(self._fields)}
+    namespace['__slots__'] = ()
+    namespace['_fields'] = self._fields
+    self._view_type = type('Row', (_RowView,), namespace)
+    if rows is not None:
+      self.extend(rows)
+
+  def __repr__(self) -> str:
+    return '{}({!r}, {!r})'.format(type(self).__name__, self._typecodes, list(self.rows()))
+
+  @property
+  def fields(self) -> t.Tuple[str, ...]:
+    return self._fields
+
+  def __len__(self) -> int:
+    return len(self._columns[0]) if self._columns else 0
+
+  def _normalize_index(self, index: int) -> int:
+    length = len(self)
+    if index < 0:
+      index += length
+    if index < 0 or index >= length:
+      raise IndexError('{} index out of range'.format(type(self).__name__))
+    return index
+
+  def _make_row(self, args: t.Sequence[t.Any], kwargs: t.Mapping[str, t.Any]) -> t.List[t.Any]:
+    if len(args) > len(self._fields):
+      raise TypeError('expected at most {} values, got {}'.format(len(self._fields), len(args)))
+    row = list(args) + [_MISSING] * (len(self._fields) - len(args))
+    for key, value in kwargs.items():
+      try:
+        idx = self._index[key]
+      except KeyError:
+        raise TypeError('unknown field: {!r}'.format(key))
+      if row[idx] is not _MISSING:
+        raise TypeError('multiple values for field {!r}'.format(key))
+      row[idx] = value
+    missing = [f for f, v in zip(self._fields, row) if v is _MISSING]
+    if missing:
+      raise TypeError('missing values for fields: {}'.format(', '.join(missing)))
+    return row
+
+  def _insert_row(self, index: int, values: t.Sequence[t.Any]) -> None:
+    done = []
+    try:
+      for column, value in zip(self._columns, values):
+        column.insert(index, value)
+        done.append(column)
+    except (TypeError, OverflowError):
+      # Keep the columns aligned if a value does not fit into an array column.
+      for column in done:
+        del column[index]
+      raise
+
+  @t.overload
+  def __getitem__(self, index: int) -> _RowView: ...
+
+  @t.overload
+  def __getitem__(self, index: slice) -> 'RecordList': ...
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      result = type(self)(self._typecodes)
+      result._columns = [column[index] for column in self._columns]
+      return result
+    return self._view_type(self._columns, self._normalize_index(index))
+
+  def __setitem__(self, index: int, row: t.Sequence[t.Any]) -> None:  # type: ignore
+    index = self._normalize_index(index)
+    values = self._make_row(tuple(row), {})
+    old = [column[index] for column in self._columns]
+    try:
+      for column, value in zip(self._columns, values):
+        column[index] = value
+    except (TypeError, OverflowError):
+      for column, value in zip(self._columns, old):
+        column[index] = value
+      raise
+
+  def __delitem__(self, index: t.Union[int, slice]) -> None:
+    if not isinstance(index, slice):
+      index = self._normalize_index(index)
+    for column in self._columns:
+      del column[index]
+
+  def __iter__(self) -> t.Iterator[_RowView]:
+    view_type, columns = self._view_type, self._columns
+    for index in range(len(self)):
+      yield view_type(columns, index)
+
+  def insert(self, index: int, row: t.Sequence[t.Any]) -> None:  # type: ignore
+    length = len(self)
+    if index < 0:
+      index = max(index + length, 0)
+    self._insert_row(min(index, length), self._make_row(tuple(row), {}))
+
+  def append(self, *args: t.Any, **kwargs: t.Any) -> None:  # type: ignore
+    """
+    Appends a record, given its field values as positional and/or keyword arguments.
+    """
+
+    values = self._make_row(args, kwargs)
+    self._insert_row(len(self), values)
+
+  def extend(self, rows: t.Iterable[t.Sequence[t.Any]]) -> None:  # type: ignore
+    """
+    Appends all *rows*, each given as a sequence of field values.
+    """
+
+    width = len(self._fields)
+    columns: t.List[t.List[t.Any]] = [[] for _ in self._columns]
+    for row in rows:
+      if len(row) != width:
+        raise TypeError('expected {} values, got {}'.format(width, len(row)))
+      for column, value in zip(columns, row):
+        column.append(value)
+    converted = [
+      values if isinstance(target, list) else array.array(target.typecode, values)  # type: ignore
+      for target, values in zip(self._columns, columns)]
+    for target, values in zip(self._columns, converted):
+      target.extend(values)
+
+  def pop(self, index: int = -1) -> t.Tuple[t.Any, ...]:  # type: ignore
+    """
+    Removes the record at *index* and returns its field values as a tuple. (A row view would
+    refer to the position of the removed record.)
+    """
+
+    index = self._normalize_index(index)
+    row = tuple(column[index] for column in self._columns)
+    for column in self._columns:
+      del column[index]
+    return row
+
+  def reverse(self) -> None:
+    for column in self._columns:
+      column.reverse()
+
+  def clear(self) -> None:
+    for column in self._columns:
+      del column[:]
+
+  def column(self, field: str) -> t.MutableSequence[t.Any]:
+    """
+    Returns the column that stores the values of *field*. Changes to the column are visible in
+    the record list, but the caller must not change its length.
+    """
+
+    return self._columns[self._index[field]]
+
+  def rows(self) -> t.Iterator[t.Tuple[t.Any, ...]]:
+    """
+    Iterates over all records as tuples.
+    """
+
+    return zip(*self._columns)
@@ -0,0 +1,163 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+""" A dictionary that iterates over its keys in sorted order. """
+
+import typing as t
+
+from .sortedlist import SortedList
+
+__all__ = ['SortedDict']
+
+K = t.TypeVar('K')
+V = t.TypeVar('V')
+T_SortedDict = t.TypeVar('T_SortedDict', bound='SortedDict')
+
+
+class SortedDict(t.MutableMapping[K, V]):
+  """
+  A mapping that keeps its keys in a #SortedList. Lookups by key are as fast as for a #dict,
+  while iteration is in key order and range queries (#irange()) and positional access
+  (#peekitem()) take O(log n).
+  """
+
+  def __init__(self, mapping: t.Union[t.Mapping[K, V], t.Iterable[t.Tuple[K, V]], None] = None, **kwargs: V) -> None:
+    self._data: t.Dict[K, V] = {}
+    self._keys: SortedList[K] = SortedList()
+    if mapping is not None or kwargs:
+      self.update(*([mapping] if mapping is not None else []), **kwargs)
+
+  def __repr__(self) -> str:
+    return '{}({!r})'.format(type(self).__name__, dict(self.items()))
+
+  def __getitem__(self, key: K) -> V:
+    return self._data[key]
+
+  def __contains__(self, key: t.Any) -> bool:
+    return key in self._data
+
+  def __setitem__(self, key: K, value: V) -> None:
+    if key not in self._data:
+      self._keys.add(key)
+    self._data[key] = value
+
+  def __delitem__(self, key: K) -> None:
+    del self._data[key]
+    self._keys.remove(key)
+
+  def __iter__(self) -> t.Iterator[K]:
+    return iter(self._keys)
+
+  def __reversed__(self) -> t.Iterator[K]:
+    return reversed(self._keys)
+
+  def __len__(self) -> int:
+    return len(self._data)
+
+  def update(self, *args: t.Any, **kwargs: V) -> None:  # type: ignore
+    """
+    Adds all items from a mapping or iterable of pairs and from *kwargs*. New keys are added to
+    the sorted key list in bulk.
+    """
+
+    items: t.List[t.Tuple[K, V]] = []
+    for arg in args:
+      items.extend(arg.items() if hasattr(arg, 'items') else arg)
+    items.extend(kwargs.items())  # type: ignore
+    data = self._data
+    new_keys = []
+    for key, value in items:
+      if key not in data:
+        new_keys.append(key)
+      data[key] = value
+    self._keys.update(new_keys)
+
+  def clear(self) -> None:
+    self._data.clear()
+    self._keys.clear()
+
+  def copy(self: T_SortedDict) -> T_SortedDict:
+    return type(self)(self.items())
+
+  def popitem(self, index: int = -1) -> t.Tuple[K, V]:  # type: ignore
+    """
+    Removes and returns the item at *index* in key order (by default the last one).
+    """
+
+    if not self._data:
+      raise KeyError('popitem(): dictionary is empty')
+    key = self._keys.pop(index)
+    return key, self._data.pop(key)
+
+  def peekitem(self, index: int = -1) -> t.Tuple[K, V]:
+    """
+    Returns the item at *index* in key order (by default the last one).
+    """
+
+    key = self._keys[index]
+    return key, self._data[key]
+
+  def index(self, key: K) -> int:
+    """
+    Returns the position of *key* in key order. Raises a #ValueError if the key does not exist.
+    """
+
+    return self._keys.index(key)
+
+  def bisect_left(self, key: K) -> int:
+    return self._keys.bisect_left(key)
+
+  def bisect_right(self, key: K) -> int:
+    return self._keys.bisect_right(key)
+
+  def irange(
+    self,
+    minimum: t.Optional[K] = None,
+    maximum: t.Optional[K] = None,
+    inclusive: t.Tuple[bool, bool] = (True, True),
+    reverse: bool = False,
+  ) -> t.Iterator[K]:
+    """
+    Iterates over the keys between *minimum* and *maximum*. See #SortedList.irange().
+    """
+
+    return self._keys.irange(minimum, maximum, inclusive, reverse)
+
+  def floor_item(self, key: K) -> t.Optional[t.Tuple[K, V]]:
+    """
+    Returns the item with the greatest key that is less than or equal to *key*, or #None. This
+    is useful to map a value to the range it falls into, e.g. an offset to its line number.
+    """
+
+    idx = self._keys.bisect_right(key)
+    if idx == 0:
+      return None
+    return self.peekitem(idx - 1)
+
+  def ceiling_item(self, key: K) -> t.Optional[t.Tuple[K, V]]:
+    """
+    Returns the item with the smallest key that is greater than or equal to *key*, or #None.
+    """
+
+    idx = self._keys.bisect_left(key)
+    if idx == len(self._keys):
+      return None
+    return self.peekitem(idx)
@@ -0,0 +1,308 @@
+# -*- coding: utf8 -*-
+# Copyright (c) 2021 Niklas Rosenstein
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+A list that keeps its values in sorted order. Values are stored in a list of sorted chunks so
+that insertions and removals only shift the elements of a single chunk, while lookups are two
+binary searches (one over the chunk maxima, one inside the chunk).
+"""
+
+import bisect
+import itertools
+import typing as t
+
+__all__ = ['SortedList']
+
+T = t.TypeVar('T')
+T_SortedList = t.TypeVar('T_SortedList', bound='SortedList')
+
+
+class SortedList(t.MutableSequence[T]):
+  """
+  A sorted sequence of values. Values must be comparable with each other. Use #add() to insert
+  values; assigning to an index or inserting at a position is not supported as it could break
+  the sort order.
+
+  Constructing the list from an iterable (or calling #update() with many values) sorts all
+  values at once, which is O(n) for input that is already sorted.
+  """
+
+  #: The target number of values per chunk. Chunks are split when they grow to twice the size.
+  load = 1000
+
+  def __init__(self, iterable: t.Optional[t.Iterable[T]] = None) -> None:
+    self._lists: t.List[t.List[T]] = []
+    self._maxes: t.List[T] = []
+    self._offsets: t.List[int] = []
+    self._valid_offsets = 0
+    self._len = 0
+    if iterable is not None:
+      self.update(iterable)
+
+  def __repr__(self) -> str:
+    return '{}({!r})'.format(type(self).__name__, list(self))
+
+  def __len__(self) -> int:
+    return self._len
+
+  def __iter__(self) -> t.Iterator[T]:
+    return itertools.chain.from_iterable(self._lists)
+
+  def __reversed__(self) -> t.Iterator[T]:
+    return itertools.chain.from_iterable(reversed(chunk) for chunk in reversed(self._lists))
+
+  def __contains__(self, value: t.Any) -> bool:
+    pos = bisect.bisect_left(self._maxes, value)
+    if pos == len(self._maxes):
+      return False
+    chunk = self._lists[pos]
+    idx = bisect.bisect_left(chunk, value)
+    return chunk[idx] == value
+
+  def __eq__(self, other: t.Any) -> bool:
+    if isinstance(other, t.Sequence):
+      return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+    return NotImplemented
+
+  def _get_offsets(self) -> t.List[int]:
+    # The offset of every chunk's first value. Only the first #_valid_offsets are up to date, a
+    # change in a chunk invalidates the offsets of the chunks after it, which are recomputed
+    # lazily from there.
+    offsets, lists = self._offsets, self._lists
+    if self._valid_offsets < len(lists) or len(offsets) != len(lists):
+      valid = min(self._valid_offsets, len(lists))
+      del offsets[valid:]
+      total = offsets[-1] + len(lists[valid - 1]) if valid else 0
+      for pos in range(valid, len(lists)):
+        offsets.append(total)
+        total += len(lists[pos])
+      self._valid_offsets = len(lists)
+    return offsets
+
+  def _invalidate_offsets(self, pos: int) -> None:
+    # The chunk at *pos* changed its size, so the offsets of the chunks after it are outdated.
+    if pos < self._valid_offsets:
+      self._valid_offsets = pos + 1
+
+  def _locate(self, index: int) -> t.Tuple[int, int]:
+    if index < 0:
+      index += self._len
+    if index < 0 or index >= self._len:
+      raise IndexError('{} index out of range'.format(type(self).__name__))
+    offsets = self._get_offsets()
+    pos = bisect.bisect_right(offsets, index) - 1
+    return pos, index - offsets[pos]
+
+  def _split(self, pos: int) -> None:
+    chunk = self._lists[pos]
+    if len(chunk) > self.load * 2:
+      half = chunk[self.load:]
+      del chunk[self.load:]
+      self._lists.insert(pos + 1, half)
+      self._maxes.insert(pos, chunk[-1])
+
+  def _delete(self, pos: int, idx: int) -> None:
+    chunk = self._lists[pos]
+    del chunk[idx]
+    if not chunk:
+      del self._lists[pos]
+      del self._maxes[pos]
+    else:
+      self._maxes[pos] = chunk[-1]
+    self._invalidate_offsets(pos)
+    self._len -= 1
+
+  @t.overload
+  def __getitem__(self, index: int) -> T: ...
+
+  @t.overload
+  def __getitem__(self, index: slice) -> t.List[T]: ...
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      start, stop, step = index.indices(self._len)
+      if step == 1:
+        return list(self.islice(start, stop))
+      return [self[i] for i in range(start, stop, step)]
+    pos, idx = self._locate(index)
+    return self._lists[pos][idx]
+
+  def __delitem__(self, index: t.Union[int, slice]) -> None:
+    if isinstance(index, slice):
+      indices = sorted(range(*index.indices(self._len)), reverse=True)
+      for i in indices:
+        del self[i]
+      return
+    self._delete(*self._locate(index))
+
+  def __setitem__(self, index: t.Any, value: t.Any) -> None:
+    raise NotImplementedError('use {}.add()'.format(type(self).__name__))
+
+  def insert(self, index: int, value: T) -> None:
+    raise NotImplementedError('use {}.add()'.format(type(self).__name__))
+
+  def add(self, value: T) -> None:
+    """
+    Inserts *value* after all values that compare equal to it.
+    """
+
+    maxes = self._maxes
+    if not maxes:
+      self._lists.append([value])
+      maxes.append(value)
+    else:
+      pos = bisect.bisect_right(maxes, value)
+      if pos == len(maxes):
+        pos -= 1
+        self._lists[pos].append(value)
+        maxes[pos] = value
+      else:
+        bisect.insort_right(self._lists[pos], value)
+      self._split(pos)
+      self._invalidate_offsets(pos)
+    self._len += 1
+
+  def append(self, value: T) -> None:
+    self.add(value)
+
+  def update(self, iterable: t.Iterable[T]) -> None:
+    """
+    Adds all values from *iterable*. If many values are added, the list is re-sorted and
+    re-chunked as a whole instead of inserting every value individually.
+    """
+
+    values = list(iterable)
+    if len(values) * 4 < self._len:
+      for value in values:
+        self.add(value)
+      return
+    if self._len:
+      values = list(itertools.chain(self, values))
+    values.sort()
+    load = self.load
+    self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+    self._maxes = [chunk[-1] for chunk in self._lists]
+    self._offsets = []
+    self._valid_offsets = 0
+    self._len = len(values)
+
+  def extend(self, iterable: t.Iterable[T]) -> None:
+    self.update(iterable)
+
+  def discard(self, value: T) -> bool:
+    """
+    Removes one occurrence of *value*. Returns #False if the value is not in the list.
+    """
+
+    pos = bisect.bisect_left(self._maxes, value)
+    if pos == len(self._maxes):
+      return False
+    idx = bisect.bisect_left(self._lists[pos], value)
+    if self._lists[pos][idx] != value:
+      return False
+    self._delete(pos, idx)
+    return True
+
+  def remove(self, value: T) -> None:
+    if not self.discard(value):
+      raise ValueError('{!r} not in {}'.format(value, type(self).__name__))
+
+  def pop(self, index: int = -1) -> T:
+    pos, idx = self._locate(index)
+    value = self._lists[pos][idx]
+    self._delete(pos, idx)
+    return value
+
+  def clear(self) -> None:
+    self._lists = []
+    self._maxes = []
+    self._offsets = []
+    self._valid_offsets = 0
+    self._len = 0
+
+  def copy(self: T_SortedList) -> T_SortedList:
+    return type(self)(self)
+
+  def bisect_left(self, value: T) -> int:
+    """
+    Returns the index at which *value* would be inserted before any equal values.
+    """
+
+    pos = bisect.bisect_left(self._maxes, value)
+    if pos == len(self._maxes):
+      return self._len
+    return self._get_offsets()[pos] + bisect.bisect_left(self._lists[pos], value)
+
+  def bisect_right(self, value: T) -> int:
+    """
+    Returns the index at which *value* would be inserted after any equal values.
+    """
+
+    pos = bisect.bisect_right(self._maxes, value)
+    if pos == len(self._maxes):
+      return self._len
+    return self._get_offsets()[pos] + bisect.bisect_right(self._lists[pos], value)
+
+  def index(self, value: t.Any, start: int = 0, stop: t.Optional[int] = None) -> int:
+    start, stop, _ = slice(start, stop).indices(self._len)
+    idx = max(self.bisect_left(value), start)
+    if idx >= stop or self[idx] != value:
+      raise ValueError('{!r} not in {}'.format(value, type(self).__name__))
+    return idx
+
+  def count(self, value: t.Any) -> int:
+    return self.bisect_right(value) - self.bisect_left(value)
+
+  def irange(
+    self,
+    minimum: t.Optional[T] = None,
+    maximum: t.Optional[T] = None,
+    inclusive: t.Tuple[bool, bool] = (True, True),
+    reverse: bool = False,
+  ) -> t.Iterator[T]:
+    """
+    Iterates over the values between *minimum* and *maximum*. A bound of #None is unbounded.
+    """
+
+    if minimum is None:
+      start = 0
+    else:
+      start = self.bisect_left(minimum) if inclusive[0] else self.bisect_right(minimum)
+    if maximum is None:
+      stop = self._len
+    else:
+      stop = self.bisect_right(maximum) if inclusive[1] else self.bisect_left(maximum)
+    return self.islice(start, stop, reverse)
+
+  def islice(self, start: int = 0, stop: t.Optional[int] = None, reverse: bool = False) -> t.Iterator[T]:
+    """
+    Iterates over the values with indices in the range *start* to *stop*.
+    """
+
+    start, stop, _ = slice(start, stop).indices(self._len)
+    if start >= stop:
+      return iter(())
+    if reverse:
+      return (self[i] for i in range(stop - 1, start - 1, -1))
+    pos, idx = self._locate(start)
+    return itertools.islice(
+      itertools.chain(self._lists[pos][idx:], itertools.chain.from_iterable(self._lists[pos + 1:])),
+      stop - start)
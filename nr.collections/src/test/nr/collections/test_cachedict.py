@@ -0,0 +1,90 @@
+
+import threading
+import pytest
+from nr.collections.cachedict import LFUDict, LRUDict, TTLDict
+
+
+def test_LRUDict():
+  evicted = []
+  d = LRUDict(2, on_evict=lambda k, v: evicted.append((k, v)))
+  d['a'] = 1
+  d['b'] = 2
+  assert d['a'] == 1
+  d['c'] = 3
+  assert evicted == [('b', 2)]
+  assert list(d) == ['a', 'c']
+  assert 'b' not in d
+  assert d.peek('a') == 1
+  del d['a']
+  assert evicted == [('b', 2)]
+  assert len(d) == 1
+
+
+def test_LRUDict_weight():
+  d = LRUDict(10, weight=lambda k, v: len(v))
+  d['a'] = 'xxxx'
+  d['b'] = 'xxxx'
+  d['c'] = 'xxxx'
+  assert list(d) == ['b', 'c']
+  assert d.total_weight == 8
+  with pytest.raises(ValueError):
+    d['d'] = 'x' * 11
+  assert list(d) == ['b', 'c']
+  assert d.total_weight == 8
+  d['e'] = 'x' * 10
+  assert list(d) == ['e']
+  assert d.total_weight == 10
+
+
+def test_LFUDict():
+  evicted = []
+  d = LFUDict(2, on_evict=lambda k, v: evicted.append(k))
+  d['a'] = 1
+  d['b'] = 2
+  d['a']
+  d['a']
+  d['b']
+  d['c'] = 3
+  assert evicted == ['b']
+  assert d.frequency('a') == 3
+  assert d.frequency('c') == 1
+  d['d'] = 4
+  assert evicted == ['b', 'c']
+  assert sorted(d) == ['a', 'd']
+
+
+def test_TTLDict():
+  now = [0.0]
+  evicted = []
+  d = TTLDict(10, timer=lambda: now[0], on_evict=lambda k, v: evicted.append(k))
+  d['a'] = 1
+  now[0] = 5
+  d['b'] = 2
+  assert d['a'] == 1
+  now[0] = 10
+  assert 'a' not in d
+  assert evicted == ['a']
+  assert d['b'] == 2
+  d['b'] = 3
+  now[0] = 16
+  assert d['b'] == 3
+  now[0] = 20
+  assert len(d) == 0
+  assert evicted == ['a', 'b']
+
+
+def test_LRUDict_threads():
+  d = LRUDict(100)
+
+  def worker(offset):
+    for i in range(2000):
+      d[offset + i % 150] = i
+      d.get(offset + (i * 7) % 150)
+
+  threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert len(d) == 100
+  assert d.total_weight == 100
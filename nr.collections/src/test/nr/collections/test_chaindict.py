@@ -36,3 +36,67 @@ def test_ChainDict():
   assert b == {'bar': 'spam'}
   assert c == {}
   assert d == {}
+
+
+def test_ChainDict_cached():
+  a = {'foo': 42}
+  b = {'bar': 'spam', 'foo': 0}
+  d = ChainDict({}, a, b, cached=True)
+
+  assert len(d) == 2
+  assert d['foo'] == 42
+  assert 'bar' in d
+  assert list(d) == ['foo', 'bar']
+  assert dict(d.items()) == {'foo': 42, 'bar': 'spam'}
+
+  version = d.version
+  d['hello'] = 'World'
+  assert d.version > version
+  assert len(d) == 3
+  assert d == {'foo': 42, 'bar': 'spam', 'hello': 'World'}
+
+  del d['foo']
+  assert 'foo' not in d
+  assert len(d) == 2
+  assert a == {'foo': 42}
+
+  # Mutations through the ChainDict update the index in place.
+  index = d._index
+  d['foo'] = 1
+  d.pop('hello')
+  assert d._index is index
+  assert d == {'foo': 1, 'bar': 'spam'}
+
+  # Direct changes to a wrapped dictionary require an explicit invalidation.
+  b['egg'] = 1
+  assert 'egg' not in d
+  assert len(d) == 2
+  d.invalidate()
+  assert d['egg'] == 1
+  assert len(d) == 3
+  del b['egg']
+  b['ham'] = 2
+  assert 'ham' not in d
+  d.invalidate()
+  assert d['ham'] == 2
+  assert 'egg' not in d
+
+  assert d.copy().cached
+  d.clear()
+  assert d == {}
+  assert len(d) == 0
+
+
+def test_ChainDict_cached_versioned_layer():
+  inner = ChainDict({'foo': 1}, cached=True)
+  d = ChainDict({}, inner, cached=True)
+  assert d == {'foo': 1}
+
+  # Changes to a wrapped dictionary with a version are picked up automatically, also when they
+  # do not change its size.
+  inner['bar'] = 2
+  assert d['bar'] == 2
+  del inner['foo']
+  inner['spam'] = 3
+  assert 'foo' not in d
+  assert d == {'bar': 2, 'spam': 3}
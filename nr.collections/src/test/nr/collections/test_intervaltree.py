@@ -0,0 +1,37 @@
+
+import random
+from nr.collections.intervaltree import Interval, IntervalTree
+
+
+def test_IntervalTree():
+  tree = IntervalTree([(0, 10, 'a'), (5, 15, 'b'), (20, 30, 'c')])
+  assert sorted(iv.data for iv in tree.at(7)) == ['a', 'b']
+  assert tree.at(15) == []
+  assert sorted(iv.data for iv in tree.overlap(10, 21)) == ['b', 'c']
+  assert [iv.data for iv in tree.envelop(0, 16)] in (['a', 'b'], ['b', 'a'])
+  assert Interval(5, 15, 'b') in tree
+
+  tree.remove((5, 15, 'b'))
+  assert Interval(5, 15, 'b') not in tree
+  assert [iv.data for iv in tree.remove_overlap(25, 40)] == ['c']
+  assert list(tree) == [Interval(0, 10, 'a')]
+
+
+def test_IntervalTree_random():
+  rng = random.Random(42)
+  intervals = []
+  tree = IntervalTree()
+  for _ in range(500):
+    begin = rng.randrange(1000)
+    interval = Interval(begin, begin + rng.randrange(1, 50), rng.randrange(3))
+    intervals.append(interval)
+    tree.add(interval)
+  for interval in intervals[::4]:
+    tree.remove(interval)
+  del intervals[::4]
+
+  assert len(tree) == len(intervals)
+  for point in range(0, 1050, 7):
+    assert sorted(tree.at(point)) == sorted(x for x in intervals if x.contains_point(point))
+  for begin in range(0, 1000, 50):
+    assert sorted(tree.overlap(begin, begin + 20)) == sorted(x for x in intervals if x.overlaps(begin, begin + 20))
@@ -0,0 +1,73 @@
+
+from nr.collections.persistentmap import PersistentMap, TransientMap
+
+
+class _Collider:
+
+  def __init__(self, value):
+    self.value = value
+
+  def __hash__(self):
+    return 42
+
+  def __eq__(self, other):
+    return isinstance(other, _Collider) and other.value == self.value
+
+
+def test_PersistentMap():
+  m1 = PersistentMap({'foo': 1, 'bar': 2})
+  m2 = m1.set('baz', 3)
+  m3 = m2.delete('foo')
+
+  assert m1 == {'foo': 1, 'bar': 2}
+  assert m2 == {'foo': 1, 'bar': 2, 'baz': 3}
+  assert m3 == {'bar': 2, 'baz': 3}
+  assert len(m1) == 2 and len(m2) == 3 and len(m3) == 2
+  assert m1.set('foo', 1) is m1
+  assert m1.discard('spam') is m1
+  assert m1.update(spam=4) == {'foo': 1, 'bar': 2, 'spam': 4}
+  assert hash(m1) == hash(PersistentMap(foo=1, bar=2))
+
+  try:
+    m1.delete('spam')
+  except KeyError:
+    pass
+  else:
+    assert False, 'expected KeyError'
+
+
+def test_PersistentMap_large():
+  reference = {}
+  m = PersistentMap()
+  for i in range(5000):
+    m = m.set(i, str(i))
+    reference[i] = str(i)
+  for i in range(0, 5000, 3):
+    m = m.delete(i)
+    del reference[i]
+  assert len(m) == len(reference)
+  assert dict(m.items()) == reference
+
+
+def test_PersistentMap_collisions():
+  keys = [_Collider(i) for i in range(10)]
+  m = PersistentMap((k, k.value) for k in keys)
+  m = m.set('other', -1)
+  assert all(m[k] == k.value for k in keys)
+  m = m.delete(keys[3])
+  assert keys[3] not in m
+  assert len(m) == 10
+
+
+def test_TransientMap():
+  base = PersistentMap(a=1)
+  transient = base.transient()
+  transient['b'] = 2
+  snapshot = transient.persistent()
+  transient['c'] = 3
+  del transient['a']
+
+  assert base == {'a': 1}
+  assert snapshot == {'a': 1, 'b': 2}
+  assert transient.persistent() == {'b': 2, 'c': 3}
+  assert isinstance(transient, TransientMap)
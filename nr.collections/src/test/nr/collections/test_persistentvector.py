@@ -0,0 +1,43 @@
+
+import pytest
+from nr.collections.persistentvector import PersistentVector
+
+
+def test_PersistentVector():
+  v1 = PersistentVector(range(2000))
+  v2 = v1.set(1000, 'x').append('y')
+  v3 = v2.pop().pop()
+
+  assert list(v1) == list(range(2000))
+  assert v2[1000] == 'x' and v2[-1] == 'y' and len(v2) == 2001
+  assert list(v3) == list(range(1000)) + ['x'] + list(range(1001, 1999))
+  assert v1[10:13] == [10, 11, 12]
+  assert v1 == PersistentVector(range(2000))
+  assert hash(v1) == hash(PersistentVector(range(2000)))
+
+  with pytest.raises(IndexError):
+    v1[2000]
+  with pytest.raises(IndexError):
+    PersistentVector().pop()
+
+
+def test_PersistentVector_pop_to_empty():
+  v = PersistentVector(range(1100))
+  for i in reversed(range(1100)):
+    assert v[-1] == i
+    v = v.pop()
+  assert len(v) == 0 and list(v) == []
+
+
+def test_TransientVector():
+  base = PersistentVector(range(100))
+  transient = base.transient()
+  transient.append(100)
+  transient[0] = 'a'
+  snapshot = transient.persistent()
+  transient[1] = 'b'
+  assert transient.pop() == 100
+
+  assert list(base) == list(range(100))
+  assert list(snapshot) == ['a'] + list(range(1, 101))
+  assert list(transient.persistent()) == ['a', 'b'] + list(range(2, 100))
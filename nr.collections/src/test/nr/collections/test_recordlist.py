@@ -0,0 +1,57 @@
+
+import array
+import pytest
+from nr.collections.recordlist import RecordList, make_record
+
+
+def test_make_record():
+  Token = make_record('Token', ['type', 'value', 'offset'], defaults={'offset': 0})
+  token = Token('name', 'foo')
+  assert tuple(token) == ('name', 'foo', 0)
+  assert token == Token(type='name', value='foo')
+  assert repr(token) == "Token(type='name', value='foo', offset=0)"
+  assert not hasattr(token, '__dict__')
+  with pytest.raises(AttributeError):
+    token.other = 42
+
+
+def test_RecordList():
+  records = RecordList({'type': None, 'offset': 'q', 'length': 'i'})
+  records.append('name', 0, 3)
+  records.append(type='number', offset=4, length=2)
+  records.extend([('name', 7, 1), ('op', 8, 1)])
+
+  assert len(records) == 4
+  assert isinstance(records.column('offset'), array.array)
+  assert records[1].type == 'number'
+  assert records[-1] == ('op', 8, 1)
+  assert sum(records.column('length')) == 7
+
+  records[0].length = 10
+  assert list(records.rows())[0] == ('name', 0, 10)
+  del records[1]
+  assert [row.type for row in records] == ['name', 'name', 'op']
+  assert list(records[1:].rows()) == [('name', 7, 1), ('op', 8, 1)]
+
+  with pytest.raises(TypeError):
+    records.append('name', 'not a number', 1)
+  assert len(records.column('type')) == len(records.column('offset')) == 3
+
+
+def test_RecordList_pop_and_reverse():
+  records = RecordList({'a': None, 'b': 'i'}, [('x', 1), ('y', 2), ('z', 3)])
+  assert records.pop() == ('z', 3)
+  assert records.pop(0) == ('x', 1)
+  assert list(records.rows()) == [('y', 2)]
+  with pytest.raises(IndexError):
+    records.pop(1)
+
+  records = RecordList({'a': None, 'b': 'i'}, [('x', 1), ('y', 2), ('z', 3)])
+  records.reverse()
+  assert list(records.rows()) == [('z', 3), ('y', 2), ('x', 1)]
+
+  records.remove(('y', 2))
+  records += [('w', 4)]
+  assert list(records.rows()) == [('z', 3), ('x', 1), ('w', 4)]
+  records += records
+  assert len(records) == 6
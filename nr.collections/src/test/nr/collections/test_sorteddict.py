@@ -0,0 +1,20 @@
+
+from nr.collections.sorteddict import SortedDict
+
+
+def test_SortedDict():
+  d = SortedDict({10: 'b', 0: 'a'})
+  d[20] = 'c'
+  d[5] = 'x'
+  del d[5]
+
+  assert list(d) == [0, 10, 20]
+  assert list(d.values()) == ['a', 'b', 'c']
+  assert d.peekitem(0) == (0, 'a')
+  assert d.index(20) == 2
+  assert list(d.irange(5, 20)) == [10, 20]
+  assert d.floor_item(15) == (10, 'b')
+  assert d.floor_item(-1) is None
+  assert d.ceiling_item(15) == (20, 'c')
+  assert d.popitem() == (20, 'c')
+  assert d == {0: 'a', 10: 'b'}
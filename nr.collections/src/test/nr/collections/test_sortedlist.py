@@ -0,0 +1,65 @@
+
+import bisect
+import random
+from nr.collections.sortedlist import SortedList
+
+
+def test_SortedList():
+  values = [random.randrange(100) for _ in range(500)]
+  sl = SortedList(values)
+  sl.load = 4
+  for value in values:
+    sl.add(value)
+  values = sorted(values * 2)
+
+  assert list(sl) == values
+  assert len(sl) == 1000
+  assert sl[10] == values[10] and sl[-1] == values[-1]
+  assert sl[5:25] == values[5:25]
+  assert sl.bisect_left(50) == bisect.bisect_left(values, 50)
+  assert sl.bisect_right(50) == bisect.bisect_right(values, 50)
+  assert sl.count(values[0]) == values.count(values[0])
+  assert list(sl.irange(10, 20)) == [x for x in values if 10 <= x <= 20]
+  assert list(sl.irange(10, 20, inclusive=(False, False))) == [x for x in values if 10 < x < 20]
+
+  for value in values[::3]:
+    sl.remove(value)
+  del values[::3]
+  assert list(sl) == values
+  assert sl.pop(0) == values.pop(0)
+  assert sl.pop() == values.pop()
+  assert list(reversed(sl)) == values[::-1]
+  assert -1 not in sl
+
+
+def test_SortedList_interleaved_changes_and_indexing():
+  rng = random.Random(42)
+  sl = SortedList()
+  sl.load = 4
+  values = []
+  for _ in range(2000):
+    op = rng.random()
+    if op < 0.5 or not values:
+      value = rng.randrange(200)
+      sl.add(value)
+      bisect.insort_right(values, value)
+    elif op < 0.7:
+      value = rng.choice(values)
+      sl.remove(value)
+      values.remove(value)
+    else:
+      index = rng.randrange(-len(values), len(values))
+      assert sl.pop(index) == values.pop(index)
+    if values:
+      index = rng.randrange(len(values))
+      assert sl[index] == values[index]
+      assert sl.bisect_left(values[index]) == bisect.bisect_left(values, values[index])
+  assert list(sl) == values
+
+  # A change only invalidates the offsets of the chunks after the changed chunk.
+  sl[0]
+  sl.add(1000)
+  assert sl._valid_offsets == len(sl._lists)
+  sl.add(-1)
+  assert sl._valid_offsets == 1
+  assert sl[-1] == 1000 and sl._valid_offsets == len(sl._lists)
@@ -52,7 +52,7 @@ setuptools.setup(
   long_description_content_type = 'text/markdown',
   url = 'https://github.com/NiklasRosenstein/nr-python',
   license = 'MIT',
-  packages = setuptools.find_packages('src', ['test', 'test.*', 'tests', 'tests.*', 'docs', 'docs.*']),
+  packages = setuptools.find_packages('src', ['benchmarks', 'benchmarks.*', 'test', 'test.*', 'tests', 'tests.*', 'docs', 'docs.*']),
   package_dir = {'': 'src'},
   include_package_data = True,
   install_requires = requirements,
@@ -0,0 +1,87 @@
+
+import io
+import time
+
+from nr.parsing.core import BufferedScanner, Tokenizer
+from .grammars import GRAMMARS, generate
+
+SIZES = [100, 1000, 10000]
+
+
+def tokenize(tokenizer: Tokenizer) -> int:
+  count = 0
+  for _token in tokenizer:
+    count += 1
+  return count
+
+
+class TokenizerSuite:
+  """
+  Measures the throughput of the #Tokenizer for different grammars and input sizes.
+  """
+
+  params = (list(GRAMMARS), SIZES)
+  param_names = ['grammar', 'size']
+
+  def setup(self, grammar, size):
+    self.ruleset, self.text = generate(grammar, size)
+
+  def time_tokenize(self, grammar, size):
+    tokenize(Tokenizer(self.ruleset, self.text))
+
+  def time_tokenize_buffered(self, grammar, size):
+    tokenize(Tokenizer(self.ruleset, BufferedScanner(io.StringIO(self.text), chunk_size=4096)))
+
+  def track_tokens_per_second(self, grammar, size):
+    start = time.perf_counter()
+    count = tokenize(Tokenizer(self.ruleset, self.text))
+    return count / (time.perf_counter() - start)
+
+  track_tokens_per_second.unit = 'tokens/s'
+
+  def peakmem_tokenize(self, grammar, size):
+    tokenize(Tokenizer(self.ruleset, self.text))
+
+  def peakmem_tokenize_buffered(self, grammar, size):
+    tokenize(Tokenizer(self.ruleset, BufferedScanner(io.StringIO(self.text), chunk_size=4096)))
+
+
+class CheckpointSuite:
+  """
+  Measures the cost of saving and restoring the #Tokenizer.state, as done by backtracking
+  parsers.
+  """
+
+  params = [1000, 10000]
+  param_names = ['checkpoints']
+
+  def setup(self, checkpoints):
+    ruleset, text = generate('expr', 1000)
+    self.tokenizer = Tokenizer(ruleset, text)
+    for _ in range(100):
+      self.tokenizer.next()
+
+  def time_save(self, checkpoints):
+    tokenizer = self.tokenizer
+    for _ in range(checkpoints):
+      tokenizer.state
+
+  def time_save_and_restore(self, checkpoints):
+    tokenizer = self.tokenizer
+    for _ in range(checkpoints):
+      tokenizer.state = tokenizer.state
+
+  def time_restore_and_retokenize(self, checkpoints):
+    tokenizer = self.tokenizer
+    state = tokenizer.state
+    for _ in range(checkpoints):
+      tokenizer.next()
+      tokenizer.state = state
+
+  def time_save_with_reconfiguration(self, checkpoints):
+    tokenizer = self.tokenizer
+    for _ in range(checkpoints):
+      state = tokenizer.state
+      with tokenizer.skipped.set('whitespace', False):
+        pass
+      tokenizer.state = state
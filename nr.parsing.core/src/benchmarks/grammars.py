@@ -0,0 +1,78 @@
+
+"""
+Representative grammars and input generators for the benchmarks.
+"""
+
+import random
+import typing as t
+
+from nr.parsing.core import RuleSet, rules
+
+JSON = RuleSet()
+JSON.rule('string', rules.regex(r'"(?:[^"\\]|\\.)*"'))
+JSON.rule('number', rules.regex(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?'))
+JSON.rule('literal', rules.regex(r'true|false|null'))
+JSON.rule('punctuation', rules.regex(r'[{}\[\]:,]'))
+JSON.rule('whitespace', rules.regex(r'\s+'), skip=True)
+
+INI = RuleSet()
+INI.rule('comment', rules.regex(r'[;#][^\n]*'), skip=True)
+INI.rule('section', rules.regex(r'\[[^\]\n]*\]', at_line_start_only=True))
+INI.rule('key', rules.regex(r'[A-Za-z_][\w.]*(?=[ \t]*=)'))
+INI.rule('assign', rules.regex(r'[ \t]*=[ \t]*'))
+INI.rule('value', rules.regex(r'[^\n]+'))
+INI.rule('newline', rules.regex(r'\n+'), skip=True)
+
+EXPR = RuleSet()
+EXPR.rule('number', rules.regex(r'\d+(?:\.\d+)?'))
+EXPR.rule('name', rules.regex(r'[A-Za-z_]\w*'))
+EXPR.rule('string', rules.string_literal())
+EXPR.rule('operator', rules.regex(r'==|<=|>=|[-+*/%<>^]'))
+EXPR.rule('paren', rules.regex(r'[()]'))
+EXPR.rule('comma', rules.regex(r','))
+EXPR.rule('whitespace', rules.regex(r'\s+'), skip=True)
+
+
+def generate_json(size: int, rng: random.Random) -> str:
+  items = []
+  for i in range(size):
+    items.append('{"id": %d, "name": "item \\"%d\\"", "price": %.2f, "tags": ["a", "b"], "active": %s}'
+      % (i, i, rng.random() * 100, rng.choice(['true', 'false', 'null'])))
+  return '[\n  ' + ',\n  '.join(items) + '\n]\n'
+
+
+def generate_ini(size: int, rng: random.Random) -> str:
+  lines = []
+  for i in range(size):
+    if i % 10 == 0:
+      lines.append(f'\n[section{i // 10}]')
+      lines.append(f'; comment for section {i // 10}')
+    lines.append(f'key{i}.name = value {rng.randint(0, 10 ** 6)} with some text')
+  return '\n'.join(lines) + '\n'
+
+
+def generate_expr(size: int, rng: random.Random) -> str:
+  terms = []
+  for i in range(size):
+    choice = rng.randrange(4)
+    if choice == 0:
+      terms.append(str(rng.randint(0, 1000)))
+    elif choice == 1:
+      terms.append(f'var_{i}')
+    elif choice == 2:
+      terms.append(f'f(x, "arg {i}")')
+    else:
+      terms.append(f'({rng.random():.3f} * y)')
+  return ''.join(term + rng.choice([' + ', ' - ', ' * ', ' <= ']) for term in terms) + '0\n'
+
+
+GRAMMARS: t.Dict[str, t.Tuple[RuleSet, t.Callable[[int, random.Random], str]]] = {
+  'json': (JSON, generate_json),
+  'ini': (INI, generate_ini),
+  'expr': (EXPR, generate_expr),
+}
+
+
+def generate(grammar: str, size: int) -> t.Tuple[RuleSet, str]:
+  ruleset, generator = GRAMMARS[grammar]
+  return ruleset, generator(size, random.Random(size))
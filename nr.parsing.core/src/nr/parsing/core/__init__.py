@@ -2,9 +2,12 @@
 __author__ = 'Niklas Rosenstein <rosensteinniklas@gmail.com>'
 __version__ = '2.0.4'
 
-from .scanner import Cursor, Scanner
+from .scanner import BufferedScanner, Cursor, Scanner, ScannerPin
 from .tokenizer import RuleSet, Token, Tokenizer, TokenExtractor, TokenizationError, UnexpectedTokenError
+from .memo import MemoTable
+from .tokenarray import TokenArray, TokenCache, TokenReplay
 from . import rules
 
-__all__ = ['Cursor', 'Scanner', 'RuleSet', 'Token', 'Tokenizer', 'TokenExtractor',
-  'TokenizationError', 'UnexpectedTokenError', 'rules']
+__all__ = ['BufferedScanner', 'Cursor', 'Scanner', 'ScannerPin', 'RuleSet', 'Token', 'Tokenizer',
+  'TokenExtractor', 'TokenizationError', 'UnexpectedTokenError', 'MemoTable', 'TokenArray', 'TokenCache',
+  'TokenReplay', 'rules']
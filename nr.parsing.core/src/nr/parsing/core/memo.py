@@ -0,0 +1,149 @@
+
+import collections
+import functools
+import typing as t
+
+from .tokenizer.tokenizer import Tokenizer, TokenizationError, TokenizerState, UnexpectedTokenError
+
+R = t.TypeVar('R')
+_Key = t.Tuple[t.Hashable, int, t.Optional[int], int, int]
+
+
+class _Entry(t.NamedTuple):
+  result: t.Any
+  error: t.Optional[BaseException]
+  state: TokenizerState
+
+
+class MemoTable:
+  """
+  A memo table for "packrat" parsing with a #Tokenizer. The results of sub-parsers are stored
+  by a rule identifier and the position of the tokenizer, together with the tokenizer state after
+  the sub-parser returned. When the same rule is applied at the same position again (e.g. after
+  the parser backtracked via #Tokenizer.state), the result is returned and the tokenizer state is
+  restored without running the sub-parser again. This makes recursive-descent parsers with
+  backtracking run in linear time.
+
+  Failures are memoized as well: if the sub-parser raises one of the *errors*, the same exception
+  is raised again (with a fresh traceback) on the next application at that position.
+
+  The memoized result depends on the tokenizer's #Tokenizer.skipped and #Tokenizer.ignored
+  configuration, so their versions are part of the key and a rule applied with a different
+  configuration is not served from the table.
+
+  The table holds at most *maxsize* entries (unlimited if #None) and evicts the least recently
+  used entries first. Every entry keeps a #TokenizerState, which pins the text of a
+  #BufferedScanner from its position onwards. Parsers that know they will not backtrack before a
+  certain offset should call #discard_before() to let the scanner discard that text, #clear()
+  releases all pins.
+
+  ```py
+  memo = MemoTable(tokenizer)
+
+  @memo.memoize
+  def parse_expr() -> Expr:
+    ...
+  ```
+  """
+
+  def __init__(
+    self,
+    tokenizer: Tokenizer,
+    maxsize: t.Optional[int] = None,
+    errors: t.Tuple[t.Type[BaseException], ...] = (TokenizationError, UnexpectedTokenError),
+  ) -> None:
+    if maxsize is not None and maxsize <= 0:
+      raise ValueError(f'maxsize must be positive, got {maxsize}')
+    self.tokenizer = tokenizer
+    self.maxsize = maxsize
+    self.errors = errors
+    self.hits = 0
+    self.misses = 0
+    self._entries: 'collections.OrderedDict[_Key, _Entry]' = collections.OrderedDict()
+
+  def __repr__(self) -> str:
+    return f'<MemoTable entries={len(self._entries)} hits={self.hits} misses={self.misses}>'
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def _get_key(self, rule: t.Hashable) -> _Key:
+    # The tokenizer's position is determined by the scanner offset and the current token,
+    # which has already been extracted from the text before the scanner offset.
+    tokenizer = self.tokenizer
+    current = tokenizer._current
+    return (
+      rule,
+      tokenizer.scanner.pos.offset,
+      None if current is None else current.pos.offset,
+      tokenizer.skipped.version,
+      tokenizer.ignored.version,
+    )
+
+  def apply(self, rule: t.Hashable, func: t.Callable[[], R]) -> R:
+    """
+    Returns the memoized result of *rule* at the tokenizer's current position, or calls *func*
+    and memoizes its result.
+    """
+
+    key = self._get_key(rule)
+    entry = self._entries.get(key)
+    if entry is not None:
+      self.hits += 1
+      self._entries.move_to_end(key)
+      self.tokenizer.state = entry.state
+      if entry.error is not None:
+        # Drop the traceback of the previous raise, it would otherwise grow with every replay.
+        raise entry.error.with_traceback(None)
+      return entry.result
+
+    self.misses += 1
+    try:
+      result = func()
+    except self.errors as exc:
+      self._store(key, _Entry(None, exc, self.tokenizer.state))
+      raise
+    self._store(key, _Entry(result, None, self.tokenizer.state))
+    return result
+
+  def _store(self, key: _Key, entry: _Entry) -> None:
+    self._entries[key] = entry
+    if self.maxsize is not None and len(self._entries) > self.maxsize:
+      self._release(self._entries.popitem(last=False)[1])
+
+  @staticmethod
+  def _release(entry: _Entry) -> None:
+    # The state is owned by the table, so its pin can be released right away instead of waiting
+    # for the entry to be garbage collected (e.g. when the error's traceback references it).
+    if entry.state.pin is not None:
+      entry.state.pin.release()
+
+  def memoize(self, func: t.Callable[..., R]) -> t.Callable[..., R]:
+    """
+    Decorator for a sub-parser function. The function and its arguments (which must be
+    hashable) are used as the rule identifier.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: t.Any, **kwargs: t.Any) -> R:
+      rule = (func, args, tuple(sorted(kwargs.items()))) if args or kwargs else func
+      return self.apply(rule, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+  def discard_before(self, offset: int) -> None:
+    """
+    Removes all entries for positions before the scanner *offset* and releases their pins.
+    """
+
+    for key in [k for k in self._entries if k[1] < offset]:
+      self._release(self._entries.pop(key))
+
+  def clear(self) -> None:
+    """
+    Removes all entries and releases their pins.
+    """
+
+    for entry in self._entries.values():
+      self._release(entry)
+    self._entries.clear()
@@ -3,38 +3,91 @@ import re
 import typing as t
 
 from nr.parsing.core.tokenizer import TokenExtractor
+from nr.parsing.core.tokenizer.extractor import RegexExtractor
 
 if t.TYPE_CHECKING:
   from nr.parsing.core.scanner import Scanner
 
 
-def regex(pattern: str, *, at_line_start_only: bool = False) -> TokenExtractor['re.Match']:
+def regex(pattern: t.Union[str, 're.Pattern'], *, at_line_start_only: bool = False,
+    flags: int = 0) -> TokenExtractor['re.Match']:
   """
   Creates a tokenizer rule that matches a regular expression and returns the #re.Match object
-  as the token value. If you want the pattern to match at the start of a line only, set the
-  *at_line_start_only* argument to `True`. The regex caret (`^`) control character will not work
-  because the regex is matched from the cursor's current position and not the line start.
-  """
+  as the token value. When the #Tokenizer matches the rule as part of a combined pattern (see
+  #RuleSet.compile()), the value is a #GroupMatch with the same interface instead.
 
-  def _impl(scanner: 'Scanner') -> t.Optional['re.Match']:
-    if at_line_start_only and scanner.pos.column != 0:
-      return None
-    match = scanner.match(pattern)
-    if match is None:
-      return None
-    return match
+  If you want the pattern to match at the start of a line only, set the *at_line_start_only*
+  argument to `True`. The regex caret (`^`) control character will not work because the regex
+  is matched from the cursor's current position and not the line start.
 
-  return TokenExtractor.of(_impl)
+  The *pattern* is compiled once when the rule is created.
+  """
 
+  return RegexExtractor(pattern, at_line_start_only, flags)
 
-def regex_extract(pattern: str, group: t.Union[str, int] = 0, *,
-    at_line_start_only: bool = False) -> TokenExtractor[str]:
+
+def regex_extract(pattern: t.Union[str, 're.Pattern'], group: t.Union[str, int] = 0, *,
+    at_line_start_only: bool = False, flags: int = 0) -> TokenExtractor[str]:
   """
   Creates a token extractor that matches a regular expression and extracts a group from the match
   as the token value.
   """
 
-  return regex(pattern, at_line_start_only=at_line_start_only).map(lambda m: m.group(group))
+  return regex(pattern, at_line_start_only=at_line_start_only, flags=flags).map(lambda m: m.group(group))
+
+
+#: The escape sequences that are decoded by #string_literal_value() by default.
+ESCAPES: t.Mapping[str, str] = {
+  '\\': '\\', "'": "'", '"': '"', 'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r',
+  't': '\t', 'v': '\v', '0': '\0', '\n': '',
+}
+
+#: The escape sequences followed by a fixed number of hex digits that are decoded by
+#: #string_literal_value() by default.
+HEX_ESCAPES: t.Mapping[str, int] = {'x': 2, 'u': 4, 'U': 8}
+
+
+class StringLiteral(t.NamedTuple):
+  """ The token value produced by #string_literal_value(). """
+
+  #: The contents of the string literal with escape sequences decoded.
+  value: str
+
+  #: The prefix of the string literal, e.g. `'b'` or `'r'`.
+  prefix: str
+
+  #: The quote sequence of the string literal.
+  quote: str
+
+  #: The start and end offset of the string literal in the text.
+  span: t.Tuple[int, int]
+
+
+def _string_body_pattern(quote: str, multiline: bool) -> str:
+  """
+  Returns a pattern that matches the contents of a string literal in *quote*s up to and
+  including the closing quote. The pattern is an unrolled loop of runs of normal characters
+  separated by escape sequences (or, for multi-character quotes, by a quote character that
+  does not start the closing quote). Every special sequence starts with a character that a run
+  cannot contain, so the pattern fails in linear time if the string is not terminated.
+  """
+
+  first = re.escape(quote[0])
+  normal = r'[^\\' + first + ('' if multiline else r'\n') + r']*'
+  special = r'\\[\s\S]'
+  if len(quote) > 1:
+    special = '(?:' + special + '|' + first + '(?!' + re.escape(quote[1:]) + '))'
+  return normal + '(?:' + special + normal + ')*' + re.escape(quote)
+
+
+def _string_literal_regexes(
+  accepted_prefixes: t.Optional[str],
+  quote_sequences: t.Sequence[str],
+) -> t.Tuple[t.Optional['re.Pattern'], 're.Pattern', t.Dict[str, 're.Pattern']]:
+  prefix_regex = re.compile(r'[' + re.escape(accepted_prefixes) + r']+') if accepted_prefixes else None
+  quote_regex = re.compile(r'(' + r'|'.join(re.escape(s) for s in quote_sequences) + r')')
+  body_regexes = {s: re.compile(_string_body_pattern(s, len(s) > 1)) for s in quote_sequences}
+  return prefix_regex, quote_regex, body_regexes
 
 
 def string_literal(
@@ -42,26 +95,66 @@ def string_literal(
   quote_sequences: t.Sequence[str] = ('"""', "'''", '"', "'"),
 ) -> TokenExtractor[str]:
   """
-  Matches a Python string literal.
+  Matches a Python string literal. The token value is the string literal as it appears in the
+  text. Use #string_literal_value() to get the decoded contents instead.
   """
 
+  prefix_regex, quote_regex, body_regexes = _string_literal_regexes(accepted_prefixes, quote_sequences)
+
   def _impl(scanner: 'Scanner') -> t.Optional[str]:
-    prefix = (scanner.getmatch(r'[' + re.escape(accepted_prefixes) + r']+') or '') \
-        if accepted_prefixes else ''
-    quote_type = scanner.getmatch(r'(' + r'|'.join(re.escape(s) for s in quote_sequences) + r')')
+    prefix = (scanner.getmatch(prefix_regex) or '') if prefix_regex else ''
+    quote_type = scanner.getmatch(quote_regex)
+    if not quote_type:
+      return None
+    body = scanner.getmatch(body_regexes[quote_type])
+    if body is None:
+      return None
+    return prefix + quote_type + body
+
+  return TokenExtractor.of(_impl)
+
+
+def string_literal_value(
+  accepted_prefixes: t.Optional[str] = 'bfru',
+  quote_sequences: t.Sequence[str] = ('"""', "'''", '"', "'"),
+  escapes: t.Mapping[str, str] = ESCAPES,
+  hex_escapes: t.Mapping[str, int] = HEX_ESCAPES,
+  raw_prefixes: str = 'rR',
+) -> TokenExtractor[StringLiteral]:
+  """
+  Matches a string literal like #string_literal() and returns its decoded contents as a
+  #StringLiteral. Escape sequences are decoded through the *escapes* table, which maps the
+  character after the backslash to its replacement, and *hex_escapes*, which maps the character
+  after the backslash to the number of hex digits that encode a code point. Unknown escape
+  sequences are kept as they are. Escape sequences are not decoded if the prefix of the string
+  literal contains one of the *raw_prefixes*.
+  """
+
+  prefix_regex, quote_regex, body_regexes = _string_literal_regexes(accepted_prefixes, quote_sequences)
+  escape_regex = re.compile(r'\\(' + ''.join(
+    re.escape(k) + '[0-9a-fA-F]{' + str(n) + '}|' for k, n in hex_escapes.items()) + r'[\s\S])')
+
+  def _decode_escape(match: 're.Match') -> str:
+    sequence = match.group(1)
+    if len(sequence) > 1:
+      try:
+        return chr(int(sequence[1:], 16))
+      except ValueError:
+        return match.group(0)
+    return escapes.get(sequence, match.group(0))
+
+  def _impl(scanner: 'Scanner') -> t.Optional[StringLiteral]:
+    start = scanner.pos.offset
+    prefix = (scanner.getmatch(prefix_regex) or '') if prefix_regex else ''
+    quote_type = scanner.getmatch(quote_regex)
     if not quote_type:
       return None
-    is_multiline = len(quote_type) > 1
-    contents = ''
-    while scanner.char and (is_multiline or scanner.char != '\n'):
-      if scanner.match(re.escape(quote_type)):
-        break
-      contents += scanner.char
-      if scanner.char == '\\':
-        contents += scanner.next()
-      scanner.next()
-    else:
+    body = scanner.getmatch(body_regexes[quote_type])
+    if body is None:
       return None
-    return prefix + quote_type + contents + quote_type
+    value = body[:-len(quote_type)]
+    if '\\' in value and not any(c in raw_prefixes for c in prefix):
+      value = escape_regex.sub(_decode_escape, value)
+    return StringLiteral(value, prefix, quote_type, (start, scanner.pos.offset))
 
   return TokenExtractor.of(_impl)
@@ -1,7 +1,10 @@
 
+import bisect
 import enum
 import re
+import sys
 import typing as t
+import weakref
 
 T = t.TypeVar('T')
 U = t.TypeVar('U')
@@ -19,6 +22,25 @@ class Seek(enum.Enum):
   END = enum.auto()
 
 
+class ScannerPin:
+  """
+  Returned by #Scanner.pin(). A #BufferedScanner keeps the text from the pinned offset onwards
+  available until the pin is released or garbage collected.
+  """
+
+  __slots__ = ('offset', 'active', '__weakref__')
+
+  def __init__(self, offset: int) -> None:
+    self.offset = offset
+    self.active = True
+
+  def __repr__(self) -> str:
+    return f'<ScannerPin offset={self.offset} active={self.active}>'
+
+  def release(self) -> None:
+    self.active = False
+
+
 class Scanner:
   """
   A utility class to scan through text.
@@ -31,6 +53,12 @@ class Scanner:
     self.index = 0
     self.lineno = 1
     self.colno = 0
+    self._patterns: t.Dict[t.Tuple[str, int], 're.Pattern'] = {}
+
+    # The offsets at which the lines start, for all newlines before #_indexed. The index is
+    # extended lazily as offsets further in the text are looked up.
+    self._line_starts: t.List[int] = [0]
+    self._indexed = 0
 
   def __repr__(self) -> str:
     return f'<Scanner at {self.lineno}:{self.colno}>'
@@ -63,7 +91,7 @@ class Scanner:
     """
     Moves the cursor of the Scanner to or by *offset* depending on the *mode*. The method is
     similar to a file's `seek()` method, but ensures that the line and column counts are tracked
-    correctly.
+    correctly. The line number is looked up in O(log n) (see #get_cursor()).
     """
 
     if isinstance(mode, str):
@@ -89,54 +117,7 @@ class Scanner:
     if self.index == offset:
       return
 
-    # Update line/column counts. Figure which path is shorter:
-    # 1) Start counting from the beginning of the file,
-    if offset <= abs(self.index - offset):
-      text, index, lineno, colno = self.text, 0, 1, 0
-      while index != offset:
-        # Find the next newline in the string.
-        nli = text.find('\n', index)
-        if nli >= offset or nli < 0:
-          colno = offset - index
-          index = offset
-          break
-        else:
-          colno = 0
-          lineno += 1
-          index = nli + 1
-
-    # 2) or step from the current position of the cursor.
-    else:
-      text, index, lineno, colno = self.text, self.index, self.lineno, self.colno
-
-      if offset < index:  # backwards
-        while index != offset:
-          nli = text.rfind('\n', 0, index)
-          if nli < 0 or nli <= offset:
-            if text[offset] == '\n':
-              assert (offset - nli) == 0, (offset, nli)
-              nli = text.rfind('\n', 0, index-1)
-              lineno -= 1
-            colno = offset - nli - 1
-            index = offset
-            break
-          else:
-            lineno -= 1
-            index = nli - 1
-      else:  # forwards
-        while index != offset:
-          nli = text.find('\n', index)
-          if nli < 0 or nli >= offset:
-            colno = offset - index
-            index = offset
-          else:
-            lineno += 1
-            index = nli + 1
-
-    assert lineno >= 1
-    assert colno >= 0
-    assert index == offset
-    self.index, self.lineno, self.colno = index, lineno, colno
+    self.index, self.lineno, self.colno = self.get_cursor(offset)
 
   def next(self) -> str:
     """ Move on to the next character in the text. """
@@ -168,6 +149,60 @@ class Scanner:
       self.colno += end - start
     return result
 
+  def _index_lines(self, offset: int) -> None:
+    """ Extends the line index to cover all newlines before *offset*. """
+
+    if offset <= self._indexed:
+      return
+    text, line_starts = self.text, self._line_starts
+    nli = text.find('\n', self._indexed, offset)
+    while nli >= 0:
+      line_starts.append(nli + 1)
+      nli = text.find('\n', nli + 1, offset)
+    self._indexed = offset
+
+  def get_cursor(self, offset: int) -> Cursor:
+    """
+    Returns the #Cursor for the given *offset* in the text. The line number is looked up with
+    a binary search in an index of line start offsets that is extended lazily, so the cost does
+    not depend on the distance to the scanner's current position.
+    """
+
+    if offset < 0:
+      raise ValueError(f'offset must not be negative, got {offset}')
+    self._index_lines(offset)
+    line = bisect.bisect_right(self._line_starts, offset)
+    return Cursor(offset, line, offset - self._line_starts[line - 1])
+
+  def pin(self) -> ScannerPin:
+    """
+    Pins the current position of the scanner, so that it can be restored via #pos later. This
+    is only relevant for a #BufferedScanner, the #Scanner always keeps the complete text.
+    """
+
+    return ScannerPin(self.index)
+
+  def fill(self) -> None:
+    """
+    Called by the #Tokenizer before it extracts a token at the current position. A
+    #BufferedScanner discards text that is no longer needed and reads ahead from its stream.
+    """
+
+  def compile(self, regex: t.Union[str, 're.Pattern'], flags: int = 0) -> 're.Pattern':
+    """
+    Returns the compiled pattern for *regex*. String patterns are compiled once per scanner and
+    cached, so that repeatedly matching the same string pattern does not depend on (and compete
+    for) the small global cache of the #re module.
+    """
+
+    if not isinstance(regex, str):
+      return regex
+    try:
+      return self._patterns[(regex, flags)]
+    except KeyError:
+      pattern = self._patterns[(regex, flags)] = re.compile(regex, flags)
+      return pattern
+
   def match(self, regex: t.Union[str, 're.Pattern'], flags: int = 0, *,
       _search: bool = False) -> t.Optional[t.Match[str]]:
     """
@@ -176,15 +211,22 @@ class Scanner:
     """
 
     if isinstance(regex, str):
-      regex = re.compile(regex, flags)
+      regex = self.compile(regex, flags)
     match = (regex.search if _search else regex.match)(self.text, self.index)
     if not match:
       return None
-    start, end = match.start(), match.end()
     if not _search:
-      assert start == self.index
-    else:
-      start = self.index
+      assert match.start() == self.index
+    self.advance(match.end())
+    return match
+
+  def advance(self, end: int) -> None:
+    """
+    Moves the scanner forward to the index *end* in the #text and updates the line and column
+    numbers, e.g. after matching a regex against the #text without #match().
+    """
+
+    start = self.index
     lines = self.text.count('\n', start, end)
     self.index = end
     if lines:
@@ -192,7 +234,6 @@ class Scanner:
       self.lineno += lines
     else:
       self.colno += end - start
-    return match
 
   def search(self, regex: t.Union[str, 're.Pattern'], flags: int = 0) -> t.Optional['re.Match']:
     """
@@ -214,11 +255,193 @@ class Scanner:
       return match.group(group)
     return None
 
-  def getline(self, cursor: Cursor) -> str:
-    """ Returns the contents of the current line marked by the specified cursor location. """
+  def getline(self, cursor: t.Union[Cursor, int]) -> str:
+    """
+    Returns the contents of the current line marked by the specified cursor location or offset.
+    """
 
+    if not isinstance(cursor, Cursor):
+      cursor = self.get_cursor(cursor)
     start = cursor.offset - cursor.column
     end = self.text.find('\n', start)
     if end < 0:
       end = len(self.text)
     return self.text[start:end]
+
+
+class BufferedScanner(Scanner):
+  """
+  A #Scanner that reads its text from a text *stream* in chunks of *chunk_size* characters, so
+  that the input does not need to be loaded into memory as a whole.
+
+  The scanner keeps a sliding window of the stream in #text. #index and the offsets in match
+  objects are relative to that window, while #pos and #get_cursor() use offsets in the whole
+  stream. Text before the current position is discarded in #fill() unless it is referenced by
+  an active #pin() (as is the case for a #TokenizerState), so the memory used by the scanner is
+  bounded by the lookahead and the distance to the oldest checkpoint rather than the size of the
+  input. Regular expressions are matched with at least *lookahead* characters in the buffer (or
+  the rest of the stream), thus a single regex match cannot be longer than that. #search() only
+  searches the buffered text.
+  """
+
+  def __init__(self, stream: t.TextIO, chunk_size: int = 65536, lookahead: t.Optional[int] = None) -> None:
+    if chunk_size <= 0:
+      raise ValueError(f'chunk_size must be positive, got {chunk_size}')
+    super().__init__('')
+    self.stream = stream
+    self.chunk_size = chunk_size
+    self.lookahead = chunk_size if lookahead is None else lookahead
+    self._base = 0
+    self._first_line = 1
+    self._eof = False
+    self._pins: 'weakref.WeakSet[ScannerPin]' = weakref.WeakSet()
+    self.fill()
+
+  def __bool__(self) -> bool:
+    if self.index >= len(self.text):
+      self._read(self.index - len(self.text) + 1)
+    return self.index < len(self.text)
+
+  @property
+  def pos(self) -> Cursor:
+    return Cursor(self._base + self.index, self.lineno, self.colno)
+
+  @pos.setter
+  def pos(self, cursor: Cursor) -> None:
+    if not isinstance(cursor, Cursor):
+      raise TypeError(f'expected Cursor object {type(cursor).__name__}')
+    index = cursor.offset - self._base
+    if index < 0:
+      raise ValueError(f'offset {cursor.offset} is no longer buffered')
+    self.index, self.lineno, self.colno = index, cursor.line, cursor.column
+
+  @property
+  def char(self) -> str:
+    if self.index >= len(self.text):
+      self._read(self.index - len(self.text) + 1)
+    if 0 <= self.index < len(self.text):
+      return self.text[self.index]
+    return ''
+
+  def _read(self, size: int) -> None:
+    """ Reads at least *size* more characters from the stream, unless it is exhausted. """
+
+    parts = [self.text]
+    count = 0
+    while count < size and not self._eof:
+      data = self.stream.read(self.chunk_size)
+      if not isinstance(data, str):
+        raise TypeError(f'expected a text stream, got {type(data).__name__} from read()')
+      if not data:
+        self._eof = True
+        break
+      parts.append(data)
+      count += len(data)
+    if count:
+      self.text = ''.join(parts)
+
+  def _discard(self) -> None:
+    """ Discards the text before the current position and the oldest active pin. """
+
+    if self.index < self.chunk_size:
+      return
+    offset = self._base + self.index
+    for pin in list(self._pins):
+      if pin.active:
+        offset = min(offset, pin.offset)
+      else:
+        self._pins.discard(pin)
+    drop = offset - self._base
+    if drop < self.chunk_size:
+      return
+    self._index_lines(offset)
+    first = bisect.bisect_right(self._line_starts, offset) - 1
+    self._first_line += first
+    del self._line_starts[:first]
+    self.text = self.text[drop:]
+    self.index -= drop
+    self._base = offset
+
+  def fill(self) -> None:
+    self._discard()
+    missing = self.lookahead - (len(self.text) - self.index)
+    if missing > 0:
+      self._read(missing)
+
+  def pin(self) -> ScannerPin:
+    pin = ScannerPin(self._base + self.index)
+    self._pins.add(pin)
+    return pin
+
+  def seek(self, offset: int, mode: t.Union[str, Seek] = Seek.SET) -> None:
+    """
+    Moves the cursor to or by *offset*, see #Scanner.seek(). Seeking relative to the end reads
+    the rest of the stream. Seeking before the start of the buffered text raises a #ValueError.
+    """
+
+    if isinstance(mode, str):
+      mode = Seek[mode.upper()]
+    if mode == Seek.END:
+      self._read(sys.maxsize)
+      offset += self._base + len(self.text)
+    elif mode == Seek.CUR:
+      offset += self._base + self.index
+    elif mode != Seek.SET:
+      raise ValueError(f'invalid mode: {mode!r}')
+    offset = max(offset, 0)
+    if offset < self._base:
+      raise ValueError(f'offset {offset} is no longer buffered')
+    if offset > self._base + len(self.text):
+      self._read(offset - self._base - len(self.text))
+      offset = min(offset, self._base + len(self.text))
+    cursor = self.get_cursor(offset)
+    self.index, self.lineno, self.colno = offset - self._base, cursor.line, cursor.column
+
+  def readline(self) -> str:
+    searched = self.index
+    while self.text.find('\n', searched) < 0 and not self._eof:
+      searched = len(self.text)
+      self._read(self.chunk_size)
+    return super().readline()
+
+  def match(self, regex: t.Union[str, 're.Pattern'], flags: int = 0, *,
+      _search: bool = False) -> t.Optional[t.Match[str]]:
+    missing = self.lookahead - (len(self.text) - self.index)
+    if missing > 0:
+      self._read(missing)
+    return super().match(regex, flags, _search=_search)
+
+  def _index_lines(self, offset: int) -> None:
+    end = min(offset, self._base + len(self.text))
+    if end <= self._indexed:
+      return
+    base, text, line_starts = self._base, self.text, self._line_starts
+    nli = text.find('\n', self._indexed - base, end - base)
+    while nli >= 0:
+      line_starts.append(base + nli + 1)
+      nli = text.find('\n', nli + 1, end - base)
+    self._indexed = end
+
+  def get_cursor(self, offset: int) -> Cursor:
+    if offset < self._base:
+      raise ValueError(f'offset {offset} is no longer buffered')
+    if offset > self._base + len(self.text):
+      self._read(offset - self._base - len(self.text))
+    self._index_lines(offset)
+    line = bisect.bisect_right(self._line_starts, offset)
+    return Cursor(offset, self._first_line + line - 1, offset - self._line_starts[line - 1])
+
+  def getline(self, cursor: t.Union[Cursor, int]) -> str:
+    if not isinstance(cursor, Cursor):
+      cursor = self.get_cursor(cursor)
+    start = cursor.offset - cursor.column - self._base
+    if start < 0:
+      raise ValueError(f'line {cursor.line} is no longer buffered')
+    searched = start
+    while self.text.find('\n', searched) < 0 and not self._eof:
+      searched = len(self.text)
+      self._read(self.chunk_size)
+    end = self.text.find('\n', start)
+    if end < 0:
+      end = len(self.text)
+    return self.text[start:end]
@@ -0,0 +1,138 @@
+
+import pytest
+from nr.parsing.core import MemoTable, RuleSet, Tokenizer, TokenizationError, UnexpectedTokenError, rules
+
+ruleset = RuleSet()
+ruleset.rule('number', rules.regex_extract(r'\d+'))
+ruleset.rule('operator', rules.regex_extract(r'[\+\*]'))
+ruleset.rule('whitespace', rules.regex_extract(r'\s+'), skip=True)
+
+
+def make_parser(text: str, memoize: bool):
+  """
+  A parser with ordered choice and backtracking, which is exponential without memoization:
+
+    expr = term '+' expr | term
+    term = number '*' term | number
+  """
+
+  tokenizer = Tokenizer(ruleset, text)
+  memo = MemoTable(tokenizer)
+  calls = []
+  decorate = memo.memoize if memoize else (lambda f: f)
+
+  def number():
+    calls.append('number')
+    value = int(tokenizer.current.value) if tokenizer.current.type == 'number' else None
+    if value is None:
+      raise UnexpectedTokenError(tokenizer.current, {'number'})
+    tokenizer.next()
+    return value
+
+  def binary(operand, operator):
+    def parse():
+      state = tokenizer.state
+      left = operand()
+      if tokenizer.current.tv == ('operator', operator):
+        tokenizer.next()
+        try:
+          right = parse()
+        except UnexpectedTokenError:
+          tokenizer.state = state
+        else:
+          return (operator, left, right)
+      tokenizer.state = state
+      return operand()
+    return decorate(parse)
+
+  term = binary(decorate(number), '*')
+  expr = binary(term, '+')
+  return expr, calls, memo
+
+
+def test_memo_table():
+  text = ' + '.join(['1 * 2 * 3'] * 4)
+  expr, calls, memo = make_parser(text, False)
+  expected = expr()
+  unmemoized_calls = len(calls)
+
+  expr, calls, memo = make_parser(text, True)
+  assert expr() == expected
+  assert len(calls) == 12
+  assert len(calls) < unmemoized_calls
+  assert memo.hits > 0
+
+
+def test_memo_table_failure_and_eviction():
+  tokenizer = Tokenizer(ruleset, '1 2 3')
+  memo = MemoTable(tokenizer, maxsize=2)
+
+  def fail():
+    tokenizer.next()
+    raise TokenizationError('fail')
+
+  tokenizer.next()
+  state = tokenizer.state
+  with pytest.raises(TokenizationError):
+    memo.apply('fail', fail)
+  tokenizer.state = state
+  with pytest.raises(TokenizationError):
+    memo.apply('fail', lambda: pytest.fail('not memoized'))
+  assert tokenizer.current.value == '2'
+
+  tokenizer.state = state
+  memo.apply('a', lambda: 'a')
+  memo.apply('b', lambda: 'b')
+  assert len(memo) == 2
+  assert memo.apply('a', lambda: 'x') == 'a'
+  memo.discard_before(2)
+  assert len(memo) == 0
+
+
+def test_memo_table_keys_on_tokenizer_config():
+  tokenizer = Tokenizer(ruleset, '1 2')
+  memo = MemoTable(tokenizer)
+
+  assert memo.apply('next', lambda: tokenizer.next().type) == 'number'
+  tokenizer.state = Tokenizer(ruleset, '1 2').state
+  with tokenizer.skipped.set('whitespace', False):
+    assert memo.apply('next', lambda: tokenizer.next().type) == 'number'
+    assert memo.apply('next', lambda: tokenizer.next().type) == 'whitespace'
+  assert memo.misses == 3
+
+
+def test_memo_table_replayed_error_traceback_does_not_grow():
+  tokenizer = Tokenizer(ruleset, '1')
+  memo = MemoTable(tokenizer)
+
+  def fail():
+    raise TokenizationError('fail')
+
+  depths = []
+  for _ in range(5):
+    with pytest.raises(TokenizationError) as excinfo:
+      memo.apply('fail', fail)
+    tb, depth = excinfo.value.__traceback__, 0
+    while tb is not None:
+      tb, depth = tb.tb_next, depth + 1
+    depths.append(depth)
+  assert len(set(depths[1:])) == 1
+  assert depths[-1] <= depths[0]
+
+
+def test_memo_table_releases_pins():
+  import io
+  from nr.parsing.core import BufferedScanner
+
+  expr = ' + '.join(str(i) for i in range(1000))
+  scanner = BufferedScanner(io.StringIO(expr), chunk_size=16)
+  tokenizer = Tokenizer(ruleset, scanner)
+  memo = MemoTable(tokenizer)
+  memo.apply('next', tokenizer.next)
+  pins = [entry.state.pin for entry in memo._entries.values()]
+  assert all(pin.active for pin in pins)
+
+  memo.clear()
+  assert not any(pin.active for pin in pins)
+  assert len([token for token in tokenizer]) > 0
+  assert len(scanner.text) < 64
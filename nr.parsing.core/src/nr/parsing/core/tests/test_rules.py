@@ -6,3 +6,48 @@ from nr.parsing.core.scanner import Scanner
 def test_string_literal():
   assert rules.string_literal().get_token(Scanner(' f"foobar"')) == None
   assert rules.string_literal().get_token(Scanner('f"foobar"')) == 'f"foobar"'
+
+
+def test_regex_flags():
+  import re
+  extractor = rules.regex('foo', flags=re.I)
+  assert extractor.get_token(Scanner('FOO')).group(0) == 'FOO'
+  assert rules.regex(re.compile('bar')).get_token(Scanner('bar')).group(0) == 'bar'
+  assert rules.regex_extract(r'(\w)\w+', 1, flags=re.I).get_token(Scanner('Baz')) == 'B'
+
+
+def test_string_literal_matches_original_semantics():
+  extractor = rules.string_literal()
+  assert extractor.get_token(Scanner('"foo\\"bar" baz')) == '"foo\\"bar"'
+  assert extractor.get_token(Scanner("'foo\nbar'")) is None
+  assert extractor.get_token(Scanner("'foo\\\nbar'")) == "'foo\\\nbar'"
+  assert extractor.get_token(Scanner('"""a\n"b"\n"""" ')) == '"""a\n"b"\n"""'
+  assert extractor.get_token(Scanner('"""foo"')) is None
+  assert extractor.get_token(Scanner('rb"\\"')) is None
+  assert extractor.get_token(Scanner('""')) == '""'
+
+  scanner = Scanner('"""a\nb""" c')
+  extractor.get_token(scanner)
+  assert scanner.pos == (9, 2, 4)
+
+
+def test_string_literal_value():
+  extractor = rules.string_literal_value()
+  assert extractor.get_token(Scanner(' "foo"')) is None
+  result = extractor.get_token(Scanner('"a\\tb\\x41\\u00e4\\q\\\\" rest'))
+  assert result == rules.StringLiteral('a\tbAä\\q\\', '', '"', (0, 20))
+  assert extractor.get_token(Scanner('r"a\\tb"')).value == 'a\\tb'
+  assert extractor.get_token(Scanner("'''x\ny'''")).span == (0, 9)
+
+  extractor = rules.string_literal_value(escapes={'n': '\n'}, hex_escapes={})
+  assert extractor.get_token(Scanner('"a\\n\\t\\x41"')).value == 'a\n\\t\\x41'
+
+
+def test_string_literal_unterminated_is_linear():
+  import time
+  for extractor in (rules.string_literal(), rules.string_literal_value()):
+    for text in ['"' + 'a' * 20000, '"' + 'a' * 20000 + '\n', '"""' + 'a' * 20000, '"""' + 'a"' * 10000,
+        "'" + 'a\\\\' * 10000]:
+      start = time.perf_counter()
+      assert extractor.get_token(Scanner(text)) is None
+      assert time.perf_counter() - start < 0.5, text[:10]
@@ -1,3 +1,4 @@
+import pytest
 
 from nr.parsing.core import Cursor, Scanner
 
@@ -73,3 +74,55 @@ def test_search():
   assert m.start() == 3
   assert m.group(0) == 'bar'
   assert s.index == 6
+
+
+def test_compile():
+  s = Scanner('foobar')
+  assert s.compile('foo') is s.compile('foo')
+  assert s.compile('foo') is not s.compile('foo', 2)
+
+
+def test_get_cursor():
+  text = 'foo\n\nbar\nbaz'
+  s = Scanner(text)
+  for offset in [11, 0, 4, 3, 5, 12, 9, 1]:
+    lines = text[:offset].split('\n')
+    assert s.get_cursor(offset) == Cursor(offset, len(lines), len(lines[-1]))
+    s.seek(offset)
+    assert s.pos == Cursor(offset, len(lines), len(lines[-1]))
+  assert s.getline(6) == 'bar'
+  assert s.getline(s.get_cursor(4)) == ''
+
+
+def test_buffered_scanner():
+  import io
+  from nr.parsing.core import BufferedScanner
+
+  text = 'foo\nbar baz\n' * 50
+  s = BufferedScanner(io.StringIO(text), chunk_size=8)
+  words = []
+  while s:
+    s.fill()
+    s.match(r'\s+')
+    pos = s.pos
+    m = s.match(r'\w+')
+    if m:
+      assert Scanner(text).get_cursor(pos.offset) == pos
+      words.append(m.group(0))
+    assert len(s.text) <= 32
+  assert words == ['foo', 'bar', 'baz'] * 50
+  assert s.pos == Scanner(text).get_cursor(len(text))
+
+  s = BufferedScanner(io.StringIO(text), chunk_size=8)
+  s.seek(20)
+  pin = s.pin()
+  s.seek(200)
+  s.fill()
+  assert s.getline(s.pos) == 'bar baz'
+  s.pos = Scanner(text).get_cursor(20)
+  assert s.readline() == 'baz\n'
+  pin.release()
+  s.seek(300)
+  s.fill()
+  with pytest.raises(ValueError):
+    s.seek(20)
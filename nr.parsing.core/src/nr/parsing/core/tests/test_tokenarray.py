@@ -0,0 +1,107 @@
+
+import pytest
+from nr.parsing.core import RuleSet, TokenArray, TokenCache, Tokenizer, UnexpectedTokenError, rules
+
+ruleset = RuleSet()
+ruleset.rule('number', rules.regex_extract(r'\d+'))
+ruleset.rule('name', rules.regex(r'[a-z]+'))
+ruleset.rule('whitespace', rules.regex_extract(r'\s+'), skip=True)
+
+TEXT = 'foo 12\nbar  3 baz'
+
+
+def test_record_and_replay():
+  tokens = TokenArray.record(Tokenizer(ruleset, TEXT))
+  assert len(tokens) == 5
+  assert tokens.types == ['name', 'number']
+  assert list(tokens.type_ids) == [0, 1, 0, 1, 0]
+  assert tokens.span(2) == (7, 10)
+  assert tokens.value(3) == '3'
+
+  expected = [(t.type, t.value if isinstance(t.value, str) else t.value.group(0), t.pos)
+    for t in Tokenizer(ruleset, TEXT)]
+  replay = tokens.replay()
+  assert [(t.type, t.value, t.pos) for t in replay] == expected
+  assert replay.current.eof
+  assert replay.current.tv == ('eof', '')
+
+  replay = tokens.replay()
+  assert replay.current.tv == ('name', 'foo')
+  state = replay.state
+  assert replay.next(expect={'number'}).tv == ('number', '12')
+  with pytest.raises(UnexpectedTokenError):
+    replay.next(select={'number'})
+  replay.state = state
+  assert replay.next(unselect={'name'}).value == '12'
+
+
+def test_to_bytes():
+  tokens = TokenArray.record(Tokenizer(ruleset, TEXT))
+  data = tokens.to_bytes()
+  loaded = TokenArray.from_bytes(data, TEXT)
+  assert loaded.types == tokens.types
+  assert loaded.sentinel == tokens.sentinel
+  assert list(loaded) == list(tokens)
+  with pytest.raises(ValueError):
+    TokenArray.from_bytes(data[:-1], TEXT)
+
+
+def test_token_cache(tmp_path):
+  for cache in [TokenCache(), TokenCache(str(tmp_path), 'test')]:
+    assert cache.get(TEXT) is None
+    tokens = cache.tokenize(ruleset, TEXT)
+    assert list(cache.get(TEXT)) == list(tokens)
+    assert cache.get(TEXT + ' ') is None
+
+
+comment_ruleset = RuleSet()
+comment_ruleset.rule('number', rules.regex_extract(r'\d+'))
+comment_ruleset.rule('name', rules.regex(r'[a-z]+'))
+comment_ruleset.rule('comment', rules.regex_extract(r'#[^\n]*'), skip=True)
+comment_ruleset.rule('whitespace', rules.regex_extract(r'\s+'), skip=True)
+
+
+@pytest.mark.parametrize('rules_,prefix,alphabet', [
+  (ruleset, '', 'ab1 \n'),
+  (ruleset, '  \n ', 'ab1 \n'),
+  (comment_ruleset, '# comment\n  ', 'ab1 \n#'),
+])
+def test_apply_edit(rules_, prefix, alphabet):
+  import random
+  rng = random.Random(42)
+  text = prefix + ' '.join(rng.choice(['foo', '42', 'bar\n', '7', '# x\n']) for _ in range(50))
+  if rules_ is ruleset:
+    text = text.replace('#', '')
+  tokens = TokenArray.record(Tokenizer(rules_, text))
+  for _ in range(500):
+    # Favour edits at the start of the text, before the first token.
+    limit = len(tokens.text) if rng.random() < 0.5 else min(len(tokens.text), 12)
+    offset = rng.randrange(limit + 1)
+    deleted = rng.randrange(min(5, len(tokens.text) - offset) + 1)
+    inserted = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(4)))
+    updated = tokens.apply_edit(rules_, offset, deleted, inserted)
+    expected = TokenArray.record(Tokenizer(rules_, updated.text))
+    assert updated.text == tokens.text[:offset] + inserted + tokens.text[offset + deleted:]
+    assert [updated.type(i) for i in range(len(updated))] == [expected.type(i) for i in range(len(expected))]
+    assert list(updated.starts) == list(expected.starts)
+    assert list(updated.ends) == list(expected.ends)
+    tokens = updated
+
+
+def test_apply_edit_before_first_token():
+  tokens = TokenArray.record(Tokenizer(ruleset, '  foo bar'))
+  updated = tokens.apply_edit(ruleset, 0, 0, 'x ')
+  assert [updated.value(i) for i in range(len(updated))] == ['x', 'foo', 'bar']
+
+
+def test_apply_edit_only_tokenizes_the_edited_region():
+  calls = []
+  counting = RuleSet()
+  counting.rule('number', rules.regex_extract(r'\d+').map(lambda v: calls.append(v) or v))
+  counting.rule('whitespace', rules.regex_extract(r'\s+'), skip=True)
+  tokens = TokenArray.record(Tokenizer(counting, ' '.join(['1'] * 1000)))
+  calls.clear()
+  updated = tokens.apply_edit(counting, 1000, 1, '234')
+  assert updated.value(500) == '234'
+  assert updated.span(501) == (1004, 1005)
+  assert len(calls) <= 4
@@ -3,7 +3,7 @@ import typing as t
 from nr.parsing.core.scanner import Cursor
 from nr.parsing.core.tokenizer.tokenizer import Token
 import pytest
-from nr.parsing.core import RuleSet, Tokenizer, rules
+from nr.parsing.core import RuleSet, Tokenizer, TokenizationError, UnexpectedTokenError, rules
 
 
 ruleset = RuleSet()
@@ -66,3 +66,185 @@ def test_next_sentinel():
   tok = Tokenizer(ruleset, 'aaaa')
   assert tok.next({'a', 'eof'}) == Token('a', 'aaaa', Cursor(0, 1, 0), False)
   assert tok.next({'a', 'eof'}) == Token('eof', '', Cursor(4, 1, 4), True)
+
+
+def test_regex_rules_are_folded():
+  from nr.parsing.core.tokenizer.ruleset import RegexRuleGroup
+
+  def _unfolded(extractor):
+    return rules.TokenExtractor.of(extractor.get_token)
+
+  ruleset = RuleSet()
+  ruleset.rule('indent', rules.regex_extract('[ ]*', at_line_start_only=True))
+  ruleset.rule('keyword', rules.regex_extract(r'(if|else)\b'))
+  ruleset.rule('name', rules.regex_extract(r'\w+'))
+  ruleset.rule('string', rules.string_literal())
+  ruleset.rule('backref', rules.regex_extract(r'(\$+)x\1'))
+  ruleset.rule('ws', rules.regex_extract(' +'), skip=True)
+  ruleset.rule('newline', rules.regex_extract('\n'), skip=True)
+  ruleset.rule('op', rules.regex_extract(r'[=$x]'))
+
+  reference = RuleSet()
+  for rule in ruleset:
+    reference.rule(rule.type, _unfolded(rule.extractor), rule.skip)
+
+  compiled = ruleset.compile()
+  assert [type(x).__name__ for x in compiled] == ['RegexRuleGroup', 'Rule', 'Rule', 'RegexRuleGroup']
+  assert isinstance(compiled[0], RegexRuleGroup) and len(compiled[0].rules) == 3
+  assert not any(isinstance(x, RegexRuleGroup) for x in reference.compile())
+
+  text = 'if foo\n  x = "bar" else $$x$$ $x$\n  elsewhere'
+  assert [x.tv for x in Tokenizer(ruleset, text)] == [x.tv for x in Tokenizer(reference, text)]
+
+  tok = Tokenizer(ruleset, 'if else')
+  assert tok.next(select={'name'}).tv == ('name', 'if')
+  assert tok.next(select={'keyword'}).tv == ('keyword', 'else')
+
+
+def test_regex_rules_with_flags_are_folded():
+  import re
+  ruleset = RuleSet()
+  ruleset.rule('keyword', rules.regex(r'select|from', flags=re.I))
+  ruleset.rule('name', rules.regex(r'\w+'))
+  ruleset.rule('ws', rules.regex(r'\s+'), skip=True)
+  assert [type(x).__name__ for x in ruleset.compile()] == ['RegexRuleGroup']
+  tokens = [(t.type, t.value.group(0)) for t in Tokenizer(ruleset, 'SELECT a From b')]
+  assert tokens == [('keyword', 'SELECT'), ('name', 'a'), ('keyword', 'From'), ('name', 'b')]
+
+
+def test_folded_regex_rules_reuse_the_combined_match():
+  import re
+  from nr.parsing.core.tokenizer.extractor import GroupMatch
+
+  ruleset = RuleSet()
+  ruleset.rule('pair', rules.regex(r'(?P<key>\w+)=(\d+)?(?P<unit>px)?'))
+  ruleset.rule('word', rules.regex(r'(\w)(\w*)'))
+  ruleset.rule('ws', rules.regex(r'\s+'), skip=True)
+  text = 'width=10px\nheight= foo'
+
+  tokens = list(Tokenizer(ruleset, text))
+  assert all(isinstance(x.value, GroupMatch) for x in tokens)
+  for token in tokens:
+    expected = token.value.re.match(text, token.pos.offset)
+    assert token.value.group() == token.value[0] == expected.group()
+    assert token.value.groups() == expected.groups()
+    assert token.value.groups('-') == expected.groups('-')
+    assert token.value.groupdict() == expected.groupdict()
+    assert token.value.group(1, 2) == expected.group(1, 2)
+    assert token.value.span() == expected.span() and token.value.span(1) == expected.span(1)
+    assert token.value.string is text
+  assert tokens[0].value['key'] == 'width' and tokens[0].value.end('unit') == 10
+  assert tokens[1].value.group('unit') is None
+  assert tokens[1].pos == Cursor(11, 2, 0) and tokens[2].pos == Cursor(19, 2, 8)
+  with pytest.raises(IndexError):
+    tokens[0].value.group(4)
+  with pytest.raises(IndexError):
+    tokens[2].value.group('key')
+
+
+def test_tokenizer_with_buffered_scanner():
+  import io
+  from nr.parsing.core import BufferedScanner
+
+  expr = ' + '.join(str(i) for i in range(1000))
+  scanner = BufferedScanner(io.StringIO(expr), chunk_size=16)
+  tokenizer = Tokenizer(ruleset, scanner)
+  tokenizer.next()
+  state = tokenizer.state
+  values = [token.value for token in tokenizer]
+  assert values == [token.value for token in Tokenizer(ruleset, expr)]
+  tokenizer.state = state
+  assert tokenizer.current.value == '0'
+  del state
+  assert [token.value for token in tokenizer] == values
+  assert len(scanner.text) < 64
+
+
+def test_state_does_not_share_rule_config():
+  tokenizer = Tokenizer(ruleset, '1 + 2')
+  state = tokenizer.state
+  assert state.skipped.version == tokenizer.skipped.version
+  tokenizer.skipped.set('whitespace', False)
+  assert state.skipped.get('whitespace', None) is None
+  assert state.skipped.version != tokenizer.skipped.version
+
+  tokenizer.state = state
+  assert tokenizer.skipped.get('whitespace', None) is None
+  with tokenizer.skipped.set('whitespace', False):
+    assert [tokenizer.next().type, tokenizer.next().type] == ['number', 'whitespace']
+  assert state.skipped.get('whitespace', None) is None
+  tokenizer.state = state
+  assert [t.value for t in tokenizer] == ['1', '+', '2']
+
+  # States saved before and after a modification keep their own config.
+  tokenizer = Tokenizer(ruleset, '1 + 2')
+  before = tokenizer.state
+  assert tokenizer.state.skipped is before.skipped
+  assert before.pin is None
+  tokenizer.skipped.set('whitespace', False)
+  after = tokenizer.state
+  tokenizer.state = before
+  assert tokenizer.skipped.get('whitespace', None) is None
+  tokenizer.skipped.set('whitespace', True)
+  assert after.skipped.get('whitespace', None) is False
+  assert before.skipped.get('whitespace', None) is None
+  tokenizer.state = after
+  assert tokenizer.skipped.get('whitespace', None) is False
+
+
+def test_prepared_query():
+  tokenizer = Tokenizer(ruleset, '1 + 2 - 3')
+  numbers = tokenizer.prepare(select={'number'})
+  operators = tokenizer.prepare(expect={'operator'})
+  assert numbers.select == frozenset({'number'})
+  assert numbers.next().tv == ('number', '1')
+  assert operators.next().tv == ('operator', '+')
+  assert numbers.next().tv == ('number', '2')
+  with pytest.raises(UnexpectedTokenError):
+    numbers.next()
+  with pytest.raises(ValueError):
+    tokenizer.prepare(select={'foo'})
+
+  # The prepared rules are updated when the ignored token types change.
+  tokenizer = Tokenizer(ruleset, '1 + 2')
+  query = tokenizer.prepare()
+  assert query.next().tv == ('number', '1')
+  with tokenizer.ignored.set('whitespace', True):
+    with pytest.raises(TokenizationError):
+      query.next()
+
+
+def test_next_reuses_prepared_queries():
+  rules_ = RuleSet()
+  rules_.rule('number', rules.regex_extract(r'\d+'))
+  rules_.rule('whitespace', rules.regex_extract(r'\s+'), skip=True)
+  tokenizer = Tokenizer(rules_, '1 2 x 3')
+  assert tokenizer.next(select=['number']).tv == ('number', '1')
+  assert tokenizer.next(select=('number',)).tv == ('number', '2')
+  assert len(tokenizer._queries) == 1
+  with pytest.raises(ValueError):
+    tokenizer.next(select=['name'])
+
+  # The cached query is prepared again when the rule set changes.
+  rules_.rule('name', rules.regex_extract(r'[a-z]+'))
+  assert tokenizer.next(select=['name']).tv == ('name', 'x')
+  assert tokenizer.next(select=['number']).tv == ('number', '3')
+
+
+def test_skipping_does_not_recurse():
+  ruleset = RuleSet()
+  ruleset.rule('number', rules.regex_extract(r'\d+'))
+  ruleset.rule('space', rules.regex_extract(r' '), skip=True)
+  tokenizer = Tokenizer(ruleset, '1' + ' ' * 5000 + '2')
+  assert [t.value for t in tokenizer] == ['1', '2']
+
+
+def test_profile():
+  tokenizer = Tokenizer(ruleset, '1 + 2 - 3', debug=Tokenizer.Debug.PROFILE)
+  assert [t.value for t in tokenizer] == ['1', '+', '2', '-', '3']
+  profile = {p.rule.type: p for p in tokenizer.profile}
+  assert profile['number'].attempts == 9
+  assert profile['number'].matches == 3
+  assert profile['operator'].matches == 2
+  assert profile['whitespace'].matches == 4
+  assert all(p.time >= 0 for p in profile.values())
@@ -0,0 +1,340 @@
+
+import array
+import bisect
+import hashlib
+import json
+import os
+import struct
+import sys
+import typing as t
+
+from .scanner import BufferedScanner, Cursor, Scanner
+from .tokenizer.ruleset import RuleSet
+from .tokenizer.tokenizer import Token, Tokenizer, UnexpectedTokenError
+
+T = t.TypeVar('T')
+
+_MAGIC = b'NRTA'
+_FORMAT_VERSION = 1
+
+
+class TokenArray(t.Sequence[Token[T, str]]):
+  """
+  A compact recording of a token stream. Every token is stored as a triplet of a type id, its
+  start and its end offset in three #array.array#s, which takes a fraction of the memory of a
+  list of #Token objects. The token values are sliced from the #text when a token is accessed.
+
+  Token arrays are created with #record() and can be replayed with #replay(), which returns an
+  object with the same interface as the #Tokenizer for consuming tokens. #to_bytes() and
+  #from_bytes() convert the array to and from a binary representation for caching (see
+  #TokenCache).
+
+  Note that the replayed token values are always strings, even if the rule that produced the
+  token returned another value (e.g. a #re.Match object for #rules.regex()).
+  """
+
+  def __init__(self, text: str, sentinel: t.Tuple[T, t.Any] = ('eof', ''), types: t.Sequence[T] = ()) -> None:  # type: ignore
+    self.text = text
+    self.sentinel = sentinel
+    self.types: t.List[T] = []
+    self._type_ids: t.Dict[T, int] = {}
+    for token_type in types:
+      self._get_type_id(token_type)
+    self.type_ids = array.array('H')
+    self.starts = array.array('q')
+    self.ends = array.array('q')
+    self._scanner: t.Optional[Scanner] = None
+
+  def __repr__(self) -> str:
+    return f'<TokenArray tokens={len(self)} types={self.types!r}>'
+
+  def __len__(self) -> int:
+    return len(self.type_ids)
+
+  @t.overload
+  def __getitem__(self, index: int) -> Token[T, str]: ...
+
+  @t.overload
+  def __getitem__(self, index: slice) -> t.List[Token[T, str]]: ...
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    start = self.starts[index]
+    return Token(self.types[self.type_ids[index]], self.text[start:self.ends[index]],
+      self.get_cursor(start), False)
+
+  def _get_type_id(self, token_type: T) -> int:
+    try:
+      return self._type_ids[token_type]
+    except KeyError:
+      type_id = self._type_ids[token_type] = len(self.types)
+      self.types.append(token_type)
+      return type_id
+
+  def append(self, token_type: T, start: int, end: int) -> None:
+    self.type_ids.append(self._get_type_id(token_type))
+    self.starts.append(start)
+    self.ends.append(end)
+
+  def type(self, index: int) -> T:
+    return self.types[self.type_ids[index]]
+
+  def span(self, index: int) -> t.Tuple[int, int]:
+    return self.starts[index], self.ends[index]
+
+  def value(self, index: int) -> str:
+    return self.text[self.starts[index]:self.ends[index]]
+
+  def get_cursor(self, offset: int) -> Cursor:
+    """ Returns the #Cursor for an *offset* in the #text. """
+
+    if self._scanner is None:
+      self._scanner = Scanner(self.text)
+    return self._scanner.get_cursor(offset)
+
+  @classmethod
+  def record(cls, tokenizer: Tokenizer[T, t.Any]) -> 'TokenArray[T]':
+    """
+    Records the remaining tokens of the *tokenizer*, starting with its current token. Tokens
+    that are skipped by the tokenizer are not recorded.
+    """
+
+    if isinstance(tokenizer.scanner, BufferedScanner):
+      raise TypeError('cannot record the tokens of a BufferedScanner')
+    sentinel = tokenizer.rules.sentinel
+    result = cls(tokenizer.scanner.text, (sentinel.type, sentinel.value))
+    token = tokenizer.current
+    while token:
+      result.append(token.type, token.pos.offset, tokenizer.scanner.index)
+      token = tokenizer.next()
+    return result
+
+  def apply_edit(self, rules: RuleSet, offset: int, deleted: int, inserted: str,
+      lookbehind: int = 1) -> 'TokenArray[T]':
+    """
+    Returns the tokens for the #text with *deleted* characters at *offset* replaced by the
+    *inserted* text. Only the edited region is tokenized again: the tokenizer restarts at the
+    start of the token that contains the edit (or *lookbehind* tokens earlier, for rules whose
+    match depends on the text that follows) and stops as soon as it produces a token that
+    also exists, shifted by the length difference, in the old token stream after the edit.
+
+    The token array must have been recorded with a #Tokenizer for the same *rules* and the
+    default #Tokenizer.skipped and #Tokenizer.ignored configuration (e.g. by #TokenCache).
+    """
+
+    if offset < 0 or deleted < 0 or offset + deleted > len(self.text):
+      raise ValueError(f'invalid edit range: {offset}+{deleted}')
+    text = self.text[:offset] + inserted + self.text[offset + deleted:]
+    delta = len(inserted) - deleted
+    old_starts, old_ends, old_ids = self.starts, self.ends, self.type_ids
+
+    restart = bisect.bisect_right(old_starts, offset) - 1 - lookbehind
+    scanner = Scanner(text)
+    if restart < 0:
+      # No token precedes the edit, it may be in the skipped text before the first token.
+      restart = 0
+    else:
+      scanner.seek(old_starts[restart])
+
+    result: TokenArray[T] = type(self)(text, self.sentinel, self.types)
+    type_ids, starts, ends = result.type_ids, result.starts, result.ends
+    new_ids: t.List[int] = []
+    new_starts: t.List[int] = []
+    new_ends: t.List[int] = []
+    resync = len(self)
+    tokenizer = Tokenizer(rules, scanner)
+    token = tokenizer.current
+    while token:
+      start, end = token.pos.offset, scanner.index
+      type_id = result._get_type_id(token.type)
+      if start >= offset + len(inserted):
+        # Check if the token exists in the old token stream after the edit.
+        index = bisect.bisect_left(old_starts, start - delta, restart)
+        if index < len(self) and old_starts[index] == start - delta \
+            and old_ends[index] == end - delta and old_ids[index] == type_id:
+          resync = index
+          break
+      new_ids.append(type_id)
+      new_starts.append(start)
+      new_ends.append(end)
+      token = tokenizer.next()
+
+    type_ids.extend(old_ids[:restart])
+    type_ids.extend(array.array('H', new_ids))
+    type_ids.extend(old_ids[resync:])
+    starts.extend(old_starts[:restart])
+    starts.extend(array.array('q', new_starts))
+    starts.extend(array.array('q', map(delta.__add__, old_starts[resync:])))
+    ends.extend(old_ends[:restart])
+    ends.extend(array.array('q', new_ends))
+    ends.extend(array.array('q', map(delta.__add__, old_ends[resync:])))
+    return result
+
+  def replay(self) -> 'TokenReplay[T]':
+    return TokenReplay(self)
+
+  def to_bytes(self) -> bytes:
+    """
+    Returns the binary representation of the token array (without the text). The token types
+    and the sentinel must be JSON serializable.
+    """
+
+    header = json.dumps({
+      'version': _FORMAT_VERSION,
+      'byteorder': sys.byteorder,
+      'count': len(self),
+      'types': self.types,
+      'sentinel': list(self.sentinel),
+    }).encode('utf8')
+    return b''.join([_MAGIC, struct.pack('<I', len(header)), header,
+      self.type_ids.tobytes(), self.starts.tobytes(), self.ends.tobytes()])
+
+  @classmethod
+  def from_bytes(cls, data: bytes, text: str) -> 'TokenArray[T]':
+    """
+    Loads a token array from the output of #to_bytes(). The *text* must be the text that the
+    tokens were recorded from.
+    """
+
+    if data[:4] != _MAGIC:
+      raise ValueError('not a TokenArray')
+    header_size, = struct.unpack('<I', data[4:8])
+    header = json.loads(data[8:8 + header_size].decode('utf8'))
+    if header['version'] != _FORMAT_VERSION:
+      raise ValueError(f'unsupported TokenArray format version: {header["version"]!r}')
+    result = cls(text, tuple(header['sentinel']), header['types'])  # type: ignore
+    offset = 8 + header_size
+    for column in (result.type_ids, result.starts, result.ends):
+      size = header['count'] * column.itemsize
+      column.frombytes(data[offset:offset + size])
+      if header['byteorder'] != sys.byteorder:
+        column.byteswap()
+      offset += size
+    if offset != len(data):
+      raise ValueError('invalid TokenArray data size')
+    return result
+
+
+class TokenReplay(t.Generic[T]):
+  """
+  Replays the tokens from a #TokenArray. Supports the same methods as the #Tokenizer for
+  consuming tokens, but the *select* and *unselect* arguments of #next() cannot choose a
+  different token than the recorded one, they only check the token type like *expect*.
+  """
+
+  def __init__(self, tokens: TokenArray[T]) -> None:
+    self.tokens = tokens
+    self._index = -1
+    self._current: t.Optional[Token[T, str]] = None
+
+  def __bool__(self) -> bool:
+    return self._index < len(self.tokens)
+
+  def __iter__(self) -> t.Iterator[Token[T, str]]:
+    token = self.current
+    while token:
+      yield token
+      token = self.next()
+
+  @property
+  def state(self) -> int:
+    """ The position of the replay. Can be set to go back to a previously stored position. """
+
+    return self._index
+
+  @state.setter
+  def state(self, state: int) -> None:
+    self._index = state
+    self._current = None
+
+  @property
+  def current(self) -> Token[T, str]:
+    if self._index < 0:
+      return self.next()
+    if self._current is None:
+      self._current = self._get_token(self._index)
+    return self._current
+
+  def _get_token(self, index: int) -> Token[T, str]:
+    tokens = self.tokens
+    if index < len(tokens):
+      return tokens[index]
+    sentinel_type, sentinel_value = tokens.sentinel
+    return Token(sentinel_type, sentinel_value, tokens.get_cursor(len(tokens.text)), True)
+
+  def next(self,
+    select: t.Optional[t.Collection[T]] = None,
+    unselect: t.Optional[t.Collection[T]] = None,
+    expect: t.Optional[t.Collection[T]] = None,
+  ) -> Token[T, str]:
+    if select is not None and unselect is not None:
+      raise ValueError('`select` and `unselect` arguments cannot be mixed')
+    index = min(self._index + 1, len(self.tokens))
+    token = self._get_token(index)
+    if select is not None or unselect is not None or expect is not None:
+      if token.eof:
+        accepted = True
+      elif unselect is not None:
+        accepted = token.type not in unselect or (expect is not None and token.type in expect)
+      else:
+        accepted = (select is not None and token.type in select) or (expect is not None and token.type in expect)
+      if not accepted:
+        raise UnexpectedTokenError(token, set(select or ()) | set(expect or ()))
+    self._index = index
+    self._current = token
+    return token
+
+
+class TokenCache:
+  """
+  Caches #TokenArray#s by the hash of the text they were recorded from, in memory or, if a
+  *directory* is specified, on disk. The *namespace* should identify the rule set, as it is
+  part of the cache key.
+  """
+
+  def __init__(self, directory: t.Optional[str] = None, namespace: str = '') -> None:
+    self.directory = directory
+    self.namespace = namespace
+    self._memory: t.Dict[str, bytes] = {}
+
+  def _get_key(self, text: str) -> str:
+    hasher = hashlib.sha256(self.namespace.encode('utf8'))
+    hasher.update(b'\0')
+    hasher.update(text.encode('utf8', 'surrogatepass'))
+    return hasher.hexdigest()
+
+  def get(self, text: str) -> t.Optional[TokenArray]:
+    key = self._get_key(text)
+    if self.directory is None:
+      data = self._memory.get(key)
+    else:
+      try:
+        with open(os.path.join(self.directory, key), 'rb') as fp:
+          data = fp.read()
+      except FileNotFoundError:
+        data = None
+    return None if data is None else TokenArray.from_bytes(data, text)
+
+  def put(self, tokens: TokenArray) -> None:
+    key = self._get_key(tokens.text)
+    data = tokens.to_bytes()
+    if self.directory is None:
+      self._memory[key] = data
+    else:
+      os.makedirs(self.directory, exist_ok=True)
+      filename = os.path.join(self.directory, key)
+      with open(filename + '.tmp', 'wb') as fp:
+        fp.write(data)
+      os.replace(filename + '.tmp', filename)
+
+  def tokenize(self, rules: RuleSet, text: str) -> TokenArray:
+    """
+    Returns the cached tokens for *text*, or tokenizes and records it with the *rules*.
+    """
+
+    tokens = self.get(text)
+    if tokens is None:
+      tokens = TokenArray.record(Tokenizer(rules, text))
+      self.put(tokens)
+    return tokens
@@ -1,4 +1,4 @@
 
 from .extractor import TokenExtractor
 from .ruleset import RuleSet
-from .tokenizer import ProxyToken, Token, Tokenizer, TokenizationError, UnexpectedTokenError
+from .tokenizer import Debug, PreparedQuery, ProxyToken, RuleProfile, Token, Tokenizer, TokenizationError, UnexpectedTokenError
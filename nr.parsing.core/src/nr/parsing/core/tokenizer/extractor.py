@@ -1,4 +1,5 @@
 
+import re
 import typing as t
 
 if t.TYPE_CHECKING:
@@ -50,3 +51,127 @@ class _MappedTokenExtractor(TokenExtractor[U]):
     if value is not None:
       return self._func(value)
     return None
+
+
+class RegexExtractor(TokenExtractor['re.Match']):
+  """
+  Matches a regular expression at the current position of the scanner and returns the match
+  object. The #RuleSet recognizes rules that use this extractor (optionally wrapped with
+  #TokenExtractor.map()) and can test many of them with a single combined regular expression,
+  in which case the #Tokenizer passes a #GroupMatch to the mapping functions instead of matching
+  the pattern again.
+  """
+
+  def __init__(self, pattern: t.Union[str, 're.Pattern'], at_line_start_only: bool = False, flags: int = 0) -> None:
+    if isinstance(pattern, str):
+      pattern = re.compile(pattern, flags)
+    elif flags:
+      raise ValueError('flags cannot be specified with a compiled pattern')
+    self.regex: 're.Pattern' = pattern
+    self.at_line_start_only = at_line_start_only
+
+  def __repr__(self) -> str:
+    return f'{type(self).__name__}({self.regex!r}, at_line_start_only={self.at_line_start_only!r})'
+
+  @property
+  def pattern(self) -> str:
+    return self.regex.pattern
+
+  def get_token(self, scanner: 'Scanner') -> t.Optional['re.Match']:
+    if self.at_line_start_only and scanner.pos.column != 0:
+      return None
+    return scanner.match(self.regex)
+
+
+class GroupMatch:
+  """
+  The match of a #RegexExtractor's pattern that was made as part of a combined pattern (see
+  #RegexRuleGroup), where the pattern is wrapped in the group *base*. Provides the #re.Match
+  interface with the group numbers and names of the extractor's own pattern, so the combined
+  match does not need to be repeated with that pattern.
+  """
+
+  __slots__ = ('_match', '_base', 're')
+
+  def __init__(self, match: 're.Match', base: int, regex: 're.Pattern') -> None:
+    self._match = match
+    self._base = base
+    self.re = regex
+
+  def __repr__(self) -> str:
+    return f'<{type(self).__name__} object; span={self.span()!r}, match={self.group()!r}>'
+
+  def __getitem__(self, group: t.Union[int, str]) -> t.Optional[str]:
+    return self._match.group(self._get_index(group))
+
+  def _get_index(self, group: t.Union[int, str]) -> int:
+    if isinstance(group, int):
+      if 0 <= group <= self.re.groups:
+        return self._base + group
+    elif group in self.re.groupindex:
+      return self._base + self.re.groupindex[group]
+    raise IndexError('no such group')
+
+  @property
+  def string(self) -> str:
+    return self._match.string
+
+  @property
+  def pos(self) -> int:
+    return self._match.pos
+
+  @property
+  def endpos(self) -> int:
+    return self._match.endpos
+
+  def group(self, *groups: t.Union[int, str]) -> t.Any:
+    if not groups or groups == (0,):
+      return self._match.group(self._base)
+    if len(groups) == 1:
+      return self._match.group(self._get_index(groups[0]))
+    return self._match.group(*map(self._get_index, groups))
+
+  def groups(self, default: t.Any = None) -> t.Tuple[t.Any, ...]:
+    group = self._match.group
+    base = self._base
+    return tuple(default if x is None else x for x in (group(base + i) for i in range(1, self.re.groups + 1)))
+
+  def groupdict(self, default: t.Any = None) -> t.Dict[str, t.Any]:
+    group = self._match.group
+    base = self._base
+    return {name: default if x is None else x
+      for name, x in ((name, group(base + i)) for name, i in self.re.groupindex.items())}
+
+  def start(self, group: t.Union[int, str] = 0) -> int:
+    return self._match.start(self._get_index(group))
+
+  def end(self, group: t.Union[int, str] = 0) -> int:
+    return self._match.end(self._get_index(group))
+
+  def span(self, group: t.Union[int, str] = 0) -> t.Tuple[int, int]:
+    return self._match.span(self._get_index(group))
+
+
+def get_token_from_match(extractor: TokenExtractor[T], match: t.Any) -> t.Optional[T]:
+  """
+  Returns the token value that *extractor*, which must be based on a #RegexExtractor (see
+  #get_regex_extractor()), produces for a *match* of its regular expression.
+  """
+
+  if isinstance(extractor, _MappedTokenExtractor):
+    value = get_token_from_match(extractor._inner, match)
+    return None if value is None else extractor._func(value)
+  return match
+
+
+def get_regex_extractor(extractor: TokenExtractor[t.Any]) -> t.Optional[RegexExtractor]:
+  """
+  Returns the #RegexExtractor that *extractor* is based on, or #None if it is not based on a
+  regular expression.
+  """
+
+  while isinstance(extractor, _MappedTokenExtractor):
+    extractor = extractor._inner
+  if isinstance(extractor, RegexExtractor):
+    return extractor
+  return None
@@ -1,9 +1,12 @@
 
 import contextlib
+import itertools
+import re
 import typing as t
 from dataclasses import dataclass
 
 from ..scanner import Scanner
+from .extractor import RegexExtractor, get_regex_extractor
 
 if t.TYPE_CHECKING:
   from .extractor import TokenExtractor
@@ -27,6 +30,79 @@ class Rule(t.Generic[T, U]):
   skip: bool
 
 
+#: Matches constructs that refer to capturing groups by number or name. Patterns containing them
+#: are not folded into a #RegexRuleGroup because group numbers shift in the combined pattern.
+_GROUP_REFERENCE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+_DEFAULT_FLAGS = re.compile('').flags
+_SCOPED_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+
+def _get_fold_source(extractor: RegexExtractor) -> t.Optional[str]:
+  """
+  Returns the source of the extractor's pattern for use in a combined pattern, or #None if the
+  pattern cannot be combined with others.
+  """
+
+  regex = extractor.regex
+  if not isinstance(regex.pattern, str):
+    return None
+  if regex.groups and _GROUP_REFERENCE.search(regex.pattern):
+    return None
+  remaining = regex.flags & ~_DEFAULT_FLAGS
+  if not remaining:
+    return regex.pattern
+  # Flags passed to re.compile() can be expressed as scoped inline flags, but not if they
+  # were set globally inside the pattern itself (e.g. with a leading "(?i)").
+  if re.compile(regex.pattern).flags != _DEFAULT_FLAGS:
+    return None
+  inline = ''
+  for flag, char in _SCOPED_FLAGS:
+    if remaining & flag:
+      inline += char
+      remaining &= ~flag
+  if remaining:
+    return None
+  return f'(?{inline}:{regex.pattern})'
+
+
+class RegexRuleGroup(t.Generic[T, U]):
+  """
+  A run of consecutive rules in a #RuleSet that all extract tokens with a #RegexExtractor. The
+  group combines the patterns of a subset of its rules into a single alternation of named groups,
+  which finds the first rule (in rule set order) that matches with a single regex call. Since
+  the subset of rules that may be used changes with the tokenizer configuration, the combined
+  patterns are cached per subset.
+  """
+
+  def __init__(self, rules: t.List[t.Tuple[Rule[T, U], RegexExtractor, str]]) -> None:
+    self.rules = [rule for rule, _, _ in rules]
+    self.extractors = [extractor for _, extractor, _ in rules]
+    self._sources = [source for _, _, source in rules]
+    self._patterns: t.Dict[t.Tuple[int, ...], t.Optional['re.Pattern']] = {}
+
+  def __repr__(self) -> str:
+    return f'RegexRuleGroup({[r.type for r in self.rules]!r})'
+
+  def get_pattern(self, indices: t.Tuple[int, ...]) -> t.Optional['re.Pattern']:
+    """
+    Returns the combined pattern for the rules at the given *indices*. The name of the group
+    that matched (#re.Match.lastgroup) is `_` followed by the index of the rule in the group.
+    Returns #None if the patterns cannot be combined (e.g. because of conflicting group names).
+    """
+
+    try:
+      return self._patterns[indices]
+    except KeyError:
+      pass
+    source = '|'.join(f'(?P<_{i}>{self._sources[i]})' for i in indices)
+    try:
+      pattern: t.Optional['re.Pattern'] = re.compile(source)
+    except re.error:
+      pattern = None
+    self._patterns[indices] = pattern
+    return pattern
+
+
 class RuleSet(t.Generic[T, U]):
   """
   A ordered list of parsing rules that is used a the #Tokenizer.
@@ -45,6 +121,7 @@ class RuleSet(t.Generic[T, U]):
       sentinel = Sentinel(*sentinel)
     self._rules: t.List[Rule[T, U]] = []
     self._token_types: t.Set[T] = set()
+    self._compiled: t.Optional[t.List[t.Union[Rule[T, U], RegexRuleGroup[T, U]]]] = None
     self.sentinel: Sentinel[T, U] = sentinel
 
   def __iter__(self) -> t.Iterator[Rule]:
@@ -73,19 +150,66 @@ class RuleSet(t.Generic[T, U]):
 
     self._rules.append(Rule(type_, extractor, skip))
     self._token_types.add(type_)
+    self._compiled = None
     return self
 
+  def compile(self) -> t.List[t.Union[Rule[T, U], RegexRuleGroup[T, U]]]:
+    """
+    Returns the rules of this rule set with runs of consecutive regex based rules (see
+    #rules.regex() and #rules.regex_extract()) folded into #RegexRuleGroup#s. The result is
+    cached until another rule is added.
+    """
+
+    if self._compiled is None:
+      compiled: t.List[t.Union[Rule[T, U], RegexRuleGroup[T, U]]] = []
+      run: t.List[t.Tuple[Rule[T, U], RegexExtractor, str]] = []
+      for rule in self._rules:
+        extractor = get_regex_extractor(rule.extractor)
+        source = _get_fold_source(extractor) if extractor is not None else None
+        if extractor is not None and source is not None:
+          run.append((rule, extractor, source))
+          continue
+        if run:
+          compiled.append(RegexRuleGroup(run))
+          run = []
+        compiled.append(rule)
+      if run:
+        compiled.append(RegexRuleGroup(run))
+      self._compiled = compiled
+    return self._compiled
+
+
+#: Provides the #RuleConfigSet.version numbers, which are unique across all instances.
+_versions = itertools.count()
+
 
 class RuleConfigSet(t.Generic[T, U, V]):
-  """ Helper class to manage values associated with token types. """
+  """
+  Helper class to manage values associated with token types.
+
+  Copies are cheap because the values are shared between the copies until one of them is
+  modified (copy-on-write). Every modification assigns a new #version, so two config sets
+  with the same version are known to have the same values.
+  """
 
   def __init__(self, rules: 'RuleSet[T, U]') -> None:
     self._rules = rules
     self._values: t.Dict[T, V] = {}
+    self._shared = False
+    self.version = next(_versions)
 
   def __repr__(self) -> str:
     return f'RuleConfigSet({self._values!r})'
 
+  def _modify(self) -> t.Dict[T, V]:
+    """ Returns the values for modification, copying them first if they are shared. """
+
+    if self._shared:
+      self._values = dict(self._values)
+      self._shared = False
+    self.version = next(_versions)
+    return self._values
+
   def set(self, token_types: t.Union[T, t.Collection[T]], value: V) -> t.ContextManager[None]:
     """
     Set the value of one or more token types. The returned context manager _may_ be used, but
@@ -106,19 +230,21 @@ class RuleConfigSet(t.Generic[T, U, V]):
       if not self._rules.has_token_type(token_type):
         raise ValueError(f'not a possible token type: {token_type!r}')
 
+    values = self._modify()
     for token_type in token_types_set:
-      self._values[token_type] = value
+      values[token_type] = value
 
     @contextlib.contextmanager
     def _revert() -> t.Iterator[None]:
       try: yield
       finally:
+        values = self._modify()
         for token_type in token_types_set:
           if token_type not in current_values:
             # NOTE(NiklasRosenstein): https://github.com/python/mypy/issues/10152
-            self._values.pop(token_type, None)  # type: ignore
+            values.pop(token_type, None)  # type: ignore
           else:
-            self._values[token_type] = current_values[token_type]
+            values[token_type] = current_values[token_type]
 
     return _revert()
 
@@ -126,7 +252,11 @@ class RuleConfigSet(t.Generic[T, U, V]):
     return self._values.get(token_type, default)
 
   def copy(self) -> 'RuleConfigSet[T, U, V]':
-    new = type(self)(self._rules)
-    new._values.update(self._values)
-    return new
+    """ Returns a copy of the config set in O(1). """
 
+    new = object.__new__(type(self))
+    new._rules = self._rules
+    new._values = self._values
+    new.version = self.version
+    self._shared = new._shared = True
+    return new
@@ -1,11 +1,13 @@
 
 import enum
 import logging
+import time
 import typing as t
 from dataclasses import dataclass, field
 
-from .ruleset import Rule, RuleConfigSet, RuleSet
-from ..scanner import Cursor, Scanner
+from .extractor import GroupMatch, get_token_from_match
+from .ruleset import RegexRuleGroup, Rule, RuleConfigSet, RuleSet
+from ..scanner import BufferedScanner, Cursor, Scanner, ScannerPin
 
 T = t.TypeVar('T')
 U = t.TypeVar('U')
@@ -26,8 +28,13 @@ class Debug(enum.IntEnum):
   #: Log when #Tokenizer.pos is set.
   UPDATE_POS = (1 << 2)
 
+  #: Record the number of attempts, matches and the time spent per rule in #Tokenizer.profile.
+  #: In this mode, the rules of a #RegexRuleGroup are tried one by one instead of with their
+  #: combined regex, so that they can be measured individually.
+  PROFILE = (1 << 3)
+
   NONE = 0
-  ALL = (NEXT_ARGS | EXTRACT | UPDATE_POS)
+  ALL = (NEXT_ARGS | EXTRACT | UPDATE_POS | PROFILE)
 
 
 @dataclass
@@ -117,9 +124,28 @@ class ProxyToken(t.Generic[T, U]):
     return self.tokenizer.skipped.set(token_types, skipped)
 
 
+@dataclass
+class RuleProfile(t.Generic[T, U]):
+  """ Statistics for a rule recorded in #Debug.PROFILE mode. """
+
+  rule: Rule[T, U]
+
+  #: The number of times the rule was tried.
+  attempts: int = 0
+
+  #: The number of times the rule produced a token.
+  matches: int = 0
+
+  #: The total time spent in the rule's token extractor in seconds.
+  time: float = 0.0
+
+
 @dataclass
 class TokenizerState(t.Generic[T, U]):
-  """ A checkpoint that can be used to restore the tokenizer to a previous state. """
+  """
+  A checkpoint that can be used to restore the tokenizer to a previous state. The #skipped and
+  #ignored config sets may be shared with other states and must not be modified.
+  """
 
   cursor: 'Cursor'
   token: t.Optional[Token[T, U]]
@@ -127,6 +153,73 @@ class TokenizerState(t.Generic[T, U]):
   ignored: RuleConfigSet[T, U, bool]
   skip_rule_once: t.Optional[Rule[T, U]]
 
+  #: Keeps a #BufferedScanner from discarding the text at the #cursor.
+  pin: t.Optional[ScannerPin] = field(default=None, repr=False, compare=False)
+
+
+#: An item of a #PreparedQuery plan. For a #RegexRuleGroup, it contains the indices of the rules
+#: that are tried anywhere and of those that are tried at the start of a line.
+_PlanItem = t.Tuple[t.Union[Rule, RegexRuleGroup], t.Tuple[int, ...], t.Tuple[int, ...]]
+
+#: The *select*, *unselect* and *expect* arguments of #Tokenizer.next().
+_QueryKey = t.Tuple[t.Optional[t.FrozenSet[t.Any]], t.Optional[t.FrozenSet[t.Any]], t.Optional[t.FrozenSet[t.Any]]]
+
+
+class PreparedQuery(t.Generic[T, U]):
+  """
+  Precomputed arguments for #Tokenizer.next(), returned by #Tokenizer.prepare(). The rules that
+  are tried for the query are computed once and only re-computed when the #RuleSet or the
+  #Tokenizer.ignored configuration changes.
+  """
+
+  def __init__(self, tokenizer: 'Tokenizer[T, U]', select: t.Optional[t.FrozenSet[T]],
+      expect: t.Optional[t.FrozenSet[T]]) -> None:
+    self.tokenizer = tokenizer
+    self.select = select
+    self.expect = expect
+    self._key: t.Optional[t.Tuple[t.List[t.Any], int]] = None
+    self._plans: t.Tuple[t.List[_PlanItem], t.List[_PlanItem]] = ([], [])
+
+  def __repr__(self) -> str:
+    return f'PreparedQuery(select={self.select!r}, expect={self.expect!r})'
+
+  def next(self) -> 'Token[T, U]':
+    """ Extracts the next token, see #Tokenizer.next(). """
+
+    return self.tokenizer._next(self)
+
+  def _get_plans(self) -> t.Tuple[t.List[_PlanItem], t.List[_PlanItem]]:
+    """
+    Returns the rules to try first and the rules to try if none of the first matched (only if
+    #select is set).
+    """
+
+    compiled = self.tokenizer.rules.compile()
+    version = self.tokenizer.ignored.version
+    if self._key is None or self._key[0] is not compiled or self._key[1] != version:
+      ignored, select = self.tokenizer.ignored, self.select
+      if select is None:
+        self._plans = (self._make_plan(compiled, lambda t: not ignored.get(t, False)), [])
+      else:
+        self._plans = (
+          self._make_plan(compiled, lambda t: t in select),  # type: ignore
+          self._make_plan(compiled, lambda t: t not in select and not ignored.get(t, False)))  # type: ignore
+      self._key = (compiled, version)
+    return self._plans
+
+  @staticmethod
+  def _make_plan(compiled: t.List[t.Any], filter: t.Callable[[T], bool]) -> t.List[_PlanItem]:
+    plan: t.List[_PlanItem] = []
+    for item in compiled:
+      if isinstance(item, RegexRuleGroup):
+        line_start_indices = tuple(i for i, rule in enumerate(item.rules) if filter(rule.type))
+        indices = tuple(i for i in line_start_indices if not item.extractors[i].at_line_start_only)
+        if line_start_indices:
+          plan.append((item, indices, line_start_indices))
+      elif filter(item.type):
+        plan.append((item, (), ()))
+    return plan
+
 
 class TokenizationError(Exception):
   """ Raised when the text cannot be tokenized. """
@@ -141,6 +234,9 @@ class Tokenizer(t.Generic[T, U]):
 
   log = logging.getLogger(__module__ + '.' + __qualname__)  # type: ignore
 
+  #: The maximum number of #PreparedQuery objects that #next() keeps for its arguments.
+  QUERY_CACHE_SIZE: t.ClassVar[int] = 64
+
   #: The rule set that is used for tokenization.
   rules: 'RuleSet'
 
@@ -163,12 +259,17 @@ class Tokenizer(t.Generic[T, U]):
     self._current: t.Optional[Token[T, U]] = None
     self.skipped = RuleConfigSet(rules)
     self.ignored = RuleConfigSet(rules)
+    self._snapshots = (self.skipped.copy(), self.ignored.copy())
     self.debug = debug
 
     # Keep track if a zero-length token was extracted via a rule. That rule cannot trigger again
     # from the same position of the tokenizer.
     self._skip_rule_once: t.Optional[Rule[T, U]] = None
 
+    self._default_query: PreparedQuery[T, U] = PreparedQuery(self, None, None)
+    self._queries: t.Dict[_QueryKey, t.Tuple[t.List[t.Any], PreparedQuery[T, U]]] = {}
+    self._profile: t.Dict[int, RuleProfile[T, U]] = {}
+
   def __bool__(self) -> bool:
     return bool(self.scanner) or bool(self._current)
 
@@ -180,10 +281,23 @@ class Tokenizer(t.Generic[T, U]):
 
   @property
   def state(self) -> TokenizerState[T, U]:
-    """ The position of the tokenizer. Can be set to go back to a previously stored position. """
+    """
+    The position of the tokenizer. Can be set to go back to a previously stored position. Saving
+    and restoring the state is O(1), the #skipped and #ignored config sets are copied on write.
+    """
+
+    # Only a #BufferedScanner needs to be pinned to restore the position later.
+    pin = self.scanner.pin() if isinstance(self.scanner, BufferedScanner) else None
+
+    # States share the copies of the config sets until the config sets are modified.
+    skipped, ignored = self._snapshots
+    if skipped.version != self.skipped.version:
+      skipped = self.skipped.copy()
+    if ignored.version != self.ignored.version:
+      ignored = self.ignored.copy()
+    self._snapshots = (skipped, ignored)
 
-    return TokenizerState(self.scanner.pos, self._current, self.skipped.copy(),
-      self.ignored.copy(), self._skip_rule_once)
+    return TokenizerState(self.scanner.pos, self._current, skipped, ignored, self._skip_rule_once, pin)
 
   @state.setter
   def state(self, state: TokenizerState[T, U]) -> None:
@@ -191,10 +305,22 @@ class Tokenizer(t.Generic[T, U]):
       self.log.debug('Update Tokenizer.pos (pos=%r)', state)
     self.scanner.pos = state.cursor
     self._current = state.token
-    self.skipped = state.skipped
-    self.ignored = state.ignored
+    # The config sets only need to be restored if they were modified since the state was saved.
+    if self.skipped.version != state.skipped.version:
+      self.skipped = state.skipped.copy()
+    if self.ignored.version != state.ignored.version:
+      self.ignored = state.ignored.copy()
     self._skip_rule_once = state.skip_rule_once
 
+  @property
+  def profile(self) -> t.List[RuleProfile[T, U]]:
+    """
+    Returns the statistics recorded for every rule in #Debug.PROFILE mode, sorted by the time
+    spent in the rule (the slowest rule first).
+    """
+
+    return sorted(self._profile.values(), key=lambda p: p.time, reverse=True)
+
   @property
   def current(self) -> Token[T, U]:
     """
@@ -252,6 +378,38 @@ class Tokenizer(t.Generic[T, U]):
       known token type.
     """
 
+    if select is None and unselect is None and expect is None:
+      return self._next(self._default_query)
+
+    # Re-use the prepared query for the same arguments, unless the rule set has changed.
+    key = (
+      None if select is None else frozenset(select),
+      None if unselect is None else frozenset(unselect),
+      None if expect is None else frozenset(expect))
+    compiled = self.rules.compile()
+    entry = self._queries.get(key)
+    if entry is None or entry[0] is not compiled:
+      if len(self._queries) >= self.QUERY_CACHE_SIZE:
+        self._queries.clear()
+      entry = self._queries[key] = (compiled, self.prepare(select, unselect, expect))
+    return self._next(entry[1])
+
+  def prepare(self,
+    select: t.Optional[t.Collection[T]] = None,
+    unselect: t.Optional[t.Collection[T]] = None,
+    expect: t.Optional[t.Collection[T]] = None,
+  ) -> 'PreparedQuery[T, U]':
+    """
+    Validates and precomputes the arguments for #next(). Calling #PreparedQuery.next() on the
+    returned object is equivalent to calling #next() with the same arguments, but does not
+    need to re-compute the token type sets and the rules to try on every call.
+
+    # Raises
+
+    ValueError: If one of the token types passed to *select*, *unselect* or *expect* is not a
+      known token type.
+    """
+
     if select is not None and unselect is not None:
       raise ValueError('`select` and `unselect` arguments cannot be mixed')
 
@@ -268,28 +426,40 @@ class Tokenizer(t.Generic[T, U]):
         expect = set(expect)
       self.rules.check_has_token_types(expect)
 
+    return PreparedQuery(self,
+      None if select is None else frozenset(select),
+      None if expect is None else frozenset(expect))
+
+  def _next(self, query: 'PreparedQuery[T, U]') -> Token[T, U]:
     if self.debug & Debug.NEXT_ARGS:
-      self.log.debug('Tokenizer.next() computed arguments (select=%r, expect=%r)', select, expect)
+      self.log.debug('Tokenizer.next() computed arguments (select=%r, expect=%r)', query.select, query.expect)
 
-    self._current = self._do_next(t.cast(t.Optional[t.Set[T]], select), expect)
+    self._current = self._do_next(query)
     return self._current
 
-  def _do_next(self, select: t.Optional[t.Set[T]], expect: t.Optional[t.Set[T]]) -> Token[T, U]:  # NOSONAR
-    token, skippable = self._extract_token(lambda t: (select is None and not self.ignored.get(t, False)) or (select is not None and t in select))
-    if token is None and select is not None:
-      # Extract one of the unselected token types. If that token is skippable, we will accept
-      # and skip it. If not, it will cause an #UnexpectedTokenError below given how we set up
-      # the "expect" variable.
-      token, skippable = self._extract_token(lambda t: select is not None and t not in select and not self.ignored.get(t, False))
-      if token is not None and skippable:
+  def _do_next(self, query: 'PreparedQuery[T, U]') -> Token[T, U]:  # NOSONAR
+    select, expect = query.select, query.expect
+    selected, unselected = query._get_plans()
+
+    # Skippable tokens are skipped in a loop rather than recursively, so long runs of skipped
+    # tokens cannot exceed the recursion limit.
+    while True:
+      token, skippable = self._extract_token(selected)
+      if token is None and select is not None:
+        # Extract one of the unselected token types. If that token is skippable, we will accept
+        # and skip it. If not, it will cause an #UnexpectedTokenError below given how we set up
+        # the "expect" variable.
+        token, skippable = self._extract_token(unselected)
+        if token is not None and skippable:
+          if self.debug & Debug.EXTRACT:
+            self.log.debug('No selected token matched, but extract another skippable token "%s". '
+              'Skip and continue\n\t\ttoken: %r', token.type, token)
+          continue
+      elif token is not None and (expect is None or token.type not in expect) and skippable:
         if self.debug & Debug.EXTRACT:
-          self.log.debug('No selected token matched, but extract another skippable token "%s". '
-            'Skip and continue recursively\n\t\ttoken: %r', token.type, token)
-        return self._do_next(select, expect)
-    elif token is not None and (expect is None or token.type not in expect) and skippable:
-      if self.debug & Debug.EXTRACT:
-        self.log.debug('Extracted skippable token "%s". Skip and continue recursively\n\t\ttoken: %r', token.type, token)
-      return self._do_next(select, expect)
+          self.log.debug('Extracted skippable token "%s". Skip and continue\n\t\ttoken: %r', token.type, token)
+        continue
+      break
 
     if token is None:
       raise TokenizationError(self.scanner.pos)
@@ -302,7 +472,7 @@ class Tokenizer(t.Generic[T, U]):
 
     return token
 
-  def _extract_token(self, filter: t.Callable[[T], bool]) -> t.Tuple[t.Optional[Token[T, U]], bool]:
+  def _extract_token(self, plan: t.List['_PlanItem']) -> t.Tuple[t.Optional[Token[T, U]], bool]:
     if not self.scanner:
       return Token(
         self.rules.sentinel.type,
@@ -310,25 +480,86 @@ class Tokenizer(t.Generic[T, U]):
         self.scanner.pos,
         True), False
 
-    token_pos = self.scanner.pos
-    for rule in self.rules:
-      if not filter(rule.type) or rule == self._skip_rule_once:
-        continue
-      token_value = rule.extractor.get_token(self.scanner)
-      if token_value is None:
-        self.scanner.pos = token_pos
-        continue
-      token: Token[T, U] = Token(rule.type, token_value, token_pos, False)
-      skippable = self.skipped.get(rule.type, rule.skip)
-      if not token.value:
-        # Zero-length token can only be produced once at a given location.
-        # TODO(NiklasRosenstein): This only really works with strings as the token value.
-        self._skip_rule_once = rule
+    scanner = self.scanner
+    scanner.fill()
+    token_pos = scanner.pos
+    if self.debug & Debug.PROFILE:
+      return self._extract_token_profiled(plan, token_pos)
+    skip_rule_once = self._skip_rule_once
+    for item, indices, line_start_indices in plan:
+      if isinstance(item, RegexRuleGroup):
+        # Find the first matching rule of the group with a single regex call.
+        if token_pos.column == 0:
+          indices = line_start_indices
+        if skip_rule_once is not None:
+          indices = tuple(i for i in indices if item.rules[i] != skip_rule_once)
+        while indices:
+          pattern = item.get_pattern(indices)
+          if pattern is None:
+            rules = [item.rules[i] for i in indices]
+            break
+          match = pattern.match(scanner.text, scanner.index)
+          if match is None:
+            rules = []
+            break
+          index = int(match.lastgroup[1:])  # type: ignore
+          rule = item.rules[index]
+          # Build the token value from the combined match instead of matching the rule again.
+          group_match = GroupMatch(match, match.lastindex, item.extractors[index].regex)  # type: ignore
+          token_value = get_token_from_match(rule.extractor, group_match)
+          if token_value is not None:
+            scanner.advance(match.end())
+            return self._make_token(rule, token_value, token_pos)
+          indices = tuple(i for i in indices if i > index)
+        else:
+          rules = []
       else:
-        self._skip_rule_once = None
-      return token, skippable
+        rules = [item] if item != skip_rule_once else []
+
+      for rule in rules:
+        token_value = rule.extractor.get_token(scanner)
+        if token_value is None:
+          scanner.pos = token_pos
+          continue
+        return self._make_token(rule, token_value, token_pos)
+
     return None, False
 
+  def _extract_token_profiled(self, plan: t.List['_PlanItem'], token_pos: Cursor) -> t.Tuple[t.Optional[Token[T, U]], bool]:
+    scanner = self.scanner
+    for item, indices, line_start_indices in plan:
+      if isinstance(item, RegexRuleGroup):
+        rules = [item.rules[i] for i in (line_start_indices if token_pos.column == 0 else indices)]
+      else:
+        rules = [item]
+      for rule in rules:
+        if rule == self._skip_rule_once:
+          continue
+        profile = self._profile.get(id(rule))
+        if profile is None:
+          profile = self._profile[id(rule)] = RuleProfile(rule)
+        profile.attempts += 1
+        start = time.perf_counter()
+        token_value = rule.extractor.get_token(scanner)
+        profile.time += time.perf_counter() - start
+        if token_value is None:
+          scanner.pos = token_pos
+          continue
+        profile.matches += 1
+        return self._make_token(rule, token_value, token_pos)
+    return None, False
+
+  def _make_token(self, rule: Rule[T, U], token_value: U, token_pos: Cursor) -> t.Tuple[Token[T, U], bool]:
+    token: Token[T, U] = Token(rule.type, token_value, token_pos, False)
+    skippable = self.skipped.get(rule.type, rule.skip)
+    if not token.value:
+      # Zero-length token can only be produced once at a given location.
+      # TODO(NiklasRosenstein): This only really works with strings as the token value.
+      self._skip_rule_once = rule
+    else:
+      self._skip_rule_once = None
+    return token, skippable
+
   Debug = Debug  # NOSONAR
   Error = TokenizationError
   Unexpected = UnexpectedTokenError
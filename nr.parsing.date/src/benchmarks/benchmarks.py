@@ -1,8 +1,12 @@
 
 import datetime
+import random
+import tracemalloc
 import typing as t
 from dateutil.parser import isoparse as dateutil_isoparse, parse as dateutil_parse
-from nr.parsing.date import format_set, ISO_8601
+from nr.parsing.date import (datetime_format, duration, format_set, infer_format, parse_datetime,
+  ISO_8601, JAVA_OFFSET_DATETIME)
+from nr.parsing.date.duration import _parse_duration
 from test.samples import SAMPLES
 
 STDLIB_ISO_8601_DATETIME_FORMATS = [
@@ -73,3 +77,203 @@ class DatetimeParsingSuite:
 
   def time_dateutil_parser_isoparse(self):
     vectorize(parse_dateutil_isoparse)
+
+
+def generate_datetimes(count: int) -> t.List[datetime.datetime]:
+  rng = random.Random(count)
+  offsets = [datetime.timezone(datetime.timedelta(hours=h)) for h in (-5, 0, 1, 2)]
+  start = datetime.datetime(2000, 1, 1)
+  return [(start + datetime.timedelta(seconds=rng.randrange(10 ** 9), milliseconds=rng.randrange(1000)))
+    .replace(tzinfo=rng.choice(offsets)) for _ in range(count)]
+
+
+def generate_iso8601(count: int) -> t.List[str]:
+  return [dt.isoformat(timespec='milliseconds') for dt in generate_datetimes(count)]
+
+
+def parse_each(formats: t.Sequence[datetime_format], s: str) -> datetime.datetime:
+  """ Tries the *formats* one after another, catching the #ValueError of every miss. """
+
+  for fmt in formats:
+    try:
+      return fmt.parse_datetime(s)
+    except ValueError:
+      pass
+  raise ValueError(s)
+
+
+def bytes_per_value(func: t.Callable[[t.List[str]], t.List[t.Any]], values: t.List[str]) -> float:
+  tracemalloc.start()
+  try:
+    result = func(values)
+    size, _peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  assert len(result) == len(values)
+  return size / len(values)
+
+
+class FormatSetSuite:
+  """
+  Measures the worst case of a #format_set, where the values only match its last format,
+  compared to trying the formats one after another and to parsing with the matching format.
+  """
+
+  params = [2, 10, 50]
+  param_names = ['formats']
+
+  def setup(self, formats):
+    self.formats = [datetime_format.compile(f'%Y-%m-%dT%H:%M:%S [{i}]') for i in range(formats)]
+    self.format_set = format_set('benchmark', datetime_formats=self.formats)
+    self.values = [f'2021-03-17T10:15:{i % 60:02} [{formats - 1}]' for i in range(1000)]
+
+  def time_format_set_parse_datetime(self, formats):
+    for s in self.values:
+      self.format_set.parse_datetime(s)
+
+  def time_format_set_parse_many(self, formats):
+    self.format_set.parse_many(self.values)
+
+  def time_baseline_try_each_format(self, formats):
+    for s in self.values:
+      parse_each(self.formats, s)
+
+  def time_baseline_matching_format(self, formats):
+    fmt = self.formats[-1]
+    for s in self.values:
+      fmt.parse_datetime(s)
+
+
+class CompiledFormatSuite:
+  """
+  Measures parsing with a format string, which is compiled once and then taken from the cache,
+  compared to compiling the format for every value and to parsing with a precompiled format.
+  """
+
+  FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+
+  def setup(self):
+    self.values = generate_iso8601(1000)
+
+  def time_parse_datetime_format_string(self):
+    for s in self.values:
+      parse_datetime(self.FORMAT, s)
+
+  def time_baseline_compile_every_value(self):
+    for s in self.values:
+      datetime_format._compile(self.FORMAT, False).parse_datetime(s)
+
+  def time_baseline_precompiled_format(self):
+    fmt = datetime_format.compile(self.FORMAT)
+    for s in self.values:
+      fmt.parse_datetime(s)
+
+
+class FormatDatetimeSuite:
+  """
+  Measures formatting datetimes with #JAVA_OFFSET_DATETIME compared to the stdlib.
+  """
+
+  def setup(self):
+    self.values = generate_datetimes(1000)
+
+  def time_java_offset_datetime_format_datetime(self):
+    for dt in self.values:
+      JAVA_OFFSET_DATETIME.format_datetime(dt)
+
+  def time_java_offset_datetime_format_many(self):
+    JAVA_OFFSET_DATETIME.format_many(self.values)
+
+  def time_baseline_isoformat(self):
+    for dt in self.values:
+      dt.isoformat()
+
+  def time_baseline_strftime(self):
+    for dt in self.values:
+      dt.strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+
+
+class DurationSuite:
+  """
+  Measures parsing ISO 8601 durations with #duration.parse(), which caches recently parsed
+  strings, compared to parsing every string.
+  """
+
+  VALUES = ['PT30S', 'PT5M', 'P1DT12H', 'P3Y6M4DT12H30M5S', 'P2W'] * 200
+  UNORDERED_VALUES = ['PT30S', 'PT5M', 'P1DT12H', 'P4D6M3YT5S30M12H', 'P2W'] * 200
+
+  def time_duration_parse(self):
+    for s in self.VALUES:
+      duration.parse(s)
+
+  def time_duration_parse_unordered(self):
+    for s in self.UNORDERED_VALUES:
+      duration.parse(s)
+
+  def time_baseline_duration_parse_uncached(self):
+    for s in self.VALUES:
+      duration(*_parse_duration.__wrapped__(s))
+
+  def time_duration_as_timedelta(self):
+    for s in self.VALUES:
+      duration.parse(s).as_timedelta()
+
+
+class MemorySuite:
+  """
+  Measures the memory that is allocated per parsed value, compared to the stdlib.
+  """
+
+  def setup(self):
+    self.values = generate_iso8601(10000)
+
+  def track_bytes_per_value_iso_8601_parse_many(self):
+    return bytes_per_value(ISO_8601.parse_many, self.values)
+
+  track_bytes_per_value_iso_8601_parse_many.unit = 'bytes'
+
+  def track_bytes_per_value_format_parse_many(self):
+    return bytes_per_value(datetime_format.compile('%Y-%m-%dT%H:%M:%S.%f%z').parse_many, self.values)
+
+  track_bytes_per_value_format_parse_many.unit = 'bytes'
+
+  def track_bytes_per_value_baseline_fromisoformat(self):
+    return bytes_per_value(lambda values: list(map(datetime.datetime.fromisoformat, values)), self.values)
+
+  track_bytes_per_value_baseline_fromisoformat.unit = 'bytes'
+
+
+class BulkParsingSuite:
+  """
+  Measures parsing large numbers of datetime strings, compared to the stdlib.
+  """
+
+  params = [10000, 100000]
+  param_names = ['size']
+
+  def setup(self, size):
+    self.values = generate_iso8601(size)
+
+  def time_iso_8601_parse_many(self, size):
+    ISO_8601.parse_many(self.values)
+
+  def time_iso_8601_parse_datetime(self, size):
+    for s in self.values:
+      ISO_8601.parse_datetime(s)
+
+  def time_infer_format_parse_many(self, size):
+    infer_format(self.values[:100]).parse_many(self.values)
+
+  def time_baseline_fromisoformat(self, size):
+    for s in self.values:
+      datetime.datetime.fromisoformat(s)
+
+  def time_baseline_strptime(self, size):
+    for s in self.values:
+      datetime.datetime.strptime(s, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+  def peakmem_iso_8601_parse_many(self, size):
+    ISO_8601.parse_many(self.values)
+
+  def peakmem_baseline_fromisoformat(self, size):
+    list(map(datetime.datetime.fromisoformat, self.values))
@@ -15,6 +15,7 @@ __all__ = [
   'format_datetime',
   'format_date',
   'format_set',
+  'infer_format',
   'JAVA_OFFSET_DATETIME',
   'ISO_8601',
 ]
@@ -25,6 +26,7 @@ import typing as t
 from .duration import duration
 from .format import date_format, datetime_format, time_format
 from .format_sets import format_set, JAVA_OFFSET_DATETIME, ISO_8601
+from .infer import infer_format
 
 
 def tzlocal() -> datetime.tzinfo:
@@ -1,5 +1,7 @@
 
 import datetime
+import functools
+import re
 import typing as t
 from dataclasses import dataclass
 from nr.utils.re import MatchAllError, match_all
@@ -11,6 +13,13 @@ SECONDS_PER_DAY = 3600 * 24
 DAYS_PER_MONTH = 30.4375
 DAYS_PER_YEAR = 365.25
 
+_SECONDS_PER_MONTH = DAYS_PER_MONTH * SECONDS_PER_DAY
+_SECONDS_PER_YEAR = DAYS_PER_YEAR * SECONDS_PER_DAY
+
+#: Matches an ISO 8601 duration string with the components in the canonical order. The groups
+#: correspond to the fields of the #duration class.
+_DURATION_REGEX = re.compile(r'P(?:(\d+)Y)?(?:(\d+)M)?(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?')
+
 
 @dataclass
 class duration:
@@ -53,21 +62,19 @@ class duration:
     """
 
     return (
-      self.years * DAYS_PER_YEAR * SECONDS_PER_DAY +
-      self.months * DAYS_PER_MONTH * SECONDS_PER_DAY +
-      self.weeks * 7 * SECONDS_PER_DAY +
-      self.days * SECONDS_PER_DAY +
-      self.hours * 3600 +
-      self.minutes * 60 +
-      self.seconds)
+      self.years * _SECONDS_PER_YEAR +
+      self.months * _SECONDS_PER_MONTH +
+      float(((self.weeks * 7 + self.days) * 24 + self.hours) * 3600 + self.minutes * 60 + self.seconds))
 
   def as_timedelta(self) -> datetime.timedelta:
     """
-    Returns the seconds represented by this duration as a #datetime.timedelta object. The arguments
-    and keyword arguments are forwarded to the #total_seconds() method.
+    Returns the seconds represented by this duration as a #datetime.timedelta object.
     """
 
-    return datetime.timedelta(seconds=self.total_seconds())
+    if self.years or self.months:
+      return datetime.timedelta(seconds=self.total_seconds())
+    return datetime.timedelta(days=self.weeks * 7 + self.days,
+      seconds=self.hours * 3600 + self.minutes * 60 + self.seconds)
 
   def as_relativedelta(self) -> 'dateutil.relativedelta.relativedelta':
     """
@@ -88,37 +95,59 @@ class duration:
     See also https://en.wikipedia.org/wiki/ISO_8601#Durations
     """
 
-    parts = s.split('T')
-    if not s or s[0] != 'P' or len(parts) > 2:
-      raise ValueError('Not an ISO 8601 duration string: {!r}'.format(s))
-
-    part_one = parts[0][1:]
-    part_two = parts[1] if len(parts) == 2 else ''
-
-    fields = {}
-
-    try:
-      for number, unit in (x.groups() for x in match_all(r'(\d+)(D|W|M|Y)', part_one)):
-        number = int(number)
-        if unit == 'Y':
-          fields['years'] = number
-        elif unit == 'M':
-          fields['months'] = number
-        elif unit == 'W':
-          fields['weeks'] = number
-        elif unit == 'D':
-          fields['days'] = number
-
-      for number, unit in (x.groups() for x in match_all(r'(\d+)(S|H|M)', part_two)):
-        number = int(number)
-        if unit == 'H':
-          fields['hours'] = number
-        elif unit == 'M':
-          fields['minutes'] = number
-        elif unit == 'S':
-          fields['seconds'] = number
-
-    except MatchAllError:
-      raise ValueError('Not an ISO 8601 duration string: {!r}'.format(s))
-
-    return cls(**fields)
+    values = _parse_duration(s)
+    if cls is duration:
+      # Skip the validation in __post_init__(), the parsed values are never negative.
+      result = object.__new__(cls)
+      result.years, result.months, result.weeks, result.days, result.hours, result.minutes, result.seconds = values
+      return result
+    return cls(*values)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_duration(s: str) -> t.Tuple[int, int, int, int, int, int, int]:
+  """
+  Parses an ISO 8601 duration string into the values for the fields of a #duration. The
+  results are cached because the same durations (e.g. `PT30S`) tend to be parsed again and
+  again.
+  """
+
+  match = _DURATION_REGEX.fullmatch(s)
+  if match is not None:
+    return tuple(int(x) if x else 0 for x in match.groups())  # type: ignore
+
+  # Fall back to parsing the components in any order.
+  parts = s.split('T')
+  if not s or s[0] != 'P' or len(parts) > 2:
+    raise ValueError('Not an ISO 8601 duration string: {!r}'.format(s))
+
+  part_one = parts[0][1:]
+  part_two = parts[1] if len(parts) == 2 else ''
+
+  fields = dict.fromkeys(duration._fields, 0)
+
+  try:
+    for number, unit in (x.groups() for x in match_all(r'(\d+)(D|W|M|Y)', part_one)):
+      number = int(number)
+      if unit == 'Y':
+        fields['years'] = number
+      elif unit == 'M':
+        fields['months'] = number
+      elif unit == 'W':
+        fields['weeks'] = number
+      elif unit == 'D':
+        fields['days'] = number
+
+    for number, unit in (x.groups() for x in match_all(r'(\d+)(S|H|M)', part_two)):
+      number = int(number)
+      if unit == 'H':
+        fields['hours'] = number
+      elif unit == 'M':
+        fields['minutes'] = number
+      elif unit == 'S':
+        fields['seconds'] = number
+
+  except MatchAllError:
+    raise ValueError('Not an ISO 8601 duration string: {!r}'.format(s))
+
+  return tuple(fields[k] for k in duration._fields)  # type: ignore
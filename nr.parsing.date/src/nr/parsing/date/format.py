@@ -1,26 +1,113 @@
 
+import collections
 import datetime
 import io
+import operator
 import re
+import threading
 import typing as t
-from dataclasses import dataclass
-from .options import DatetimeComponentType, IFormatOption, FormatOptions
+from dataclasses import dataclass, field
+from .options import DatetimeComponent, DatetimeComponentType, IFormatOption, FormatOptions, NumericFormatOption
 
+T = t.TypeVar('T')
 _T_datetime_format = t.TypeVar('_T_datetime_format', bound='_datetime_format')
 
+#: The maximum number of compiled formats that are cached by #_datetime_format.compile().
+COMPILE_CACHE_SIZE = 256
 
-@dataclass
+_compile_cache: 'collections.OrderedDict[t.Tuple[type, str, bool], _datetime_format]' = collections.OrderedDict()
+_compile_cache_lock = threading.Lock()
+
+#: The positional arguments of the #datetime.datetime constructor, in the order of the
+#: #DatetimeComponent enumeration, and their values if the format does not capture them.
+_COMPONENTS = list(DatetimeComponent)
+_DEFAULTS = (1900, 1, 1, 0, 0, 0, 0, None)
+
+#: The accepted values for the *on_error* parameter of the `parse_many()` methods.
+_ON_ERROR = ('raise', 'none', 'collect')
+
+_ParsePlan = t.Tuple[t.Tuple[int, int, t.Callable[[str], t.Any]], ...]
+
+
+class _FormatPlan(t.NamedTuple):
+  #: A `%`-style template for the formatted string.
+  template: str
+  #: Returns the tuple of component values of a datetime that are formatted into the template.
+  getter: t.Callable[[datetime.datetime], t.Tuple[t.Any, ...]]
+  #: The index and function for component values that must be converted to a string before
+  #: they are formatted into the template.
+  converters: t.Tuple[t.Tuple[int, t.Callable[[datetime.datetime, t.Any], str]], ...]
+
+
+def _parse_many(parse: t.Callable[[str], T], values: t.Iterable[str], on_error: str) -> t.List[t.Any]:
+  """
+  Calls *parse* for every string in *values*. If *parse* raises a #ValueError, the error is
+  re-raised, or #None or the error is added to the results instead, depending on *on_error*.
+  """
+
+  if on_error not in _ON_ERROR:
+    raise ValueError(f'on_error must be one of {_ON_ERROR!r}, got {on_error!r}')
+  result: t.List[t.Any] = []
+  append = result.append
+  for s in values:
+    try:
+      append(parse(s))
+    except ValueError as exc:
+      if on_error == 'raise':
+        raise
+      append(None if on_error == 'none' else exc)
+  return result
+
+
+@dataclass(frozen=True)
 class _datetime_format:
+  """
+  A compiled format string. Compiled formats are immutable, as #compile() returns the same
+  object to every caller: the #seq is converted to a tuple and assigning attributes raises a
+  #dataclasses.FrozenInstanceError.
+  """
+
   format_str: str
   regex: 're.Pattern'
-  seq: t.List[t.Union[str, IFormatOption]]
+  seq: t.Sequence[t.Union[str, IFormatOption]]
+
+  def __post_init__(self) -> None:
+    object.__setattr__(self, 'seq', tuple(self.seq))
 
   @classmethod
   def compile(cls: t.Type[_T_datetime_format], format_str: str, regex_mode: bool = False) -> '_T_datetime_format':
     """
-    Compiles a format string to a static regex representation for fast parsing.
+    Compiles a format string to a static regex representation for fast parsing. The compiled
+    formats are cached, so compiling the same format string again returns the same object.
+    """
+
+    key = (cls, format_str, bool(regex_mode))
+    with _compile_cache_lock:
+      fmt = _compile_cache.get(key)
+      if fmt is not None:
+        _compile_cache.move_to_end(key)
+        return t.cast(_T_datetime_format, fmt)
+
+    fmt = cls._compile(format_str, regex_mode)
+    with _compile_cache_lock:
+      # Another thread may have compiled the same format in the meantime.
+      fmt = _compile_cache.setdefault(key, fmt)
+      _compile_cache.move_to_end(key)
+      while len(_compile_cache) > COMPILE_CACHE_SIZE:
+        _compile_cache.popitem(last=False)
+    return t.cast(_T_datetime_format, fmt)
+
+  @classmethod
+  def clear_cache(cls) -> None:
+    """
+    Clears the cache of compiled formats of all format classes.
     """
 
+    with _compile_cache_lock:
+      _compile_cache.clear()
+
+  @classmethod
+  def _compile(cls: t.Type[_T_datetime_format], format_str: str, regex_mode: bool) -> '_T_datetime_format':
     combo_regex = io.StringIO()
     combo_regex.write('^')
     combo_sequence: t.List[t.Union[str, IFormatOption]] = []
@@ -66,74 +153,156 @@ class _datetime_format:
     return f'{type(self).__name__}({self.format_str!r})'
 
 
-@dataclass
+@dataclass(frozen=True)
 class date_format(_datetime_format):
 
   __repr__ = _datetime_format.__repr__
 
   def __post_init__(self) -> None:
+    super().__post_init__()
     for item in self.seq:
       if isinstance(item, IFormatOption) and item.component.type != DatetimeComponentType.Date:
         raise ValueError(f'%{item.char} is an invalid format option for date_format')
+    object.__setattr__(self, '_as_datetime_format', datetime_format(self.format_str, self.regex, self.seq))
 
   def parse_date(self, s: str) -> datetime.date:
     # TODO(NiklasRosenstein): Validate that the format string actually only captures date components.
-    dt = datetime_format(self.format_str, self.regex, self.seq).parse_datetime(s)
+    dt = self._as_datetime_format.parse_datetime(s)
     return dt.date()
 
   def format_date(self, d: datetime.date) -> str:
     # TODO(NiklasRosenstein): Validate that the format string actually only captures date components.
     dt = datetime.datetime(d.year, d.month, d.day)
-    return datetime_format(self.format_str, self.regex, self.seq).format_datetime(dt)
+    return self._as_datetime_format.format_datetime(dt)
 
   def to_datetime_format(self) -> 'datetime_format':
-    return datetime_format(self.format_str, self.regex, self.seq)
+    return self._as_datetime_format
 
 
-@dataclass
+@dataclass(frozen=True)
 class time_format(_datetime_format):
 
   __repr__ = _datetime_format.__repr__
 
   def __post_init__(self) -> None:
+    super().__post_init__()
     for item in self.seq:
       if isinstance(item, IFormatOption) and item.component.type != DatetimeComponentType.Time:
         raise ValueError(f'%{item.char} is an invalid format option for time_format')
+    object.__setattr__(self, '_as_datetime_format', datetime_format(self.format_str, self.regex, self.seq))
 
   def parse_time(self, s: str) -> datetime.time:
     # TODO(NiklasRosenstein): Validate that the format string actually only captures time components.
-    dt = datetime_format(self.format_str, self.regex, self.seq).parse_datetime(s)
+    dt = self._as_datetime_format.parse_datetime(s)
     return dt.time()
 
   def format_time(self, t: datetime.time) -> str:
     # TODO(NiklasRosenstein): Validate that the format string actually only captures time components.
     dt = datetime.datetime(1970, 1, 1, t.hour, t.minute, t.second, t.microsecond, t.tzinfo)
-    return datetime_format(self.format_str, self.regex, self.seq).format_datetime(dt)
+    return self._as_datetime_format.format_datetime(dt)
 
   def to_datetime_format(self) -> 'datetime_format':
-    return datetime_format(self.format_str, self.regex, self.seq)
+    return self._as_datetime_format
 
 
+@dataclass(frozen=True)
 class datetime_format(_datetime_format):
 
+  __repr__ = _datetime_format.__repr__
+
+  # The plans are computed lazily and cached on the otherwise frozen instance.
+  _plan: t.Optional[_ParsePlan] = field(default=None, init=False, repr=False, compare=False)
+  _format_plan: t.Optional[_FormatPlan] = field(default=None, init=False, repr=False, compare=False)
+
+  def _get_plan(self) -> _ParsePlan:
+    """
+    Returns the group index, the #datetime.datetime constructor argument index and the parse
+    function for each format option in the #seq.
+    """
+
+    if self._plan is None:
+      plan = []
+      for index, item in enumerate(x for x in self.seq if isinstance(x, IFormatOption)):
+        parse = item.parse_string
+        if type(item) is NumericFormatOption and item.post_parse is None:
+          parse = int
+        plan.append((index, _COMPONENTS.index(item.component), parse))
+      object.__setattr__(self, '_plan', tuple(plan))
+    return self._plan
+
   def parse_datetime(self, s: str) -> datetime.datetime:
     match = self.regex.match(s)
     if not match:
       raise ValueError(f'"{s}" does not match format "{self.format_str}"')
-    kwargs = {'year': 1900, 'month': 1, 'day': 1, 'hour': 0}
-    groups = iter(match.groups())
-    for item in self.seq:
-      if isinstance(item, IFormatOption):
-        matched_string = next(groups)
-        if matched_string is not None:
-          kwargs[item.component.value] = item.parse_string(matched_string)
-    return datetime.datetime(**kwargs)  # type: ignore
+    return self.from_groups(match.groups())
 
-  def format_datetime(self, dt: datetime.datetime) -> str:
-    result = io.StringIO()
-    for item in self.seq:
-      if isinstance(item, str):
-        result.write(item)
+  def from_groups(self, groups: t.Sequence[t.Optional[str]]) -> datetime.datetime:
+    """
+    Constructs a datetime from the strings captured by the groups of the #regex.
+    """
+
+    args = list(_DEFAULTS)
+    for index, arg, parse in self._plan or self._get_plan():
+      matched_string = groups[index]
+      if matched_string is not None:
+        args[arg] = parse(matched_string)
+    return datetime.datetime(*args)  # type: ignore
+
+  def parse_many(self, values: t.Iterable[str], on_error: str = 'raise') -> t.List[t.Any]:
+    """
+    Parses every string in *values* like #parse_datetime(). If a value cannot be parsed, the
+    #ValueError is raised if *on_error* is `'raise'`. Otherwise #None (if *on_error* is `'none'`)
+    or the #ValueError (if *on_error* is `'collect'`) is put in its place in the result list.
+    """
+
+    match = self.regex.match
+    from_groups = self.from_groups
+    format_str = self.format_str
+
+    def parse(s: str) -> datetime.datetime:
+      m = match(s)
+      if m is None:
+        raise ValueError(f'"{s}" does not match format "{format_str}"')
+      return from_groups(m.groups())
+
+    return _parse_many(parse, values, on_error)
+
+  def _get_format_plan(self) -> _FormatPlan:
+    if self._format_plan is None:
+      template = io.StringIO()
+      attrs = []
+      converters = []
+      for item in self.seq:
+        if isinstance(item, str):
+          template.write(item.replace('%', '%%'))
+          continue
+        if isinstance(item, NumericFormatOption) and item.template is not None:
+          template.write(item.template)
+        else:
+          template.write('%s')
+          converters.append((len(attrs), item.format_value))
+        attrs.append(item.component.value)
+      if len(attrs) > 1:
+        getter = operator.attrgetter(*attrs)
       else:
-        result.write(item.format_value(dt, getattr(dt, item.component.value)))
-    return result.getvalue()
+        # #operator.attrgetter() does not return a tuple for less than two attributes.
+        getter = lambda dt: tuple(getattr(dt, x) for x in attrs)
+      object.__setattr__(self, '_format_plan', _FormatPlan(template.getvalue(), getter, tuple(converters)))
+    return self._format_plan
+
+  def format_datetime(self, dt: datetime.datetime) -> str:
+    template, getter, converters = self._format_plan or self._get_format_plan()
+    values = getter(dt)
+    if converters:
+      values = list(values)
+      for index, convert in converters:
+        values[index] = convert(dt, values[index])
+      values = tuple(values)
+    return template % values
+
+  def format_many(self, values: t.Iterable[datetime.datetime]) -> t.List[str]:
+    """
+    Formats every datetime in *values* like #format_datetime().
+    """
+
+    return list(map(self.format_datetime, values))
@@ -1,10 +1,12 @@
 
 import datetime
+import re
+import sys
 import typing as t
 from dataclasses import dataclass, field
 
-from nr.parsing.date.options import DatetimeComponent
-from .format import _datetime_format, date_format, datetime_format, time_format
+from nr.parsing.date.options import DatetimeComponent, FormatOptions
+from .format import _datetime_format, _parse_many, date_format, datetime_format, time_format
 
 
 def _formulate_parse_error(name: str, formats: t.Sequence[_datetime_format], s: str) -> ValueError:
@@ -12,15 +14,80 @@ def _formulate_parse_error(name: str, formats: t.Sequence[_datetime_format], s:
     ''.join(f'\n  | {x.format_str}' for x in formats))
 
 
+def _to_datetime_format(fmt: _datetime_format) -> datetime_format:
+  if isinstance(fmt, datetime_format):
+    return fmt
+  return fmt.to_datetime_format()  # type: ignore
+
+
+class _Dispatcher:
+  """
+  Matches a string against a list of formats in a single regex call. The regexes of the formats
+  are combined into one alternation with a named group per format, so the regex engine picks the
+  first format that matches, as if the formats were tried one after another.
+  """
+
+  def __init__(self, formats: t.Sequence[_datetime_format]) -> None:
+    #: The format list that the dispatcher was built from and its length at that time.
+    self.source = formats
+    self.length = len(formats)
+    self.formats = tuple(formats)
+    self._datetime_formats = [_to_datetime_format(x) for x in self.formats]
+
+    # Maps the index of each format's named group to the format index and the slice of the
+    # match groups that belong to the format.
+    self._targets: t.Dict[int, t.Tuple[int, datetime_format, int, int]] = {}
+    alternatives = []
+    group = 1
+    for index, fmt in enumerate(self._datetime_formats):
+      pattern = fmt.regex.pattern
+      assert pattern.startswith('^') and pattern.endswith('$'), pattern
+      alternatives.append(f'(?P<f{index}>{pattern[1:-1]})$')
+      self._targets[group] = (index, fmt, group, group + fmt.regex.groups)
+      group += fmt.regex.groups + 1
+    self.regex = re.compile('^(?:' + '|'.join(alternatives) + ')')
+
+  def parse(self, s: str) -> t.Optional[datetime.datetime]:
+    result = self.parse_with_format(s)
+    return None if result is None else result[1]
+
+  def parse_with_format(self, s: str) -> t.Optional[t.Tuple[datetime_format, datetime.datetime]]:
+    """
+    Returns the first format that parses *s* and the parsed value.
+    """
+
+    match = self.regex.match(s)
+    if match is None:
+      return None
+    index, fmt, start, end = self._targets[match.lastindex]  # type: ignore
+    try:
+      return fmt, fmt.from_groups(match.groups()[start:end])
+    except ValueError:
+      pass
+    # The string matches the format, but the captured values are invalid (e.g. the day is out
+    # of range). Continue with the formats after it.
+    for fmt in self._datetime_formats[index + 1:]:
+      try:
+        return fmt, fmt.parse_datetime(s)
+      except ValueError:
+        pass
+    return None
+
+
 @dataclass
 class format_set:
   """
   Format sets represent a group of date, time and dateime formats. When formatting a value, it will
   use the first format defined in the group. When parsing, it will attempt to parse the value using
-  all of the provided formats (stopping on the first successful parse).
+  all of the provided formats (stopping on the first successful parse). The formats are combined
+  into a single regex, so a value is matched against all of the formats at once.
 
   #format_datetime() can take into account the #date_formats and #time_formats as well if the
   *partial* parameter is set to #True.
+
+  The combined regexes are rebuilt automatically when a format list is replaced or its length
+  changes (e.g. a format was appended). Replacing a format in a list in place requires a call
+  to #clear_cache().
   """
 
   name: str
@@ -29,15 +96,36 @@ class format_set:
   time_formats: t.List[time_format] = field(default_factory=list)
   datetime_formats: t.List[datetime_format] = field(default_factory=list)
 
+  #: A function that parses common datetime strings faster than the #datetime_formats. It must
+  #: return the same result as the #datetime_formats, or #None for strings that it does not
+  #: handle, which are then parsed with the #datetime_formats.
+  fast_parser: t.Optional[t.Callable[[str], t.Optional[datetime.datetime]]] = field(default=None, repr=False)
+
+  _dispatchers: t.Dict[str, _Dispatcher] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+  def _get_dispatcher(self, kind: str, formats: t.Sequence[_datetime_format]) -> _Dispatcher:
+    # The format lists can be modified after the format set was created, in which case the
+    # dispatcher must be rebuilt. Only the identity and length are compared to keep this O(1).
+    dispatcher = self._dispatchers.get(kind)
+    if dispatcher is None or dispatcher.source is not formats or dispatcher.length != len(formats):
+      dispatcher = self._dispatchers[kind] = _Dispatcher(formats)
+    return dispatcher
+
+  def clear_cache(self) -> None:
+    """
+    Drops the combined regexes of the format lists, they are rebuilt on the next parse. This must
+    be called after a format in one of the lists was replaced in place.
+    """
+
+    self._dispatchers.clear()
+
   def parse_date(self, s: str) -> datetime.date:
     if not self.date_formats:
       raise ValueError(f'{self.name} has no date formats')
-    for fmt in self.date_formats:
-      try:
-        return fmt.parse_date(s)
-      except ValueError:
-        pass
-    raise _formulate_parse_error(self.name, self.date_formats, s)
+    dt = self._get_dispatcher('date', self.date_formats).parse(s)
+    if dt is None:
+      raise _formulate_parse_error(self.name, self.date_formats, s)
+    return dt.date()
 
   def format_date(self, d: datetime.date) -> str:
     if not self.date_formats:
@@ -47,11 +135,16 @@ class format_set:
   def parse_datetime(self, s: str, partial: bool = False) -> datetime.datetime:
     if not self.datetime_formats:
       raise ValueError(f'{self.name} has no datetime formats')
-    for fmt in self.datetime_formats:
-      try:
-        return fmt.parse_datetime(s)
-      except ValueError:
-        pass
+    if self.fast_parser is not None:
+      dt = self.fast_parser(s)
+      if dt is not None:
+        return dt
+    dt = self._get_dispatcher('datetime', self.datetime_formats).parse(s)
+    if dt is not None:
+      return dt
+    return self._parse_partial(s, partial)
+
+  def _parse_partial(self, s: str, partial: bool) -> datetime.datetime:
     if partial:
       try:
         return datetime.datetime.combine(self.parse_date(s), datetime.time.min)
@@ -63,20 +156,61 @@ class format_set:
         pass
     raise _formulate_parse_error(self.name, self.datetime_formats, s)
 
+  def parse_many(self, values: t.Iterable[str], partial: bool = False, on_error: str = 'raise') -> t.List[t.Any]:
+    """
+    Parses every string in *values* like #parse_datetime(). The format that parsed the previous
+    value is tried first, so a sequence of values in the same format (e.g. a column of
+    timestamps) is parsed with a single match of that format's regex per value. Note that this
+    means that a value that matches multiple formats of the set is parsed with the most recently
+    used format instead of the first format.
+
+    The *on_error* parameter works like for #datetime_format.parse_many().
+    """
+
+    if not self.datetime_formats:
+      raise ValueError(f'{self.name} has no datetime formats')
+    dispatcher = self._get_dispatcher('datetime', self.datetime_formats)
+    fast_parser = self.fast_parser
+    last_format: t.Optional[datetime_format] = None
+
+    def parse(s: str) -> datetime.datetime:
+      nonlocal last_format
+      if fast_parser is not None:
+        dt = fast_parser(s)
+        if dt is not None:
+          return dt
+      if last_format is not None:
+        match = last_format.regex.match(s)
+        if match is not None:
+          try:
+            return last_format.from_groups(match.groups())
+          except ValueError:
+            pass
+      result = dispatcher.parse_with_format(s)
+      if result is not None:
+        last_format, dt = result
+        return dt
+      return self._parse_partial(s, partial)
+
+    return _parse_many(parse, values, on_error)
+
   def format_datetime(self, dt: datetime.datetime) -> str:
     if not self.datetime_formats:
       raise ValueError(f'{self.name} has no datetime formats')
     return self.datetime_formats[0].format_datetime(dt)
 
+  def format_many(self, values: t.Iterable[datetime.datetime]) -> t.List[str]:
+    if not self.datetime_formats:
+      raise ValueError(f'{self.name} has no datetime formats')
+    return self.datetime_formats[0].format_many(values)
+
   def parse_time(self, s: str) -> datetime.time:
     if not self.time_formats:
       raise ValueError(f'{self.name} has no time formats')
-    for fmt in self.time_formats:
-      try:
-        return fmt.parse_time(s)
-      except ValueError:
-        pass
-    raise _formulate_parse_error(self.name, self.time_formats, s)
+    dt = self._get_dispatcher('time', self.time_formats).parse(s)
+    if dt is None:
+      raise _formulate_parse_error(self.name, self.time_formats, s)
+    return dt.time()
 
   def format_time(self, t: datetime.time) -> str:
     if not self.time_formats:
@@ -94,6 +228,57 @@ JAVA_OFFSET_DATETIME = format_set(
 )
 
 
+def _parse_iso8601_datetime(s: str) -> t.Optional[datetime.datetime]:
+  """
+  Parses ISO 8601 datetime strings of the common fixed-width shape
+  `YYYY-MM-DDTHH:MM:SS[.ffffff][Z|+HH:MM|+HHMM|+HH]` by slicing the string at fixed offsets.
+  Returns #None for strings of any other shape.
+  """
+
+  length = len(s)
+  if length < 19 or s[4] != '-' or s[7] != '-' or s[10] != 'T' or s[13] != ':' or s[16] != ':':
+    return None
+
+  end = length
+  if s[-1] == 'Z':
+    end -= 1
+  elif length >= 22 and s[-3] in '+-':
+    end -= 3
+  elif length >= 24 and s[-5] in '+-':
+    end -= 5
+  elif length >= 25 and s[-6] in '+-' and s[-3] == ':':
+    end -= 6
+  fraction = end - 20
+  if end != 19 and (s[19] != '.' or not 0 < fraction <= 6):
+    return None
+
+  try:
+    if _fromisoformat is not None and fraction in (-1, 3, 6) and length - end in (0, 1, 6):
+      # The shapes supported by the stdlib before Python 3.11, which it parses much faster.
+      if end == length:
+        return _fromisoformat(s)
+      # Use the interned timezone of the format path instead of the one created by the stdlib.
+      tzinfo = _TIMEZONE.parse_string(s[end:])
+      dt = _fromisoformat(s[:-1] if length - end == 1 and not _FROMISOFORMAT_Z else s)
+      return dt if dt.tzinfo is tzinfo else dt.replace(tzinfo=tzinfo)
+    digits = s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] + s[17:19] + s[20:end] + s[end + 1:]
+    if length - end == 6:
+      digits = digits[:-3] + digits[-2:]  # The colon in the `+HH:MM` offset.
+    if not digits.isdecimal():
+      return None
+    microsecond = int(s[20:end]) * 10 ** (6 - fraction) if fraction > 0 else 0
+    tzinfo = _TIMEZONE.parse_string(s[end:]) if end != length else None
+    return datetime.datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]),
+      int(s[17:19]), microsecond, tzinfo)
+  except ValueError:
+    return None
+
+
+_fromisoformat = getattr(datetime.datetime, 'fromisoformat', None)  # Python 3.7+
+_FROMISOFORMAT_Z = sys.version_info >= (3, 11)
+_TIMEZONE = FormatOptions.Timezone.value
+
+
 #: Date/time formats for parsing ISO 8601 dates and times.
 #:
 #: Supported ISO 8601 date formats are (implemented using the `%Y%m%d` format options):
@@ -119,7 +304,8 @@ JAVA_OFFSET_DATETIME = format_set(
 #: * `+HH` or `-HH`
 #:
 #: Datetimes are simply concatenations of the possible date, time and offset formats, where
-#: the date and time are separated by a `T`.
+#: the date and time are separated by a `T`. Datetimes in the common `YYYY-MM-DDThh:mm:ss` shape
+#: (with optional sub-seconds and timezone offset) are parsed without regular expressions.
 ISO_8601 = format_set(
   name='ISO 8061',
   reference_url='https://en.wikipedia.org/wiki/ISO_8601',
@@ -131,7 +317,8 @@ ISO_8601 = format_set(
     time_format.compile(r'%H(:%M(:%S(\.%f)?)?)?%z?', regex_mode=True),
     time_format.compile(r'%H(%M%S??)?%z?', regex_mode=True),
   ],
-  datetime_formats=[]
+  datetime_formats=[],
+  fast_parser=_parse_iso8601_datetime,
 )
 
 # Construct the datetime_formats, combining each element from the time and date formats.
@@ -0,0 +1,161 @@
+
+import re
+import typing as t
+from .format import datetime_format
+
+_Candidates = t.Iterator[t.Tuple[str, int]]
+
+
+def _is_digits(token: str, *lengths: int) -> bool:
+  return token.isdecimal() and len(token) in lengths
+
+
+def _date_candidates(tokens: t.List[str], i: int) -> _Candidates:
+  """
+  Yields the format strings that could represent the date at *tokens[i]*, along with the index
+  of the token after the date. Yields nothing if the tokens do not start with a date.
+  """
+
+  def get(index: int) -> str:
+    return tokens[index] if index < len(tokens) else ''
+
+  if _is_digits(get(i), 8):
+    yield '%Y%m%d', i + 1
+    return
+  if _is_digits(get(i), 12, 14):
+    yield '%Y%m%d%H%M' + ('%S' if len(get(i)) == 14 else ''), i + 1
+    return
+
+  sep = get(i + 1)
+  if sep.isdecimal() or not sep or sep != get(i + 3):
+    if _is_digits(get(i), 4) and sep and not sep.isdecimal() and _is_digits(get(i + 2), 2):
+      yield f'%Y{sep}%m', i + 3
+    return
+
+  if _is_digits(get(i), 4) and _is_digits(get(i + 2), 2) and _is_digits(get(i + 4), 2):
+    yield f'%Y{sep}%m{sep}%d', i + 5
+    yield f'%Y{sep}%d{sep}%m', i + 5
+  elif _is_digits(get(i), 2) and _is_digits(get(i + 2), 2) and _is_digits(get(i + 4), 4):
+    # Slashes usually separate the US month/day/year order.
+    if sep == '/':
+      yield f'%m{sep}%d{sep}%Y', i + 5
+      yield f'%d{sep}%m{sep}%Y', i + 5
+    else:
+      yield f'%d{sep}%m{sep}%Y', i + 5
+      yield f'%m{sep}%d{sep}%Y', i + 5
+
+
+def _time_candidates(tokens: t.List[str], i: int) -> _Candidates:
+  """
+  Yields the format strings that could represent the time at *tokens[i]*, including the
+  sub-seconds, along with the index of the token after the time.
+  """
+
+  def get(index: int) -> str:
+    return tokens[index] if index < len(tokens) else ''
+
+  if _is_digits(get(i), 6):
+    fmt, i = '%H%M%S', i + 1
+  elif _is_digits(get(i), 4):
+    yield '%H%M', i + 1
+    return
+  elif _is_digits(get(i), 2):
+    sep = get(i + 1)
+    if not sep or sep.isdecimal() or not _is_digits(get(i + 2), 2):
+      yield '%H', i + 1
+      return
+    if get(i + 3) != sep or not _is_digits(get(i + 4), 2):
+      yield f'%H{sep}%M', i + 3
+      return
+    fmt, i = f'%H{sep}%M{sep}%S', i + 5
+  else:
+    return
+
+  if get(i) in ('.', ',') and get(i + 1).isdecimal():
+    fmt, i = fmt + get(i) + '%f', i + 2
+  yield fmt, i
+
+
+def _timezone_candidates(tokens: t.List[str], i: int) -> _Candidates:
+  """
+  Yields the format string for the timezone at *tokens[i]*, including a literal prefix (e.g. a
+  space), along with the index of the token after the timezone. Yields an empty format string
+  if there is no timezone.
+  """
+
+  def get(index: int) -> str:
+    return tokens[index] if index < len(tokens) else ''
+
+  token = get(i)
+  if token.endswith('Z') and i + 1 == len(tokens):
+    yield token[:-1] + '%z', i + 1
+  elif token[-1:] in ('+', '-') and _is_digits(get(i + 1), 2, 4):
+    prefix = token[:-1]
+    if get(i + 2) == ':' and _is_digits(get(i + 1), 2) and _is_digits(get(i + 3), 2):
+      yield prefix + '%z', i + 4
+    else:
+      yield prefix + '%z', i + 2
+  yield '', i
+
+
+def _format_candidates(s: str) -> t.Iterator[str]:
+  """
+  Yields the format strings that match the shape of the datetime string *s*, the most likely
+  interpretation first.
+  """
+
+  if '%' in s:
+    # A literal percent sign cannot be represented in a format string.
+    return
+  tokens = re.findall(r'\d+|\D+', s)
+  dates = list(_date_candidates(tokens, 0))
+  if not dates:
+    # Maybe it's just a time.
+    dates = [('', 0)]
+
+  for date_fmt, i in dates:
+    times = [('', i)]
+    if date_fmt and i + 1 < len(tokens) and not tokens[i].isdecimal():
+      # A separator between the date and time, e.g. `T` or a space.
+      times = [(tokens[i] + x, j) for x, j in _time_candidates(tokens, i + 1)] + times
+    elif not date_fmt:
+      times = list(_time_candidates(tokens, i))
+
+    for time_fmt, j in times:
+      if not date_fmt and not time_fmt:
+        continue
+      for tz_fmt, k in _timezone_candidates(tokens, j):
+        if k == len(tokens) and ('%H' in date_fmt + time_fmt or not tz_fmt):
+          yield date_fmt + time_fmt + tz_fmt
+
+
+def infer_format(samples: t.Iterable[str]) -> datetime_format:
+  """
+  Infers the #datetime_format of the datetime strings in *samples* (e.g. the first values of a
+  column). Returns the first format that matches the shape of the first sample and parses all
+  of the samples, preferring formats with more components and the ISO 8601 and day/month/year
+  (or month/day/year for slash separated dates) orders. Raises a #ValueError if there is no
+  such format.
+
+  Bulk parsing with the inferred format is faster than trying all the formats of a #format_set
+  for every value.
+
+  ```py
+  fmt = infer_format(values[:100])
+  parsed = fmt.parse_many(values)
+  ```
+  """
+
+  samples = list(samples)
+  if not samples:
+    raise ValueError('no samples to infer the format from')
+
+  tried = []
+  for format_str in _format_candidates(samples[0]):
+    fmt = datetime_format.compile(format_str)
+    if None not in fmt.parse_many(samples, on_error='none'):
+      return fmt
+    tried.append(format_str)
+
+  raise ValueError(f'unable to infer the format of "{samples[0]}"' +
+    ''.join(f'\n  | {x}' for x in tried))
@@ -2,9 +2,10 @@
 import abc
 import datetime
 import enum
+import functools
 import re
 import typing as t
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class DatetimeComponentType(enum.Enum):
@@ -74,6 +75,10 @@ class NumericFormatOption(IFormatOption):
   format: t.Callable[[int], str]
   post_parse: t.Optional[t.Callable[[str], int]] = None
 
+  #: A `%`-style format that produces the same result as the *format* function. Used by
+  #: #datetime_format.format_datetime() to format all components with a single `%` operation.
+  template: t.Optional[str] = None
+
   def parse_string(self, s: str) -> t.Any:
     if self.post_parse is not None:
       return self.post_parse(s)
@@ -84,12 +89,35 @@ class NumericFormatOption(IFormatOption):
     return self.format(v)  # type: ignore
 
 
+@functools.lru_cache(maxsize=None)
+def _get_timezone(seconds: int) -> datetime.tzinfo:
+  return datetime.timezone(datetime.timedelta(seconds=seconds))
+
+
 @dataclass
 class TimezoneFormatOption(IFormatOption):
+  """
+  Parses and formats timezone offsets. Parsed timezones are interned, i.e. equal offsets are
+  represented by the same #datetime.tzinfo object.
+  """
+
+  #: The maximum number of distinct strings for which the parsed timezone is cached.
+  CACHE_SIZE: t.ClassVar[int] = 1024
 
   regex: str = r'(?:Z|[-+]\d{2}(?::?\d{2})?)'
+  _cache: t.Dict[str, datetime.tzinfo] = field(default_factory=dict, init=False, repr=False, compare=False)
 
   def parse_string(self, s: str) -> datetime.tzinfo:
+    try:
+      return self._cache[s]
+    except KeyError:
+      pass
+    tzinfo = self._parse_string(s)
+    if len(self._cache) < self.CACHE_SIZE:
+      self._cache[s] = tzinfo
+    return tzinfo
+
+  def _parse_string(self, s: str) -> datetime.tzinfo:
     match = re.match(self.regex, s)
     if not match:
       raise ValueError('not a timezone string: {!r}'.format(s))
@@ -101,7 +129,7 @@ class TimezoneFormatOption(IFormatOption):
       hours = int(s[1:3])
       minutes = int(s[3:5] or '00')
       seconds = sign * (hours * 3600 + minutes * 60)
-      return datetime.timezone(datetime.timedelta(seconds=seconds))
+      return _get_timezone(seconds)
 
   def format_value(self, dt: datetime.datetime, v: t.Any) -> str:
     assert v is None or isinstance(v, datetime.tzinfo), f'expected datetime.tzinfo, got {v!r}'
@@ -137,12 +165,12 @@ class FormatOptions(enum.Enum):
   Enumeration of all the available format options.
   """
 
-  Year = NumericFormatOption('Y', DatetimeComponent.Year, r'\d{4}', lambda v: str(v).rjust(4, '0'))
-  Month = NumericFormatOption('m', DatetimeComponent.Month, r'\d{2}', lambda v: str(v).rjust(2, '0'))
-  Day = NumericFormatOption('d', DatetimeComponent.Day, r'\d{2}', lambda v: str(v).rjust(2, '0'))
-  Hour = NumericFormatOption('H', DatetimeComponent.Hour, r'\d{2}', lambda v: str(v).rjust(2, '0'))
-  Minute = NumericFormatOption('M', DatetimeComponent.Minute, r'\d{2}', lambda v: str(v).rjust(2, '0'))
-  Second = NumericFormatOption('S', DatetimeComponent.Second, r'\d{2}', lambda v: str(v).rjust(2, '0'))
+  Year = NumericFormatOption('Y', DatetimeComponent.Year, r'\d{4}', lambda v: str(v).rjust(4, '0'), template='%04d')
+  Month = NumericFormatOption('m', DatetimeComponent.Month, r'\d{2}', lambda v: str(v).rjust(2, '0'), template='%02d')
+  Day = NumericFormatOption('d', DatetimeComponent.Day, r'\d{2}', lambda v: str(v).rjust(2, '0'), template='%02d')
+  Hour = NumericFormatOption('H', DatetimeComponent.Hour, r'\d{2}', lambda v: str(v).rjust(2, '0'), template='%02d')
+  Minute = NumericFormatOption('M', DatetimeComponent.Minute, r'\d{2}', lambda v: str(v).rjust(2, '0'), template='%02d')
+  Second = NumericFormatOption('S', DatetimeComponent.Second, r'\d{2}', lambda v: str(v).rjust(2, '0'), template='%02d')
   Microsecond = NumericFormatOption('f', DatetimeComponent.Microsecond, r'\d+',
       format=lambda v: str(v).rjust(6, '0').rstrip('0') or '0',
       post_parse=lambda v: int(str(int(v) * (10 ** max(6-len(v), 0)))[:6]))
@@ -150,5 +178,10 @@ class FormatOptions(enum.Enum):
 
   @classmethod
   def get(cls, char: str) -> t.Optional[IFormatOption]:
-    # TODO(NiklasRosenstein): Room for optimization by caching available format options in dict.
-    return next((x.value for x in cls if x.value.char == char), None)
+    return _FORMAT_OPTIONS_BY_CHAR.get(char)
+
+
+_FORMAT_OPTIONS_BY_CHAR: t.Dict[str, IFormatOption] = {}
+for _option in reversed(FormatOptions):
+  _FORMAT_OPTIONS_BY_CHAR[_option.value.char] = _option.value
+del _option
@@ -0,0 +1,29 @@
+
+import datetime
+import pytest
+from nr.parsing.date import duration
+
+
+def test_duration_parse():
+  assert duration.parse('P1Y2M3W4DT5H6M7S') == duration(1, 2, 3, 4, 5, 6, 7)
+  assert duration.parse('PT30S') == duration(seconds=30)
+  assert duration.parse('P') == duration()
+  assert duration.parse('P2D1Y') == duration(years=1, days=2)
+  for s in ['', 'T1S', 'P1', 'P1S', 'PT1D', 'P1DT1ST1S', 'P-1D', 'PT30S\n']:
+    with pytest.raises(ValueError):
+      duration.parse(s)
+
+
+def test_duration_parse_returns_new_objects():
+  a = duration.parse('PT30S')
+  a.seconds = 10
+  assert duration.parse('PT30S') == duration(seconds=30)
+
+
+@pytest.mark.parametrize('value', [duration(), duration(1, 2, 3, 4, 5, 6, 7), duration(weeks=2, seconds=90061)])
+def test_duration_total_seconds(value):
+  expected = (value.years * 365.25 * 86400 + value.months * 30.4375 * 86400 + value.weeks * 7 * 86400 +
+    value.days * 86400 + value.hours * 3600 + value.minutes * 60 + value.seconds)
+  assert value.total_seconds() == expected
+  assert isinstance(value.total_seconds(), float)
+  assert value.as_timedelta() == datetime.timedelta(seconds=expected)
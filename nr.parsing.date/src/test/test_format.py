@@ -0,0 +1,88 @@
+
+import datetime
+import threading
+import pytest
+from nr.parsing.date import date_format, datetime_format, format, parse_date, parse_datetime, time_format
+
+
+def test_compile_is_cached():
+  fmt = datetime_format.compile('%Y-%m-%d %H:%M')
+  assert datetime_format.compile('%Y-%m-%d %H:%M') is fmt
+  assert datetime_format.compile('%Y-%m-%d %H:%M', regex_mode=True) is not fmt
+  assert date_format.compile('%Y-%m-%d') is not datetime_format.compile('%Y-%m-%d')
+  assert isinstance(date_format.compile('%Y-%m-%d'), date_format)
+  assert isinstance(time_format.compile('%H:%M'), time_format)
+
+
+@pytest.mark.parametrize('cls', [datetime_format, date_format, time_format])
+def test_compiled_formats_are_immutable(cls):
+  import dataclasses
+  fmt = cls.compile('%H:%M' if cls is time_format else '%Y-%m-%d')
+  assert isinstance(fmt.seq, tuple)
+  with pytest.raises(dataclasses.FrozenInstanceError):
+    fmt.seq = []
+  with pytest.raises(dataclasses.FrozenInstanceError):
+    fmt.format_str = '%Y'
+  assert cls.compile(fmt.format_str) is fmt
+
+
+def test_compile_cache_is_bounded(monkeypatch):
+  monkeypatch.setattr(format, 'COMPILE_CACHE_SIZE', 4)
+  datetime_format.clear_cache()
+  first = datetime_format.compile('%Y 0')
+  for i in range(1, 10):
+    datetime_format.compile(f'%Y {i}')
+  assert len(format._compile_cache) == 4
+  assert datetime_format.compile('%Y 0') is not first
+  assert datetime_format.compile('%Y 9') is datetime_format.compile('%Y 9')
+
+
+def test_compile_cache_threads():
+  datetime_format.clear_cache()
+  results = []
+
+  def worker():
+    for i in range(100):
+      results.append(datetime_format.compile(f'%Y-%m-%d {i % 10}'))
+
+  threads = [threading.Thread(target=worker) for _ in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert len(set(map(id, results))) == 10
+
+
+def test_parse_and_format_with_format_string():
+  assert parse_date('%d.%m.%Y', '17.03.2021') == datetime.date(2021, 3, 17)
+  assert parse_datetime('%Y-%m-%d %H:%M', '2021-03-17 10:30') == datetime.datetime(2021, 3, 17, 10, 30)
+
+
+def test_datetime_format_parse_many():
+  fmt = datetime_format.compile('%Y-%m-%dT%H:%M:%S.%f%z')
+  values = ['2021-03-17T10:15:00.5Z', '2021-03-17T10:15:00.123+01:00', '2021-03-17']
+  assert fmt.parse_many(values[:2]) == [fmt.parse_datetime(x) for x in values[:2]]
+  assert fmt.parse_many(values[:2])[1] == datetime.datetime(2021, 3, 17, 10, 15, 0, 123000,
+    datetime.timezone(datetime.timedelta(hours=1)))
+  with pytest.raises(ValueError):
+    fmt.parse_many(values)
+  assert fmt.parse_many(values, on_error='none')[2] is None
+  assert isinstance(fmt.parse_many(values, on_error='collect')[2], ValueError)
+
+
+def _format_datetime_reference(fmt, dt):
+  return ''.join(item if isinstance(item, str) else item.format_value(dt, getattr(dt, item.component.value))
+    for item in fmt.seq)
+
+
+@pytest.mark.parametrize('format_str', ['%Y-%m-%dT%H:%M:%S.%f%z', '%d.%m.%Y', '%H 100%', '%z', 'foo'])
+def test_datetime_format_format_datetime(format_str):
+  fmt = datetime_format.compile(format_str)
+  values = [
+    datetime.datetime(2021, 3, 17, 10, 15, 0, 500000),
+    datetime.datetime(1, 1, 1, 0, 0, 0, 0, datetime.timezone.utc),
+    datetime.datetime(2021, 12, 31, 23, 59, 59, 123, datetime.timezone(datetime.timedelta(hours=-5, minutes=-30))),
+  ]
+  expected = [_format_datetime_reference(fmt, dt) for dt in values]
+  assert [fmt.format_datetime(dt) for dt in values] == expected
+  assert fmt.format_many(values) == expected
@@ -0,0 +1,68 @@
+
+import datetime
+import pytest
+from nr.parsing.date import datetime_format, format_set, ISO_8601
+
+
+def test_format_set_picks_first_matching_format():
+  fmts = format_set('test', datetime_formats=[
+    datetime_format.compile('%Y-%m-%d'),
+    datetime_format.compile('%Y-%d-%m'),
+    datetime_format.compile('%d.%m.%Y'),
+  ])
+  assert fmts.parse_datetime('2021-03-17') == datetime.datetime(2021, 3, 17)
+  assert fmts.parse_datetime('17.03.2021') == datetime.datetime(2021, 3, 17)
+
+  # Matches the regex of the first format, but the month is out of range.
+  assert fmts.parse_datetime('2021-17-03') == datetime.datetime(2021, 3, 17)
+
+  with pytest.raises(ValueError) as excinfo:
+    fmts.parse_datetime('2021-17-13')
+  assert 'does not match test date formats (3)' in str(excinfo.value)
+
+
+def test_format_set_detects_modified_formats():
+  fmts = format_set('test', datetime_formats=[datetime_format.compile('%Y-%m-%d')])
+  with pytest.raises(ValueError):
+    fmts.parse_datetime('17.03.2021')
+  fmts.datetime_formats.append(datetime_format.compile('%d.%m.%Y'))
+  assert fmts.parse_datetime('17.03.2021') == datetime.datetime(2021, 3, 17)
+
+  # Replacing a format in place keeps the length and requires an explicit cache clear.
+  fmts.datetime_formats[1] = datetime_format.compile('%d/%m/%Y')
+  assert fmts.parse_datetime('17.03.2021') == datetime.datetime(2021, 3, 17)
+  fmts.clear_cache()
+  with pytest.raises(ValueError):
+    fmts.parse_datetime('17.03.2021')
+  assert fmts.parse_datetime('17/03/2021') == datetime.datetime(2021, 3, 17)
+
+  fmts.datetime_formats = [datetime_format.compile('%d.%m.%Y')]
+  assert fmts.parse_datetime('17.03.2021') == datetime.datetime(2021, 3, 17)
+
+
+def test_format_set_parse_many():
+  values = ['2021-03-17', '20210317T101500Z', '2021-03-17T10:15:00.5+01:00']
+  assert ISO_8601.parse_many(values, partial=True) == [ISO_8601.parse_datetime(x, True) for x in values]
+  with pytest.raises(ValueError):
+    ISO_8601.parse_many(['2021-03-17'])
+
+
+def test_format_set_parse_many_on_error():
+  values = ['2021-03-17T10:15:00', 'foo', '2021-03-17T10:16:00']
+  with pytest.raises(ValueError):
+    ISO_8601.parse_many(values)
+  assert ISO_8601.parse_many(values, on_error='none') == [
+    datetime.datetime(2021, 3, 17, 10, 15), None, datetime.datetime(2021, 3, 17, 10, 16)]
+  result = ISO_8601.parse_many(values, on_error='collect')
+  assert isinstance(result[1], ValueError)
+  with pytest.raises(ValueError):
+    ISO_8601.parse_many(values, on_error='ignore')
+
+
+def test_format_set_parse_many_remembers_last_format():
+  fmts = format_set('test', datetime_formats=[
+    datetime_format.compile('%Y-%m-%d'),
+    datetime_format.compile('%Y-%d-%m'),
+  ])
+  assert fmts.parse_many(['2021-17-03', '2021-01-02', '2021-31-12']) == [
+    datetime.datetime(2021, 3, 17), datetime.datetime(2021, 2, 1), datetime.datetime(2021, 12, 31)]
@@ -0,0 +1,38 @@
+
+import datetime
+import pytest
+from nr.parsing.date import infer_format
+
+
+@pytest.mark.parametrize('samples,format_str', [
+  (['2021-03-17T10:15:00.123Z', '2021-03-18T00:00:00.5Z'], '%Y-%m-%dT%H:%M:%S.%f%z'),
+  (['20210317T101500+0100'], '%Y%m%dT%H%M%S%z'),
+  (['2021-03-17 10:15:00 +01:00'], '%Y-%m-%d %H:%M:%S %z'),
+  (['2021-03-17'], '%Y-%m-%d'),
+  (['2021-17-03', '2021-18-03'], '%Y-%d-%m'),
+  (['17.03.2021 10:15'], '%d.%m.%Y %H:%M'),
+  (['03/17/2021'], '%m/%d/%Y'),
+  (['01/02/2021', '13/02/2021'], '%d/%m/%Y'),
+  (['10:15:30'], '%H:%M:%S'),
+  (['20210317101500'], '%Y%m%d%H%M%S'),
+])
+def test_infer_format(samples, format_str):
+  fmt = infer_format(samples)
+  assert fmt.format_str == format_str
+  assert None not in fmt.parse_many(samples, on_error='none')
+
+
+def test_infer_format_errors():
+  with pytest.raises(ValueError):
+    infer_format([])
+  with pytest.raises(ValueError):
+    infer_format(['foo'])
+  with pytest.raises(ValueError):
+    infer_format(['2021-03-17T10:15:00', '2021-03-17'])
+  with pytest.raises(ValueError):
+    infer_format(['13/13/2021'])
+
+
+def test_infer_format_parse():
+  fmt = infer_format(['17.03.2021'])
+  assert fmt.parse_many(['17.03.2021', '01.12.1999']) == [datetime.datetime(2021, 3, 17), datetime.datetime(1999, 12, 1)]
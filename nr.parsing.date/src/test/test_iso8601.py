@@ -1,7 +1,11 @@
 
+import dataclasses
 import datetime
+import random
 import pytest
 from nr.parsing.date import ISO_8601, duration
+from nr.parsing.date import format_sets
+from nr.parsing.date.format_sets import _parse_iso8601_datetime as fast_parser
 from .samples import SAMPLES
 
 ISO8601_DATETIME_SAMPLES = SAMPLES[SAMPLES.tags.apply(lambda x: 'iso8601' in x) &
@@ -21,3 +25,41 @@ def test_iso8601_datetime(row):
 def test_iso8601_duration(row):
   assert duration.parse(row.formatted) == row.parsed
   assert str(row.parsed) == row.fullformat
+
+
+@pytest.mark.parametrize('use_fromisoformat', [True, False])
+def test_iso8601_fast_parser_matches_formats(monkeypatch, use_fromisoformat):
+  if not use_fromisoformat:
+    monkeypatch.setattr(format_sets, '_fromisoformat', None)
+  slow = dataclasses.replace(ISO_8601, fast_parser=None)
+  rng = random.Random(42)
+  samples = ['2021-03-17T10:15:00', '2021-03-17T10:15:00.5Z', '2021-03-17T10:15:00.1234567Z',
+    '2021-03-17T10:15:00+01', '2021-03-17T10:15:00-0130', '2021-03-17T10:15:00.000123+01:00',
+    '2021-02-30T10:15:00', '2021-03-17T10:15:00Z\n', '2021-03-17T10:15:00+1:00', '٢٠٢١-03-17T10:15:00']
+  for _ in range(2000):
+    chars = list(rng.choice(samples[:6]))
+    for _ in range(rng.randint(0, 2)):
+      chars[rng.randrange(len(chars))] = rng.choice('0123456789-+:.TZ ')
+    samples.append(''.join(chars))
+  for s in samples:
+    try:
+      expected = slow.parse_datetime(s)
+    except ValueError:
+      expected = None
+    assert fast_parser(s) in (None, expected), s
+    try:
+      assert ISO_8601.parse_datetime(s) == expected, s
+    except ValueError:
+      assert expected is None, s
+
+
+@pytest.mark.parametrize('use_fromisoformat', [True, False])
+def test_iso8601_fast_parser_interns_timezones(monkeypatch, use_fromisoformat):
+  if not use_fromisoformat:
+    monkeypatch.setattr(format_sets, '_fromisoformat', None)
+  slow = dataclasses.replace(ISO_8601, fast_parser=None)
+  for offset in ['+02:00', '-0130', '+01', 'Z', '+00:00']:
+    a = ISO_8601.parse_datetime('2021-03-17T10:15:00' + offset)
+    b = ISO_8601.parse_datetime('2021-03-18T11:30:00.123456' + offset)
+    assert a.tzinfo is b.tzinfo, offset
+    assert a.tzinfo is slow.parse_datetime('2021-03-17T10:15:00' + offset).tzinfo, offset
@@ -0,0 +1,25 @@
+
+import datetime
+import pytest
+from nr.parsing.date import datetime_format
+from nr.parsing.date.options import FormatOptions
+
+
+def test_format_options_get():
+  assert FormatOptions.get('Y') is FormatOptions.Year.value
+  assert FormatOptions.get('z') is FormatOptions.Timezone.value
+  assert FormatOptions.get('x') is None
+
+
+def test_timezone_parse_string_interns_timezones():
+  option = FormatOptions.Timezone.value
+  assert option.parse_string('Z') is datetime.timezone.utc
+  assert option.parse_string('+01:00') == datetime.timezone(datetime.timedelta(hours=1))
+  assert option.parse_string('+01:00') is option.parse_string('+0100')
+  assert option.parse_string('-0130') == datetime.timezone(-datetime.timedelta(hours=1, minutes=30))
+  with pytest.raises(ValueError):
+    option.parse_string('foo')
+
+  fmt = datetime_format.compile('%Y-%m-%dT%H:%M:%S%z')
+  a, b = fmt.parse_many(['2021-03-17T10:15:00+02:00', '2021-03-18T10:15:00+0200'])
+  assert a.tzinfo is b.tzinfo